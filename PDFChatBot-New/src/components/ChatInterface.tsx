@@ -15,6 +15,32 @@ interface DocumentInfo {
     filename: string;
 }
 
+interface IngestJob {
+    job_id: string;
+    status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+    stage: string;
+    pages_done: number;
+    pages_total: number;
+    error: string | null;
+}
+
+// Uploads are processed in the background: poll the ingestion job until it finishes
+const waitForJob = async (jobId: string, onProgress: (job: IngestJob) => void): Promise<IngestJob> => {
+    while (true) {
+        const response = await window.fetch(`http://127.0.0.1:8000/jobs/${jobId}`);
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.detail || 'Could not check processing status.');
+        }
+        if (job.status === 'completed') return job;
+        if (job.status === 'failed' || job.status === 'cancelled') {
+            throw new Error(job.error || `Processing ${job.status}.`);
+        }
+        onProgress(job);
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+};
+
 export function ChatInterface() {
     const [messages, setMessages] = useState<ChatMessage[]>([]);
     const [input, setInput] = useState('');
@@ -79,6 +105,13 @@ export function ChatInterface() {
             });
             const responseData = await rawResponse.json();
             if (rawResponse.ok && responseData.document_id) {
+                if (responseData.job_id) {
+                    // 202 Accepted: the document is queued, not processed yet
+                    await waitForJob(responseData.job_id, job => {
+                        const pages = job.pages_total ? ` ${job.pages_done} of ${job.pages_total} pages` : '';
+                        setMessages([{ role: 'assistant', content: `Processing "${responseData.filename}":${pages} (${job.stage})...` }]);
+                    });
+                }
                 setDocumentId(responseData.document_id);
                 setCurrentPdf(responseData.filename);
                 setMessages([{ role: 'assistant', content: `Ready to chat with "${responseData.filename}"!${responseData.file_size_mb ? ` (File size: ${responseData.file_size_mb}MB)` : ''}` }]);
@@ -0,0 +1,73 @@
+"""
+Benchmarks the retrieval half of /chat against document size, comparing the
+old path (re-chunk and re-encode the whole document on every question) with
+the precomputed one (encode the query, then one similarity lookup).
+
+Usage: python benchmarks/bench_chat_latency.py [pages ...]
+"""
+import random
+import sys
+import os
+import time
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from sentence_transformers import SentenceTransformer, util
+
+from config import Config
+from modules import retrieval
+
+WORDS_PER_PAGE = 400
+QUERIES = [
+    "What is the notice period for termination?",
+    "Which parts are covered by the warranty?",
+    "How are overtime hours compensated?",
+]
+
+def synthetic_document(pages: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(5000)] + ["contract", "warranty", "notice", "period", "overtime", "parts"]
+    return " ".join(rng.choice(vocabulary) for _ in range(pages * WORDS_PER_PAGE))
+
+def split_text_into_chunks(text: str, chunk_size: int = 500):
+    words = text.split()
+    return [' '.join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size // 2)]
+
+def time_per_query(fn) -> float:
+    started = time.perf_counter()
+    for query in QUERIES:
+        fn(query)
+    return (time.perf_counter() - started) / len(QUERIES)
+
+def bench(pages: int, model: SentenceTransformer):
+    text = synthetic_document(pages)
+
+    def before(query):
+        chunks = split_text_into_chunks(text)
+        query_embedding = model.encode(query, convert_to_tensor=True)
+        chunk_embeddings = model.encode(chunks, convert_to_tensor=True)
+        similarities = util.pytorch_cos_sim(query_embedding, chunk_embeddings)[0]
+        return similarities.argsort(descending=True)[:3]
+
+    started = time.perf_counter()
+    chunks = split_text_into_chunks(text)
+    embeddings = model.encode(chunks, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+    ingest_seconds = time.perf_counter() - started
+
+    def after(query):
+        query_embedding = model.encode(query, convert_to_numpy=True, normalize_embeddings=True)
+        return retrieval.top_k(query_embedding, embeddings, 3)
+
+    return len(chunks), ingest_seconds, time_per_query(before), time_per_query(after)
+
+if __name__ == "__main__":
+    page_counts = [int(arg) for arg in sys.argv[1:]] or [10, 50, 200]
+    model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    model.encode("warm up")
+
+    print(f"{'pages':>6} {'chunks':>7} {'ingest (s)':>11} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for pages in page_counts:
+        chunks, ingest_seconds, before, after = bench(pages, model)
+        print(f"{pages:>6} {chunks:>7} {ingest_seconds:>11.2f} {before * 1000:>12.1f} {after * 1000:>11.1f} {before / after:>7.0f}x")
@@ -0,0 +1,72 @@
+"""
+Compares follow-up question latency with and without chat sessions (see
+modules.chat_sessions). Stateless, every turn sends the full prompt with the
+retrieved context and Ollama evaluates all of it again; in a session, a
+follow-up continues from the context Ollama returned for the previous turn
+and only its own question is evaluated. Reports prompt tokens evaluated,
+time to first token and generation time per turn. Needs Ollama running with
+Config.OLLAMA_MODEL.
+
+Usage: python benchmarks/bench_chat_sessions.py [context tokens] [follow-ups]
+"""
+import asyncio
+import random
+import sys
+import os
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from modules import context_packer
+from modules.ollama_handler import OllamaHandler
+from benchmarks.synthetic_pdf import WORDS, page_lines
+
+def synthetic_context(tokens: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    while context_packer.estimate_tokens(" ".join(lines)) < tokens:
+        lines.extend(page_lines(rng))
+    return " ".join(lines)
+
+async def run_turns(ollama: OllamaHandler, context: str, questions, session: bool):
+    conversation = {"context": None} if session else None
+    turns = []
+    for question in questions:
+        timings = {}
+        # Follow-ups in a session retrieve the same passages, which the conversation has already seen
+        unseen = "" if conversation and conversation["context"] else context
+        async for _ in ollama.stream_response(question, unseen, timings=timings, conversation=conversation):
+            pass
+        turns.append((timings.get("prompt_tokens") or 0, timings["llm_time_to_first_token_seconds"] or 0.0,
+                      timings["llm_seconds"]))
+    return turns
+
+async def main(context_tokens: int, follow_ups: int):
+    ollama = OllamaHandler(model_name=Config.OLLAMA_MODEL, base_url=Config.OLLAMA_BASE_URL,
+                           timeout=Config.OLLAMA_TIMEOUT, keep_alive=Config.OLLAMA_KEEP_ALIVE)
+    try:
+        healthy, message = await ollama.check_health()
+        if not healthy:
+            sys.exit(message)
+        context = synthetic_context(context_tokens)
+        rng = random.Random(1)
+        questions = [f"What does the document say about {' and '.join(rng.sample(WORDS, 2))}?"
+                     for _ in range(follow_ups + 1)]
+
+        # Load the model first so neither mode pays for it
+        await ollama.generate_response("Say hello.", "")
+        print(f"{Config.OLLAMA_MODEL}, ~{context_tokens} context tokens, 1 question + {follow_ups} follow-ups")
+        print(f"{'mode':<10} {'turn':>4} {'prompt tokens':>14} {'first token s':>14} {'total s':>8}")
+        for name, session in (("stateless", False), ("session", True)):
+            for turn, (prompt_tokens, first_token, seconds) in enumerate(
+                await run_turns(ollama, context, questions, session), start=1
+            ):
+                print(f"{name:<10} {turn:>4} {prompt_tokens:>14} {first_token:>14.2f} {seconds:>8.2f}")
+    finally:
+        await ollama.aclose()
+
+if __name__ == "__main__":
+    tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 1200
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    asyncio.run(main(tokens, turns))
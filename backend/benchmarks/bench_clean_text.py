@@ -0,0 +1,70 @@
+"""
+Benchmarks text cleaning on large OCR-like inputs: the previous path (two
+Python re.sub passes followed by the C++ whitespace cleaner) against the
+single-pass native normalize_text. Also reports throughput with several
+threads cleaning at once, which only scales when the GIL is released.
+
+Usage: python benchmarks/bench_clean_text.py [megabytes] [threads]
+"""
+import sys
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import processor_bindings
+
+REPEATS = 3
+WORDS = ["contract", "employee", "notice", "période", "Übersicht", "30", "days", "§4.2", "(see", "annex)",
+         "—", "“quoted”", "e-mail:", "x@y.com", "naïve", "数据", "€1,200.00", "*", "•", "..."]
+
+def legacy_clean_text(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,!?-]', '', text)
+    return processor_bindings.clean_text(text)
+
+def make_text(megabytes: float, rng: random.Random) -> str:
+    """Words separated by the ragged whitespace OCR tends to produce."""
+    separators = [" ", " ", " ", "  ", "\n", " \n\n", "\t", "\r\n"]
+    parts, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        word = rng.choice(WORDS) + rng.choice(separators)
+        parts.append(word)
+        size += len(word.encode("utf-8"))
+    return "".join(parts)
+
+def best_of(function, *args) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def parallel(function, texts) -> float:
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        started = time.perf_counter()
+        list(executor.map(function, texts))
+        return time.perf_counter() - started
+
+def main(megabytes: float, threads: int):
+    rng = random.Random(0)
+    text = make_text(megabytes, rng)
+    assert legacy_clean_text(text) == processor_bindings.normalize_text(text)
+
+    print(f"{megabytes:g}MB input, best of {REPEATS}")
+    print(f"{'path':<26} {'seconds':>9} {'MB/s':>8} {f'{threads} threads (s)':>15}")
+    for label, function in [("re.sub x2 + clean_text", legacy_clean_text),
+                            ("normalize_text", processor_bindings.normalize_text)]:
+        seconds = best_of(function, text)
+        threaded = parallel(function, [text] * threads)
+        print(f"{label:<26} {seconds:>9.3f} {megabytes / seconds:>8.1f} {threaded:>15.3f}")
+
+if __name__ == "__main__":
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    main(size, workers)
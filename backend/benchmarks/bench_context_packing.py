@@ -0,0 +1,98 @@
+"""
+Compares the prompt context of /chat before and after context packing: the
+top 3 chunks joined as they are, against Config.CONTEXT_CANDIDATES chunks
+merged, de-duplicated and packed into Config.CONTEXT_TOKEN_BUDGET (see
+modules.context_packer). Reports the estimated context tokens per question
+and, when Ollama is reachable with Config.OLLAMA_MODEL, the prompt tokens it
+evaluated and its generation latency for both.
+
+Usage: python benchmarks/bench_context_packing.py [pages] [queries]
+"""
+import asyncio
+import random
+import sys
+import os
+import time
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from modules import context_packer
+from modules import pages as page_layout
+from modules.bm25 import BM25Index
+from modules.ollama_handler import OllamaHandler
+from benchmarks.synthetic_pdf import WORDS, page_lines
+
+NAIVE_TOP_K = 3
+
+def build_document(page_count: int, seed: int = 0):
+    """Synthetic pages chunked the way ingestion chunks them."""
+    rng = random.Random(seed)
+    pages = [{"page": number, "text": " ".join(page_lines(rng)), "source": "native", "hash": str(number)}
+             for number in range(1, page_count + 1)]
+    text = page_layout.assemble(pages)
+    chunks = page_layout.split(text, pages, Config.CHUNK_SIZE, Config.OVERLAP_SIZE, Config.CHUNK_SNAP_TO_SENTENCE)
+    return chunks, BM25Index.build(list(chunks))
+
+def retrieve(chunks, bm25: BM25Index, query: str, top_k: int):
+    return [{
+        "text": chunks[index],
+        "similarity": score,
+        "metadata": {"char_start": int(chunks.spans[index][0]), "char_end": int(chunks.spans[index][1])}
+    } for index, score in bm25.top_k(query, top_k)]
+
+def contexts(chunks, bm25: BM25Index, query: str):
+    naive = context_packer.join_hits(retrieve(chunks, bm25, query, NAIVE_TOP_K))
+    packed, _ = context_packer.pack(retrieve(chunks, bm25, query, Config.CONTEXT_CANDIDATES), Config.CONTEXT_TOKEN_BUDGET)
+    return naive, packed
+
+async def llm_latency(pairs):
+    """Mean prompt tokens and generation seconds of Ollama for the naive and packed contexts; None if unavailable."""
+    ollama = OllamaHandler(model_name=Config.OLLAMA_MODEL, base_url=Config.OLLAMA_BASE_URL,
+                           timeout=Config.OLLAMA_TIMEOUT, keep_alive=Config.OLLAMA_KEEP_ALIVE)
+    try:
+        healthy, message = await ollama.check_health()
+        if not healthy:
+            print(f"Skipping LLM latency: {message}")
+            return None
+        results = {"naive": [], "packed": []}
+        for query, naive, packed in pairs:
+            for name, context in (("naive", naive), ("packed", packed)):
+                timings = {}
+                await ollama.generate_response(query, context, timings=timings)
+                results[name].append((timings.get("prompt_tokens") or 0, timings["llm_seconds"]))
+        return {
+            name: (sum(tokens for tokens, _ in runs) / len(runs), sum(seconds for _, seconds in runs) / len(runs))
+            for name, runs in results.items()
+        }
+    finally:
+        await ollama.aclose()
+
+def main(page_count: int, query_count: int):
+    chunks, bm25 = build_document(page_count)
+    rng = random.Random(1)
+    queries = [" ".join(rng.sample(WORDS, 3)) for _ in range(query_count)]
+
+    started = time.perf_counter()
+    pairs = [(query, *contexts(chunks, bm25, query)) for query in queries]
+    packing_ms = (time.perf_counter() - started) * 1000 / query_count
+
+    naive_tokens = sum(context_packer.estimate_tokens(naive) for _, naive, _ in pairs) / query_count
+    packed_tokens = sum(context_packer.estimate_tokens(packed) for _, _, packed in pairs) / query_count
+    print(f"{page_count} pages, {len(chunks)} chunks, {query_count} queries, budget {Config.CONTEXT_TOKEN_BUDGET} tokens")
+    print(f"{'context':<28} {'est. tokens':>12}")
+    print(f"{f'top {NAIVE_TOP_K} joined':<28} {naive_tokens:>12.0f}")
+    print(f"{f'{Config.CONTEXT_CANDIDATES} candidates packed':<28} {packed_tokens:>12.0f}")
+    print(f"retrieval + packing: {packing_ms:.2f} ms per query")
+
+    latency = asyncio.run(llm_latency(pairs))
+    if latency is not None:
+        print(f"{'context':<10} {'prompt tokens':>14} {'llm seconds':>12}")
+        for name, (tokens, seconds) in latency.items():
+            print(f"{name:<10} {tokens:>14.0f} {seconds:>12.2f}")
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    main(pages, queries)
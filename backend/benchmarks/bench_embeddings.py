@@ -0,0 +1,80 @@
+"""
+Benchmarks the embedding backends in modules.embedding_backends on CPU:
+chunk throughput, and how closely each one reproduces the fp32 PyTorch
+baseline (mean cosine similarity of the embeddings and top-k overlap of the
+chunks retrieved for the same queries).
+
+Usage: python benchmarks/bench_embeddings.py [chunks] [threads]
+"""
+import random
+import sys
+import os
+import time
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from config import Config
+from modules import retrieval
+from modules.embedding_backends import BACKENDS, create_backend
+
+TOP_K = 5
+QUERY_COUNT = 100
+SENTENCES = [
+    "The notice period for terminating the agreement is thirty days.",
+    "Overtime beyond forty hours per week is paid at one and a half times the base rate.",
+    "Part XJ-900 is covered by a warranty of twenty-four months against defects.",
+    "Travel expenses above five hundred euros require approval from a manager.",
+    "Access badges must be renewed every twelve months at the front desk.",
+    "Employees accrue two vacation days for every month worked.",
+    "Confidential information may not be disclosed to third parties.",
+    "Invoices are payable within sixty days of receipt.",
+]
+
+def make_chunks(count: int, rng: random.Random):
+    """Chunks of roughly 120 words shuffled from contract-like sentences."""
+    return [" ".join(rng.choice(SENTENCES) for _ in range(8)) for _ in range(count)]
+
+def throughput(backend, chunks) -> float:
+    backend.encode(chunks[:Config.EMBEDDING_BATCH_SIZE])  # warm-up
+    started = time.perf_counter()
+    embeddings = backend.encode(chunks)
+    return len(chunks) / (time.perf_counter() - started), embeddings
+
+def overlap_at_k(baseline: np.ndarray, candidate: np.ndarray, queries: np.ndarray, candidate_queries: np.ndarray) -> float:
+    overlaps = []
+    for query, candidate_query in zip(queries, candidate_queries):
+        expected = {i for i, _ in retrieval.top_k(query, baseline, TOP_K)}
+        found = {i for i, _ in retrieval.top_k(candidate_query, candidate, TOP_K)}
+        overlaps.append(len(expected & found) / TOP_K)
+    return float(np.mean(overlaps))
+
+def main(chunk_count: int, threads: int):
+    rng = random.Random(0)
+    chunks = make_chunks(chunk_count, rng)
+    queries = [rng.choice(SENTENCES) for _ in range(QUERY_COUNT)]
+
+    print(f"{chunk_count} chunks, batch size {Config.EMBEDDING_BATCH_SIZE}, {threads or 'default'} threads, "
+          f"model {Config.EMBEDDING_MODEL_DIR}")
+    print(f"{'backend':<12} {'chunks/s':>9} {'speedup':>8} {'cosine':>8} {f'overlap@{TOP_K}':>10}")
+    baseline = None
+    for name in BACKENDS:
+        backend = create_backend(
+            name, Config.EMBEDDING_MODEL, model_dir=Config.EMBEDDING_MODEL_DIR,
+            batch_size=Config.EMBEDDING_BATCH_SIZE, threads=threads
+        )
+        rate, embeddings = throughput(backend, chunks)
+        query_embeddings = backend.encode(queries)
+        if baseline is None:
+            baseline = (rate, embeddings, query_embeddings)
+        base_rate, base_embeddings, base_queries = baseline
+        cosine = float(np.mean(np.sum(base_embeddings * embeddings, axis=1)))
+        overlap = overlap_at_k(base_embeddings, embeddings, base_queries, query_embeddings)
+        print(f"{name:<12} {rate:>9.1f} {rate / base_rate:>7.2f}x {cosine:>8.4f} {overlap:>10.3f}")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    thread_count = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    main(count, thread_count)
@@ -0,0 +1,63 @@
+"""
+Compares the OCR profiles (see modules.ocr.OCR_PROFILES) on synthetic
+scanned pages: pages per second, character accuracy against the text the
+pages were drawn from and, for the adaptive profile, how many pages were
+rendered a second time. Needs poppler and Tesseract.
+
+Usage: python benchmarks/bench_ocr_profiles.py [pages] [profiles]
+e.g.   python benchmarks/bench_ocr_profiles.py 6 fast,adaptive
+"""
+import difflib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from modules import ocr
+from benchmarks.synthetic_pdf import write_pdf
+
+def character_accuracy(truth: List[str], extracted: List[str]) -> float:
+    """Mean similarity of each page's text to its truth, ignoring how whitespace differs."""
+    scores = [
+        difflib.SequenceMatcher(None, " ".join(expected.split()), " ".join(found.split()), autojunk=False).ratio()
+        for expected, found in zip(truth, extracted)
+    ]
+    return sum(scores) / max(1, len(scores))
+
+def require_tools():
+    for tool in ("pdfinfo", "pdftoppm"):
+        if shutil.which(ocr._poppler_command(tool, Config.POPPLER_PATH)) is None:
+            sys.exit(f"poppler ({tool}) is not installed")
+    try:
+        ocr.pytesseract.get_tesseract_version()
+    except (ocr.pytesseract.TesseractNotFoundError, OSError):
+        sys.exit("tesseract is not installed")
+
+def main(pages: int, profiles: List[str]):
+    require_tools()
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "scanned.pdf")
+        truth = write_pdf(path, pages, "scanned")
+
+        print(f"{pages} synthetic scanned pages, {Config.OCR_WORKERS or os.cpu_count()} OCR workers")
+        print(f"{'profile':<10} {'seconds':>9} {'pages/s':>8} {'char accuracy':>14} {'re-rendered':>12}")
+        for profile in profiles:
+            started = time.perf_counter()
+            extracted = ocr.extract_pages(
+                path, poppler_path=Config.POPPLER_PATH, max_workers=Config.OCR_WORKERS, profile=profile
+            )
+            seconds = time.perf_counter() - started
+            accuracy = character_accuracy(truth, [page["text"] for page in extracted])
+            rerendered = ocr.summarize_pages(extracted)["rerendered_pages"]
+            print(f"{profile:<10} {seconds:>9.2f} {pages / seconds:>8.2f} {accuracy:>14.3f} {rerendered:>12}")
+
+if __name__ == "__main__":
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    names = sys.argv[2].split(",") if len(sys.argv) > 2 else list(ocr.OCR_PROFILES)
+    main(page_count, names)
@@ -0,0 +1,98 @@
+"""
+Benchmarks single-document retrieval in the three Config.RETRIEVAL_MODE
+settings: dense-only, BM25-only and hybrid (BM25 candidate pruning + dense
+re-scoring, fused). Reports per-query latency by stage and the hit rate
+(a relevant chunk within the top k) for exact-identifier questions, such as
+part numbers and clause IDs, where only the chunk carrying the identifier is
+relevant, and for paraphrased questions, where any chunk on the topic is.
+
+Usage: python benchmarks/bench_retrieval.py [chunks] [queries]
+"""
+import random
+import sys
+import os
+import time
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from config import Config
+from modules import retrieval
+from modules.bm25 import BM25Index
+
+TOP_K = 3
+TOPICS = [
+    ("termination", "The notice period for terminating the agreement is {n} days.", "How much notice is needed to end the agreement?"),
+    ("warranty", "The part is covered by a warranty of {n} months against defects.", "How long is the guarantee against defects?"),
+    ("overtime", "Overtime beyond {n} hours per week is paid at one and a half times the base rate.", "How is extra work compensated?"),
+    ("travel", "Travel expenses above {n} euros require approval from a manager.", "Who approves expensive business trips?"),
+    ("security", "Access badges must be renewed every {n} months at the front desk.", "How often do entry cards need replacing?"),
+]
+FILLER = ("This section should be read together with the general terms and any annexes that apply. "
+          "Definitions used here have the meaning given in the glossary. ")
+
+def build_document(chunk_count: int, rng: random.Random):
+    """Chunks each stating one fact with a unique clause ID and part number."""
+    chunks, facts = [], []
+    for i in range(chunk_count):
+        topic, template, paraphrase = rng.choice(TOPICS)
+        clause = f"{rng.randint(1, 40)}.{rng.randint(1, 20)}.{i}"
+        part = f"XJ-{10000 + i}"
+        fact = template.format(n=rng.randint(2, 90))
+        chunks.append(f"Clause {clause}, part {part}. {fact} " + FILLER * rng.randint(2, 6))
+        facts.append((clause, part, topic, paraphrase))
+    return chunks, facts
+
+def queries_for(facts, count: int, rng: random.Random):
+    exact, paraphrased = [], []
+    for _ in range(count):
+        target = rng.randrange(len(facts))
+        clause, part, topic, paraphrase = facts[target]
+        exact.append((f"What does clause {clause} say?" if rng.random() < 0.5 else f"What applies to part {part}?",
+                      lambda index, target=target: index == target))
+        paraphrased.append((paraphrase, lambda index, topic=topic: facts[index][2] == topic))
+    return exact, paraphrased
+
+def run(mode: str, queries, query_embeddings, embeddings, bm25):
+    hits = 0
+    stages = {"bm25_seconds": 0.0, "dense_seconds": 0.0, "fusion_seconds": 0.0}
+    started = time.perf_counter()
+    for (query, relevant), query_embedding in zip(queries, query_embeddings):
+        results, timings = retrieval.hybrid_top_k(
+            query, query_embedding, embeddings, bm25, TOP_K, mode=mode, fusion=Config.FUSION_METHOD,
+            candidates=Config.BM25_CANDIDATES, rrf_k=Config.RRF_K, dense_weight=Config.HYBRID_DENSE_WEIGHT
+        )
+        hits += any(relevant(result["index"]) for result in results)
+        for stage in stages:
+            stages[stage] += timings.get(stage, 0.0)
+    total = time.perf_counter() - started
+    count = len(queries)
+    return hits / count, total / count * 1000, {stage: seconds / count * 1000 for stage, seconds in stages.items()}
+
+def main(chunk_count: int, query_count: int):
+    rng = random.Random(0)
+    model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    chunks, facts = build_document(chunk_count, rng)
+    embeddings = model.encode(chunks, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+    started = time.perf_counter()
+    bm25 = BM25Index.build(chunks)
+    print(f"{chunk_count} chunks, BM25 index built in {time.perf_counter() - started:.2f}s, k={TOP_K}, "
+          f"fusion={Config.FUSION_METHOD}, candidates={Config.BM25_CANDIDATES}")
+
+    exact, paraphrased = queries_for(facts, query_count, rng)
+    print(f"{'queries':<12} {'mode':<8} {'hit rate':>9} {'total ms':>9} {'bm25 ms':>8} {'dense ms':>9} {'fusion ms':>10}")
+    for label, queries in [("exact ids", exact), ("paraphrase", paraphrased)]:
+        query_embeddings = model.encode([query for query, _ in queries], convert_to_numpy=True,
+                                        normalize_embeddings=True).astype(np.float32)
+        for mode in ("dense", "bm25", "hybrid"):
+            hit_rate, total_ms, stages = run(mode, queries, query_embeddings, embeddings, bm25)
+            print(f"{label:<12} {mode:<8} {hit_rate:>9.3f} {total_ms:>9.3f} {stages['bm25_seconds']:>8.3f} "
+                  f"{stages['dense_seconds']:>9.3f} {stages['fusion_seconds']:>10.3f}")
+
+if __name__ == "__main__":
+    chunks_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    queries_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(chunks_arg, queries_arg)
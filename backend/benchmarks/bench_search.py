@@ -0,0 +1,80 @@
+"""
+Benchmarks library-wide search: the Chroma HNSW index against exact brute
+force over the same embeddings. Reports recall@k of the approximate results
+and per-query latency, with and without a metadata pre-filter.
+
+Usage: python benchmarks/bench_search.py [chunks] [queries]
+"""
+import sys
+import os
+import time
+import uuid
+
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from modules import retrieval
+from modules.vector_index import VectorIndex
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+CHUNKS_PER_DOCUMENT = 200
+TOP_K = 10
+
+def normalized(rows: np.ndarray) -> np.ndarray:
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+def build_library(total_chunks: int, rng: np.random.Generator):
+    """Clustered random embeddings, so neighbourhoods look like real topics."""
+    centers = normalized(rng.standard_normal((max(1, total_chunks // 50), DIMENSION)))
+    assignments = rng.integers(0, len(centers), total_chunks)
+    embeddings = normalized(centers[assignments] + 0.7 * rng.standard_normal((total_chunks, DIMENSION)) / np.sqrt(DIMENSION))
+    document_ids = [f"doc-{i // CHUNKS_PER_DOCUMENT}" for i in range(total_chunks)]
+    return embeddings, document_ids
+
+def brute_force(query: np.ndarray, embeddings: np.ndarray, allowed: np.ndarray = None):
+    if allowed is not None:
+        return [int(allowed[i]) for i, _ in retrieval.top_k(query, embeddings[allowed], TOP_K)]
+    return [i for i, _ in retrieval.top_k(query, embeddings, TOP_K)]
+
+def main(total_chunks: int, query_count: int):
+    rng = np.random.default_rng(0)
+    embeddings, document_ids = build_library(total_chunks, rng)
+    queries = normalized(embeddings[rng.integers(0, total_chunks, query_count)] + 0.05 * rng.standard_normal((query_count, DIMENSION)))
+
+    client = chromadb.EphemeralClient(Settings(anonymized_telemetry=False))
+    index = VectorIndex(client, name=f"bench-{uuid.uuid4().hex}")
+    started = time.perf_counter()
+    for doc in range(0, total_chunks, CHUNKS_PER_DOCUMENT):
+        rows = slice(doc, min(doc + CHUNKS_PER_DOCUMENT, total_chunks))
+        index.add_document(
+            document_ids[doc], f"{document_ids[doc]}.pdf", [f"chunk {i}" for i in range(rows.start, rows.stop)],
+            embeddings[rows], uploaded_at=float(doc // CHUNKS_PER_DOCUMENT),
+            tags=["even"] if (doc // CHUNKS_PER_DOCUMENT) % 2 == 0 else []
+        )
+    build_seconds = time.perf_counter() - started
+    even_rows = np.array([i for i in range(total_chunks) if int(document_ids[i].split("-")[1]) % 2 == 0])
+
+    print(f"{total_chunks} chunks, {query_count} queries, k={TOP_K}, index build {build_seconds:.1f}s")
+    print(f"{'mode':<22} {'recall@k':>9} {'ann (ms)':>9} {'brute (ms)':>11}")
+    for label, filters, allowed in [("unfiltered", {}, None), ("tag pre-filter", {"tags": ["even"]}, even_rows)]:
+        recalls, ann_seconds, brute_seconds = [], 0.0, 0.0
+        for query in queries:
+            started = time.perf_counter()
+            hits = index.query(query, TOP_K, **filters)
+            ann_seconds += time.perf_counter() - started
+            found = {int(hit["text"].split()[1]) for hit in hits}
+
+            started = time.perf_counter()
+            expected = brute_force(query, embeddings, allowed)
+            brute_seconds += time.perf_counter() - started
+            recalls.append(len(found & set(expected)) / len(expected))
+        print(f"{label:<22} {np.mean(recalls):>9.3f} {ann_seconds / query_count * 1000:>9.2f} {brute_seconds / query_count * 1000:>11.2f}")
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(total, count)
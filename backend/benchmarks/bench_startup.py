@@ -0,0 +1,53 @@
+"""
+Measures cold start of the API in fresh interpreters: how long `import main`
+takes, how long until /health/live answers, and how long until /health/ready
+reports the embedding model and vector index loaded (the background
+warm-up, see Config.EMBEDDING_WARMUP).
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import json
+import subprocess
+import sys
+import os
+import statistics
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs in a fresh interpreter so every import is cold
+CHILD = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    assert client.get("/health/live").status_code == 200
+    live = time.perf_counter()
+    while client.get("/health/ready").status_code != 200:
+        time.sleep(0.05)
+    ready = time.perf_counter()
+    components = client.get("/health/ready").json()["components"]
+print(json.dumps({
+    "import": imported - started,
+    "live": live - started,
+    "ready": ready - started,
+    "embedding_model": components["embedding_model"]["seconds"],
+    "vector_index": components["vector_index"]["seconds"],
+}))
+"""
+
+def run_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(runs: int):
+    results = [run_once() for _ in range(runs)]
+    print(f"{runs} cold starts, median seconds")
+    for key in ("import", "live", "ready", "embedding_model", "vector_index"):
+        print(f"{key:<16} {statistics.median(result[key] for result in results):>8.3f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
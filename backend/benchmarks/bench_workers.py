@@ -0,0 +1,152 @@
+"""
+Load test of the API under several uvicorn worker counts. Starts a Chroma
+server (unless CHROMA_SERVER_HOST is already set), seeds the shared document
+store and vector index with synthetic documents from this process, then for
+each worker count starts the API, fires concurrent /search requests for a
+fixed time and reports throughput and latency. Every query is unique so the
+per-worker query embedding cache does not flatter the numbers.
+
+Usage: python benchmarks/bench_workers.py [worker counts] [seconds] [concurrency]
+e.g.   python benchmarks/bench_workers.py 1,2,4 10 16
+"""
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CHROMA_PORT = 8011
+API_PORT = 8010
+DOCUMENTS = 20
+TOPICS = [
+    "The notice period for terminating the agreement is thirty days.",
+    "Overtime beyond forty hours per week is paid at one and a half times the base rate.",
+    "Part XJ-900 is covered by a warranty of twenty-four months against defects.",
+    "Travel expenses above five hundred euros require approval from a manager.",
+    "Access badges must be renewed every twelve months at the front desk.",
+    "Invoices are payable within sixty days of receipt.",
+]
+
+# The seeding below imports main, which reads these at import time
+EXTERNAL_CHROMA = "CHROMA_SERVER_HOST" in os.environ
+os.environ.setdefault("CHROMA_SERVER_HOST", "127.0.0.1")
+os.environ.setdefault("CHROMA_SERVER_PORT", str(CHROMA_PORT))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+def wait_for(url: str, timeout: float, consecutive: int = 1):
+    """Poll `url` until it answers 200 `consecutive` times in a row."""
+    deadline = time.time() + timeout
+    streak = 0
+    while streak < consecutive:
+        if time.time() > deadline:
+            raise TimeoutError(f"{url} not ready after {timeout}s")
+        try:
+            streak = streak + 1 if httpx.get(url, timeout=2).status_code == 200 else 0
+        except httpx.HTTPError:
+            streak = 0
+            time.sleep(0.2)
+    return True
+
+def start_chroma(path: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        ["chroma", "run", "--path", path, "--port", str(CHROMA_PORT)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_for(f"http://127.0.0.1:{CHROMA_PORT}/api/v2/heartbeat", timeout=60)
+    return process
+
+def seed(rng: random.Random):
+    """Ingest synthetic documents the way an upload would, returning their IDs."""
+    import main
+    document_ids = []
+    for i in range(DOCUMENTS):
+        text = " ".join(rng.choice(TOPICS) for _ in range(400))
+        chunks = main.split_text_into_chunks(text)
+        document_id = f"bench-workers-{i}"
+        main._store_document(
+            document_id, f"{document_id}.pdf", ["bench"], text, [], chunks, main.embed_chunks(chunks),
+            content_hash=document_id, cache_hit=False, start_time=time.time()
+        )
+        document_ids.append(document_id)
+    return main, document_ids
+
+def start_api(workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(API_PORT), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # Readiness is per worker; several answers in a row make it likely all of them warmed up
+    wait_for(f"http://127.0.0.1:{API_PORT}/health/ready", timeout=300, consecutive=3 * workers)
+    return process
+
+def load(seconds: float, concurrency: int):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(number: int):
+        rng = random.Random(number)
+        with httpx.Client(base_url=f"http://127.0.0.1:{API_PORT}", timeout=60) as http:
+            sent = 0
+            while time.perf_counter() < deadline:
+                sent += 1
+                query = f"{rng.choice(TOPICS)} ({number}-{sent})"
+                started = time.perf_counter()
+                response = http.post("/search", json={"query": query, "top_k": 5, "tags": ["bench"]})
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if response.status_code == 200 and response.json()["results"]:
+                        latencies.append(elapsed)
+                    else:
+                        errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+def main(worker_counts, seconds: float, concurrency: int):
+    chroma = None
+    with tempfile.TemporaryDirectory() as chroma_path:
+        if not EXTERNAL_CHROMA:
+            chroma = start_chroma(chroma_path)
+        app, document_ids = seed(random.Random(0))
+        try:
+            print(f"{DOCUMENTS} documents, {concurrency} clients, {seconds:.0f}s per run, {os.cpu_count()} CPUs")
+            print(f"{'workers':>7} {'req/s':>8} {'scaling':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'errors':>7}")
+            baseline = None
+            for workers in worker_counts:
+                api = start_api(workers)
+                try:
+                    latencies, errors = load(seconds, concurrency)
+                finally:
+                    api.terminate()
+                    api.wait()
+                rate = len(latencies) / seconds
+                baseline = baseline or rate
+                p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else float("nan")
+                print(f"{workers:>7} {rate:>8.1f} {rate / baseline:>7.2f}x {statistics.median(latencies) * 1000:>9.1f} "
+                      f"{p95 * 1000:>9.1f} {errors:>7}")
+        finally:
+            for document_id in document_ids:
+                app.document_store.delete(document_id)
+                app.vector_index.get().delete_document(document_id)
+            if chroma is not None:
+                chroma.terminate()
+                chroma.wait()
+
+if __name__ == "__main__":
+    counts = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1, 2, 4]
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    main(counts, duration, clients)
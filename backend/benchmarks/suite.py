@@ -0,0 +1,307 @@
+"""
+Benchmark suite for the document pipeline, one micro-benchmark per stage:
+text extraction (text-layer, scanned and mixed synthetic PDFs), text
+cleaning, chunking, embedding and top-k retrieval. Everything runs offline
+on generated inputs; stages whose tools are missing (poppler, Tesseract, a
+saved embedding model) are reported as skipped rather than failing.
+
+Results are written as JSON. Each mode has its own baseline
+(benchmarks/baseline-quick.json, baseline-full.json) so a run is always
+compared with one of the same workload. A stage whose throughput fell by more
+than the tolerance, or whose extraction quality dropped, is reported as a
+regression and the run exits with status 1; a baseline of another workload
+exits with status 2 rather than passing unchecked. Refresh a baseline on the
+reference machine with --save-baseline after an intended change. CI records a
+--quick baseline from the pull request's base commit on the same runner and
+compares the head against it.
+
+Usage: python benchmarks/suite.py [--quick] [--stages clean_text,chunking] [--output results.json]
+                                  [--baseline baseline-quick.json] [--save-baseline] [--tolerance 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Add backend directory to python path to resolve imports
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import numpy as np
+
+from config import Config
+from modules import ocr, processor_interface, retrieval
+from modules.bm25 import BM25Index
+from modules.chunks import Chunks
+from benchmarks.synthetic_pdf import WORDS, write_pdf
+
+BASELINE_TEMPLATE = os.path.join(BENCHMARKS_DIR, "baseline-{mode}.json")  # default baseline per mode
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "results.json")
+QUALITY_TOLERANCE = 0.02  # absolute drop in word recall treated as a regression
+DIMENSION = 384  # all-MiniLM-L6-v2
+
+# Input sizes per mode; results are only compared against a baseline of the same workload
+WORKLOADS = {
+    "full": {
+        "repeats": 3, "text_pages": 20, "scanned_pages": 4, "mixed_pages": 10, "text_mb": 8,
+        "embedding_chunks": 256, "retrieval_chunks": 20000, "queries": 200,
+    },
+    "quick": {
+        "repeats": 5, "text_pages": 5, "scanned_pages": 2, "mixed_pages": 4, "text_mb": 2,
+        "embedding_chunks": 64, "retrieval_chunks": 5000, "queries": 50,
+    },
+}
+
+class Skipped(Exception):
+    """A stage cannot run here, e.g. because a tool is not installed."""
+
+def synthetic_text(megabytes: float, rng: random.Random) -> str:
+    """Raw extracted-looking text: sentences with stray symbols, accents and blank lines."""
+    noise = ["", "", "", " •", " ©", " —", "  ", "\n\n", " (é)", " $4.20"]
+    parts, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + rng.choice(noise) + ". "
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)
+
+def word_recall(truth: List[str], extracted: List[str]) -> float:
+    """Share of the true words (with multiplicity) found in the extracted text."""
+    expected = Counter(word.lower().strip(".") for text in truth for word in text.split())
+    found = Counter(word.lower().strip(".") for text in extracted for word in text.split())
+    return sum(min(count, found[word]) for word, count in expected.items()) / max(1, sum(expected.values()))
+
+def _require_extraction_tools(needs_ocr: bool):
+    for tool in ("pdftotext", "pdfinfo", "pdftoppm"):
+        if shutil.which(ocr._poppler_command(tool, Config.POPPLER_PATH)) is None:
+            raise Skipped(f"poppler ({tool}) not installed")
+    if needs_ocr:
+        try:
+            ocr.pytesseract.get_tesseract_version()
+        except (ocr.pytesseract.TesseractNotFoundError, OSError):
+            raise Skipped("tesseract not installed")
+
+def extraction_stage(kind: str, pages_key: str):
+    def run(workload: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+        _require_extraction_tools(needs_ocr=kind != "text")
+        pages = workload[pages_key]
+        path = os.path.join(workdir, f"{kind}.pdf")
+        truth = write_pdf(path, pages, kind)
+        seconds, recall = [], 0.0
+        for _ in range(workload["repeats"]):
+            started = time.perf_counter()
+            extracted = ocr.extract_pages(path, poppler_path=Config.POPPLER_PATH, max_workers=Config.OCR_WORKERS)
+            seconds.append(time.perf_counter() - started)
+            recall = word_recall(truth, [page["text"] for page in extracted])
+        return {"items": pages, "unit": "pages", "seconds": seconds, "quality": {"word_recall": recall}}
+    return run
+
+def _timed(workload: Dict[str, Any], function: Callable[[], Any]) -> List[float]:
+    seconds = []
+    for _ in range(workload["repeats"]):
+        started = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - started)
+    return seconds
+
+def clean_text_stage(workload: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+    text = synthetic_text(workload["text_mb"], random.Random(0))
+    seconds = _timed(workload, lambda: processor_interface.clean_text(text))
+    return {"items": len(text.encode()) / 1024 / 1024, "unit": "MB", "seconds": seconds}
+
+def _chunk(text: str) -> Chunks:
+    return Chunks.split(text, Config.CHUNK_SIZE, Config.OVERLAP_SIZE, Config.CHUNK_SNAP_TO_SENTENCE)
+
+def chunking_stage(workload: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+    text = processor_interface.clean_text(synthetic_text(workload["text_mb"], random.Random(0)))
+    seconds = _timed(workload, lambda: _chunk(text))
+    return {"items": len(text.encode()) / 1024 / 1024, "unit": "MB", "seconds": seconds}
+
+def embedding_stage(workload: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+    if not os.path.exists(os.path.join(Config.EMBEDDING_MODEL_DIR, "modules.json")):
+        # Downloading would make the timing depend on the network
+        raise Skipped(f"no saved embedding model in {Config.EMBEDDING_MODEL_DIR}")
+    from modules.embedding_backends import create_backend
+    backend = create_backend(
+        Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL, model_dir=Config.EMBEDDING_MODEL_DIR,
+        batch_size=Config.EMBEDDING_BATCH_SIZE, threads=Config.EMBEDDING_THREADS
+    )
+    chunks = list(_chunk(processor_interface.clean_text(synthetic_text(1, random.Random(0)))))
+    chunks = (chunks * (workload["embedding_chunks"] // len(chunks) + 1))[:workload["embedding_chunks"]]
+    backend.encode(chunks[:Config.EMBEDDING_BATCH_SIZE])  # warm-up
+    seconds = _timed(workload, lambda: backend.encode(chunks))
+    return {"items": len(chunks), "unit": "chunks", "seconds": seconds}
+
+def _retrieval_corpus(workload: Dict[str, Any]):
+    rng = np.random.default_rng(0)
+    words = random.Random(0)
+    texts = [" ".join(words.choice(WORDS) for _ in range(60)) for _ in range(workload["retrieval_chunks"])]
+    embeddings = rng.standard_normal((len(texts), DIMENSION)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = [" ".join(words.choice(WORDS) for _ in range(6)) for _ in range(workload["queries"])]
+    query_embeddings = embeddings[rng.integers(0, len(texts), len(queries))]
+    return texts, embeddings, queries, query_embeddings
+
+def dense_retrieval_stage(workload: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+    _, embeddings, queries, query_embeddings = _retrieval_corpus(workload)
+
+    def search():
+        for query_embedding in query_embeddings:
+            retrieval.top_k(query_embedding, embeddings, Config.MAX_SEARCH_RESULTS)
+    return {"items": len(queries), "unit": "queries", "seconds": _timed(workload, search)}
+
+def hybrid_retrieval_stage(workload: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+    texts, embeddings, queries, query_embeddings = _retrieval_corpus(workload)
+    bm25 = BM25Index.build(texts)
+
+    def search():
+        for query, query_embedding in zip(queries, query_embeddings):
+            retrieval.hybrid_top_k(
+                query, query_embedding, embeddings, bm25, Config.MAX_SEARCH_RESULTS, mode=Config.RETRIEVAL_MODE,
+                fusion=Config.FUSION_METHOD, candidates=Config.BM25_CANDIDATES, rrf_k=Config.RRF_K,
+                dense_weight=Config.HYBRID_DENSE_WEIGHT
+            )
+    return {"items": len(queries), "unit": "queries", "seconds": _timed(workload, search)}
+
+STAGES: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {
+    "extract_text_pdf": extraction_stage("text", "text_pages"),
+    "extract_scanned_pdf": extraction_stage("scanned", "scanned_pages"),
+    "extract_mixed_pdf": extraction_stage("mixed", "mixed_pages"),
+    "clean_text": clean_text_stage,
+    "chunking": chunking_stage,
+    "embedding": embedding_stage,
+    "retrieval_dense": dense_retrieval_stage,
+    "retrieval_hybrid": hybrid_retrieval_stage,
+}
+
+def run_stages(names: List[str], mode: str) -> Dict[str, Any]:
+    workload = WORKLOADS[mode]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            try:
+                result = STAGES[name](workload, workdir)
+            except Skipped as e:
+                results[name] = {"skipped": str(e)}
+                continue
+            # The fastest run is the least disturbed by other load on the machine
+            best = min(result["seconds"])
+            results[name] = {
+                **result, "best_seconds": best, "median_seconds": statistics.median(result["seconds"]),
+                "throughput": result["items"] / best
+            }
+    return {
+        "meta": {
+            "mode": mode,
+            "workload": workload,
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embedding_backend": Config.EMBEDDING_BACKEND,
+            "retrieval_mode": Config.RETRIEVAL_MODE,
+        },
+        "results": results,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    One row per current stage with its status against the baseline:
+    "ok", "improved", "regression", "skipped", "new" (not in the baseline)
+    or "incomparable" (the baseline ran a different workload).
+    """
+    rows = []
+    same_workload = current["meta"]["workload"] == baseline["meta"]["workload"]
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        row = {"stage": name, "baseline": None, "current": result.get("throughput"), "change": None}
+        if "skipped" in result:
+            row["status"] = "skipped"
+        elif before is None or "skipped" in before:
+            row["status"] = "new"
+        elif not same_workload:
+            row["status"] = "incomparable"
+        else:
+            row["baseline"] = before["throughput"]
+            row["change"] = result["throughput"] / before["throughput"] - 1
+            quality_drops = [
+                metric for metric, value in result.get("quality", {}).items()
+                if value < before.get("quality", {}).get(metric, value) - QUALITY_TOLERANCE
+            ]
+            if row["change"] < -tolerance or quality_drops:
+                row["status"] = "regression"
+            elif row["change"] > tolerance:
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+def print_results(report: Dict[str, Any], rows: List[Dict[str, Any]] = None):
+    by_stage = {row["stage"]: row for row in rows or []}
+    print(f"mode {report['meta']['mode']}, {report['meta']['cpu_count']} CPUs")
+    print(f"{'stage':<20} {'throughput':>16} {'baseline':>10} {'change':>8}  status")
+    for name, result in report["results"].items():
+        row = by_stage.get(name, {})
+        if "skipped" in result:
+            print(f"{name:<20} {'-':>16} {'':>10} {'':>8}  skipped: {result['skipped']}")
+            continue
+        throughput = f"{result['throughput']:.1f} {result['unit']}/s"
+        baseline = f"{row['baseline']:.1f}" if row.get("baseline") else "-"
+        change = f"{row['change']:+.0%}" if row.get("change") is not None else "-"
+        quality = "".join(f" {metric}={value:.3f}" for metric, value in result.get("quality", {}).items())
+        print(f"{name:<20} {throughput:>16} {baseline:>10} {change:>8}  {row.get('status', '')}{quality}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small inputs (for CI)")
+    parser.add_argument("--stages", help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="JSON results to compare against (default: the mode's baseline)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative throughput drop")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.stages.split(",")] if args.stages else list(STAGES)
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    mode = "quick" if args.quick else "full"
+    baseline_path = args.baseline or BASELINE_TEMPLATE.format(mode=mode)
+    report = run_stages(names, mode)
+    rows = None
+    if not args.save_baseline and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        report["comparison"] = {"baseline": baseline_path, "tolerance": args.tolerance, "stages": rows}
+    elif not args.save_baseline:
+        print(f"No baseline at {baseline_path}; record one with --save-baseline", file=sys.stderr)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+    print_results(report, rows)
+    print(f"Results written to {args.output}" + (f", baseline saved to {baseline_path}" if args.save_baseline else ""))
+
+    if any(row["status"] == "incomparable" for row in rows or []):
+        print(f"{baseline_path} was recorded with another workload; re-record it in {mode} mode", file=sys.stderr)
+        return 2
+    regressions = [row["stage"] for row in rows or [] if row["status"] == "regression"]
+    if regressions:
+        print(f"PERFORMANCE REGRESSION in: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
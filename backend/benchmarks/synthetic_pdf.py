@@ -0,0 +1,130 @@
+"""
+Generates synthetic PDFs for benchmarking extraction without sample files:
+pages with a real text layer (what pdftotext reads), scanned pages holding
+only an image of the text (what Tesseract has to read), or a mix of both.
+Written by hand from the PDF primitives so only Pillow is needed.
+
+Usage: python benchmarks/synthetic_pdf.py <output.pdf> [pages] [text|scanned|mixed]
+"""
+import io
+import random
+import sys
+import zlib
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+KINDS = ("text", "scanned", "mixed")
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter in points
+DPI = 150  # resolution of scanned pages
+MARGIN = 72
+LINE_HEIGHT = 16
+WORDS_PER_LINE = 8
+WORDS = (
+    "agreement notice period thirty days overtime hours paid rate warranty months defects travel "
+    "expenses approval manager access badges renewed front desk invoices payable receipt employees "
+    "vacation accrue confidential information disclosed third parties contract clause termination "
+    "supplier delivery schedule quality inspection report signed annex payment terms penalty"
+).split()
+
+def page_kinds(pages: int, kind: str) -> List[str]:
+    """Kind of each page; mixed documents alternate text and scanned pages."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown PDF kind {kind!r}, expected one of: {', '.join(KINDS)}")
+    if kind == "mixed":
+        return ["text" if page % 2 == 0 else "scanned" for page in range(pages)]
+    return [kind] * pages
+
+def page_lines(rng: random.Random) -> List[str]:
+    """A page worth of sentence-like lines."""
+    count = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+    return [" ".join(rng.choice(WORDS) for _ in range(WORDS_PER_LINE)).capitalize() + "." for _ in range(count)]
+
+def _text_stream(lines: List[str]) -> bytes:
+    escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+    body = "".join(f"({line}) Tj T*\n" for line in escaped)
+    return f"BT /F1 11 Tf {LINE_HEIGHT} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td\n{body}ET".encode("latin-1")
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except (TypeError, OSError):
+        # Pillow without FreeType only has the small bitmap font
+        return ImageFont.load_default()
+
+def _scan(lines: List[str]) -> Image.Image:
+    """Render the lines as a grayscale page image, like a scanner would."""
+    scale = DPI / 72
+    image = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 255)
+    draw = ImageDraw.Draw(image)
+    font = _font(int(11 * scale))
+    for i, line in enumerate(lines):
+        draw.text((MARGIN * scale, (MARGIN + i * LINE_HEIGHT) * scale), line, fill=0, font=font)
+    return image
+
+def build_pdf(pages: int, kind: str = "mixed", seed: int = 0) -> Tuple[bytes, List[str]]:
+    """The PDF bytes and the true text of each page."""
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def add_stream(dictionary: str, data: bytes) -> int:
+        return add(f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream")
+
+    catalog = add(b"")  # filled in once the page tree exists
+    tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    page_ids, texts = [], []
+    for page_kind in page_kinds(pages, kind):
+        lines = page_lines(rng)
+        texts.append("\n".join(lines))
+        if page_kind == "text":
+            content = add_stream("", _text_stream(lines))
+            resources = f"<< /Font << /F1 {font} 0 R >> >>"
+        else:
+            image = _scan(lines)
+            pixels = add_stream(
+                f"/Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+                "/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode",
+                zlib.compress(image.tobytes())
+            )
+            content = add_stream("", f"q {PAGE_WIDTH} 0 0 {PAGE_HEIGHT} 0 0 cm /Im1 Do Q".encode())
+            resources = f"<< /XObject << /Im1 {pixels} 0 R >> >>"
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources {resources} /Contents {content} 0 R >>".encode()
+        ))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {tree} 0 R >>".encode()
+    kids = " ".join(f"{page} 0 R" for page in page_ids)
+    objects[tree - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    output.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+    output.write(f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return output.getvalue(), texts
+
+def write_pdf(path: str, pages: int, kind: str = "mixed", seed: int = 0) -> List[str]:
+    """Write a synthetic PDF to `path`, returning the true text of each page."""
+    data, texts = build_pdf(pages, kind, seed)
+    with open(path, "wb") as f:
+        f.write(data)
+    return texts
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    page_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    pdf_kind = sys.argv[3] if len(sys.argv) > 3 else "mixed"
+    write_pdf(sys.argv[1], page_count, pdf_kind)
+    print(f"Wrote {page_count} {pdf_kind} pages to {sys.argv[1]}")
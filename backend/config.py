@@ -39,10 +39,17 @@ class Config:
     
     CHROMA_DB_PATH = BASE_DIR / "chroma_db"
     TEMP_DIR = BASE_DIR / "temp"
+    INGEST_CACHE_DIR = BASE_DIR / "ingest_cache"
+    DATA_DIR = BASE_DIR / "data"
+    DOCUMENT_DB_PATH = DATA_DIR / "documents.sqlite3"  # document metadata
+    DOCUMENTS_DIR = DATA_DIR / "documents"  # per-document text, chunks and embeddings
+    JOB_DB_PATH = DATA_DIR / "jobs.sqlite3"  # ingestion job state shared by all workers
+    METRICS_DIR = DATA_DIR / "metrics"  # Prometheus samples of all workers when API_WORKERS > 1
     
     # API Settings
     API_HOST = "127.0.0.1"
     API_PORT = 8000
+    API_WORKERS = int(os.environ.get("API_WORKERS", 1))  # uvicorn worker processes, see CHROMA_SERVER_HOST
     
     # CORS Origins
     CORS_ORIGINS = [
@@ -53,23 +60,99 @@ class Config:
         "https://tauri.localhost"
     ]
     
+    # Ollama Settings
+    OLLAMA_BASE_URL = "http://localhost:11434"
+    OLLAMA_MODEL = "phi3:latest"
+    OLLAMA_TIMEOUT = 300  # seconds to wait for a generation
+    OLLAMA_CONNECT_TIMEOUT = 5
+    OLLAMA_KEEP_ALIVE = "30m"  # keep the model resident between requests
+    OLLAMA_HEALTH_TTL = 30  # seconds a successful health check is reused
+    OLLAMA_MAX_CONNECTIONS = 10  # pooled keep-alive connections
+    
     # SentenceTransformer Settings
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Fast and good for English
+    EMBEDDING_MODEL_DIR = BASE_DIR / "models" / EMBEDDING_MODEL  # saved here on first load, then used offline
+    EMBEDDING_BACKEND = "torch"  # "torch" (fp32) or "quantized" (dynamic int8, CPU only)
+    EMBEDDING_BATCH_SIZE = 32  # texts per forward pass when embedding chunks
+    EMBEDDING_THREADS = None  # PyTorch intra-op threads, defaults to the CPU count
+    EMBEDDING_WARMUP = True  # load the model and run a dummy encode in the background at startup
+    EMBEDDING_MAX_BATCH_SIZE = 32  # queries encoded per forward pass
+    EMBEDDING_MAX_WAIT_MS = 5  # how long a query waits for others to batch with
+    EMBEDDING_CACHE_SIZE = 1024  # repeated query strings kept in memory
     
     # Text Processing
     CHUNK_SIZE = 500  # words per chunk
     OVERLAP_SIZE = 50  # word overlap between chunks
+    CHUNK_SNAP_TO_SENTENCE = True  # end chunks at a sentence boundary where one is close
     MAX_SEARCH_RESULTS = 5
+    VECTOR_INDEX_COLLECTION = "document_chunks"  # Chroma collection holding every document's chunks
+    # Chroma server to use instead of the embedded database in CHROMA_DB_PATH. The embedded
+    # database is single-process, so more than one API worker requires a server
+    CHROMA_SERVER_HOST = os.environ.get("CHROMA_SERVER_HOST")
+    CHROMA_SERVER_PORT = int(os.environ.get("CHROMA_SERVER_PORT", 8001))
+    
+    # Retrieval
+    RETRIEVAL_MODE = "hybrid"  # "dense", "bm25" or "hybrid" (BM25 prunes, dense re-scores)
+    FUSION_METHOD = "weighted"  # "weighted" (min-max score mix) or "rrf" (reciprocal rank fusion)
+    BM25_CANDIDATES = 100  # chunks kept by BM25 for dense scoring in hybrid mode
+    RRF_K = 60  # rank offset of reciprocal rank fusion
+    HYBRID_DENSE_WEIGHT = 0.5  # share of the dense score with weighted fusion
+    
+    # Prompt Context
+    CONTEXT_CANDIDATES = 6  # chunks retrieved per question, packed into the prompt by relevance
+    CONTEXT_TOKEN_BUDGET = 1200  # estimated tokens of retrieved text per prompt
+    
+    # LLM Scheduling
+    LLM_MAX_CONCURRENCY = 1  # generations sent to Ollama at once per server process; match OLLAMA_NUM_PARALLEL
+    LLM_MAX_QUEUE = 16  # generations waiting for a slot before chat requests get 503
+    
+    # Answer Cache
+    ANSWER_CACHE_SIZE = 512  # chat answers kept per server process; 0 disables the cache
+    ANSWER_CACHE_TTL = 3600  # seconds a cached answer is reused
+    ANSWER_CACHE_SIMILARITY = 0.95  # query cosine similarity to reuse an answer from the same chunks; None disables
+    
+    # Chat Sessions
+    CHAT_SESSION_TTL = 1800  # seconds an idle chat session is kept
+    CHAT_SESSION_MAX = 256  # sessions kept per server process, least recently used dropped first
+    CHAT_SESSION_MAX_CONTEXT_TOKENS = 4096  # conversation kept before starting over; stay within the model's window
+    
+    # OCR Settings
+    NATIVE_TEXT_MIN_CHARS = 50  # pages with less embedded text than this are OCR'd
+    OCR_QUEUE_DEPTH = 8  # rendered pages waiting for OCR; bounds peak memory
+    OCR_WORKERS = None  # Tesseract threads, defaults to the CPU count
+    OCR_PROFILE = "balanced"  # "fast", "balanced", "accurate" or "adaptive" (see modules.ocr.OCR_PROFILES); per upload too
+    
+    # Progressive Indexing
+    PROGRESSIVE_INDEXING = True  # make documents searchable batch by batch while they are still being OCR'd
+    PROGRESSIVE_FIRST_BATCH = 4  # pages indexed before a new document first becomes searchable; batches then double
     
     # File Upload Limits
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
     ALLOWED_EXTENSIONS = ['.pdf']
     
+    # Background Ingestion
+    INGEST_WORKERS = 2  # documents processed concurrently
+    INGEST_QUEUE_SIZE = 16  # waiting uploads before /extract-text answers 429
+    JOB_RETENTION_SECONDS = 3600  # how long finished jobs stay queryable
+    JOB_CANCEL_TIMEOUT = 30  # seconds deleting a document waits for its ingest job to stop
+    JOB_HEARTBEAT_SECONDS = 10  # how often a worker vouches for the jobs it is running
+    JOB_STALE_SECONDS = 60  # a running job with no heartbeat for this long is failed as abandoned
+    
+    # Document Store
+    DOCUMENT_CACHE_SIZE = 16  # document bodies (chunks and embeddings) kept in memory
+    DOCUMENTS_PAGE_SIZE = 50  # default page size of GET /documents
+    
+    # Ingest Cache
+    INGEST_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1GB of cached artifacts
+    
     @classmethod
     def create_directories(cls):
         """Create necessary directories"""
         cls.CHROMA_DB_PATH.mkdir(exist_ok=True)
         cls.TEMP_DIR.mkdir(exist_ok=True)
+        cls.INGEST_CACHE_DIR.mkdir(exist_ok=True)
+        cls.DATA_DIR.mkdir(exist_ok=True)
+        cls.DOCUMENTS_DIR.mkdir(exist_ok=True)
     
     @classmethod 
     def validate_poppler_path(cls):
@@ -3,6 +3,8 @@
 #include <algorithm>
 #include <sstream>
 #include <cctype>
+#include <cstdint>
+#include <stdexcept>
 
 // Simple text processing functions
 
@@ -40,32 +42,149 @@ std::string clean_text(const std::string& input) {
     return cleaned.substr(start, end - start + 1);
 }
 
-std::vector<std::string> split_into_chunks(const std::string& text, int chunk_size) {
-    std::vector<std::string> chunks;
-    std::istringstream iss(text);
-    std::string word;
-    std::string current_chunk;
-    int word_count = 0;
-    
-    while (iss >> word) {
-        if (word_count > 0 && word_count % chunk_size == 0) {
-            chunks.push_back(current_chunk);
-            current_chunk = word;
-            word_count = 1;
+// Classifies a non-ASCII code point; supplied by the caller so the rules can
+// match Python's Unicode database exactly
+using CodepointPredicate = bool (*)(uint32_t);
+
+enum AsciiClass : unsigned char { ASCII_DROP, ASCII_SPACE, ASCII_KEEP };
+
+// Class of every ASCII byte, built once instead of calling locale-aware <cctype>
+static const struct AsciiTable {
+    AsciiClass classes[128];
+    AsciiTable() {
+        for (int c = 0; c < 128; ++c) {
+            bool space = c == ' ' || (c >= '\t' && c <= '\r') || (c >= 0x1c && c <= 0x1f);
+            bool kept = (c >= '0' && c <= '9') || (c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z')
+                || c == '_' || c == '.' || c == ',' || c == '!' || c == '?' || c == '-';
+            classes[c] = space ? ASCII_SPACE : kept ? ASCII_KEEP : ASCII_DROP;
+        }
+    }
+} ascii_table;
+
+// Decode the code point starting at data[i] (valid UTF-8) and advance i past it
+static inline uint32_t next_codepoint(const char* data, size_t size, size_t& i) {
+    unsigned char lead = static_cast<unsigned char>(data[i]);
+    size_t length = lead >= 0xF0 ? 4 : lead >= 0xE0 ? 3 : 2;
+    uint32_t codepoint = lead & (0x7F >> length);
+    for (size_t k = 1; k < length && i + k < size; ++k) {
+        codepoint = (codepoint << 6) | (static_cast<unsigned char>(data[i + k]) & 0x3F);
+    }
+    i += length;
+    return codepoint;
+}
+
+// Single-pass equivalent of re.sub(r'\s+', ' ') followed by
+// re.sub(r'[^\w\s.,!?-]', '') and clean_text(): runs of whitespace collapse to
+// one space, anything that is not a word character or basic punctuation is
+// dropped, and the result is trimmed. The output never grows, so it is
+// allocated once up front and written through a raw pointer.
+std::string normalize_text(const char* data, size_t size, CodepointPredicate is_word, CodepointPredicate is_space) {
+    std::string result(size, '\0');
+    char* out = &result[0];
+    char* const begin = out;
+    bool pending_space = false;
+
+    size_t i = 0;
+    while (i < size) {
+        unsigned char c = static_cast<unsigned char>(data[i]);
+        size_t start = i;
+        bool space, kept;
+        if (c < 0x80) {
+            ++i;
+            space = ascii_table.classes[c] == ASCII_SPACE;
+            kept = ascii_table.classes[c] == ASCII_KEEP;
         } else {
-            if (!current_chunk.empty()) {
-                current_chunk += " ";
+            uint32_t codepoint = next_codepoint(data, size, i);
+            space = is_space(codepoint);
+            kept = !space && is_word(codepoint);
+        }
+
+        if (space) {
+            pending_space = true;
+        } else if (kept) {
+            // Dropped characters leave the surrounding spacing untouched
+            if (pending_space && out != begin) {
+                *out++ = ' ';
+            }
+            pending_space = false;
+            while (start < i) {
+                *out++ = data[start++];
             }
-            current_chunk += word;
-            word_count++;
         }
     }
-    
-    if (!current_chunk.empty()) {
-        chunks.push_back(current_chunk);
+    result.resize(out - begin);
+    return result;
+}
+
+// Word-based overlapping chunker over a UTF-8 buffer. Returns the chunks as
+// flattened (start, end) code point offsets into the text, so callers slice
+// chunk text out only when they need it. Chunks hold `chunk_size` words and
+// consecutive chunks share `overlap` words. With `snap_to_sentence`, a chunk
+// is cut back to the last word ending a sentence, as long as that keeps it
+// long enough to advance by at least half the nominal step.
+std::vector<int64_t> chunk_spans(const char* data, size_t size, int chunk_size, int overlap,
+                                 bool snap_to_sentence, CodepointPredicate is_space) {
+    if (chunk_size <= 0 || overlap < 0 || overlap >= chunk_size) {
+        throw std::invalid_argument("chunk_size must be positive and overlap in [0, chunk_size)");
     }
-    
-    return chunks;
+
+    // Word boundaries in code points, and whether each word ends a sentence
+    std::vector<int64_t> word_starts, word_ends;
+    std::vector<bool> sentence_ends;
+    int64_t codepoint_index = 0;
+    bool in_word = false;
+    unsigned char last_byte = 0;
+    size_t i = 0;
+    while (i < size) {
+        unsigned char c = static_cast<unsigned char>(data[i]);
+        bool space;
+        if (c < 0x80) {
+            ++i;
+            space = ascii_table.classes[c] == ASCII_SPACE;
+        } else {
+            space = is_space(next_codepoint(data, size, i));
+        }
+        if (space && in_word) {
+            word_ends.push_back(codepoint_index);
+            sentence_ends.push_back(last_byte == '.' || last_byte == '!' || last_byte == '?');
+        } else if (!space && !in_word) {
+            word_starts.push_back(codepoint_index);
+        }
+        in_word = !space;
+        last_byte = c;
+        ++codepoint_index;
+    }
+    if (in_word) {
+        word_ends.push_back(codepoint_index);
+        sentence_ends.push_back(last_byte == '.' || last_byte == '!' || last_byte == '?');
+    }
+
+    const size_t words = word_starts.size();
+    const size_t size_words = static_cast<size_t>(chunk_size);
+    const size_t overlap_words = static_cast<size_t>(overlap);
+    const size_t min_length = std::max(size_words / 2, overlap_words + (size_words - overlap_words + 1) / 2);
+
+    std::vector<int64_t> spans;
+    spans.reserve(2 * (words / (size_words - overlap_words) + 1));
+    size_t start = 0;
+    while (start < words) {
+        size_t end = std::min(start + size_words, words);
+        if (snap_to_sentence && end < words) {
+            for (size_t last = end - 1; last + 1 >= start + min_length && last > start; --last) {
+                if (sentence_ends[last]) {
+                    end = last + 1;
+                    break;
+                }
+            }
+        }
+        spans.push_back(word_starts[start]);
+        spans.push_back(word_ends[end - 1]);
+        if (end == words) {
+            break;
+        }
+        start = std::max(end - overlap_words, start + 1);
+    }
+    return spans;
 }
 
 int count_words(const std::string& text) {
@@ -1,21 +1,41 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+_import_started = time.perf_counter()  # startup timing, taken before the imports below
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from modules import ocr
 from modules import processor_interface
-import shutil
+from modules import retrieval
+from modules import metrics
+from modules import pages as page_layout
+from modules import context_packer
+import asyncio
+import hashlib
+import json
 import os
 import tempfile
 import uuid
-from typing import Dict, Any, List, Optional
-from sentence_transformers import SentenceTransformer, util
+from typing import AsyncIterator, Dict, Any, Iterator, List, Optional, Sequence, Tuple
 import numpy as np
 from config import Config
-import chromadb
-from chromadb.config import Settings
 from modules.ollama_handler import OllamaHandler
+from modules.answer_cache import AnswerCache
+from modules.chat_sessions import ChatSessionStore
+from modules.llm_scheduler import LLMQueueFullError, LLMScheduler
+from modules.ingest_cache import IngestCache, hash_stream
+from modules.jobs import Job, JobCancelled, JobManager, JobStore, QueueFullError
+from modules.embedding_service import EmbeddingService
+from modules.vector_index import VectorIndex
+from modules.document_store import DocumentStore
+from modules.chunks import Chunks
+from modules.progressive_index import ProgressiveIndexer
+from modules.bm25 import BM25Index
+from modules.providers import Provider
 import logging
-import time
+from contextlib import asynccontextmanager, closing
 
 # Configure logging
 logging.basicConfig(
@@ -24,7 +44,50 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Seconds from the start of `import main` until it finished, and until warm-up completed
+startup_timings: Dict[str, Optional[float]] = {"import_seconds": None, "time_to_ready_seconds": None}
+
+async def _warm_up():
+    """Load the heavy components and run a dummy encode, so the first real request is not the slow one."""
+    try:
+        await vector_index.aget()
+        await (await embedding_service.aget()).encode("warm-up")
+    except Exception as e:
+        logger.error(f"Warm-up failed, components will be loaded on first use: {str(e)}")
+        return
+    startup_timings["time_to_ready_seconds"] = time.perf_counter() - _import_started
+    logger.info(f"Ready in {startup_timings['time_to_ready_seconds']:.2f}s "
+                f"(import {startup_timings['import_seconds']:.2f}s, "
+                f"embedding model {embedding_backend.seconds:.2f}s, vector index {vector_index.seconds:.2f}s)")
+
+def _discard_abandoned(job: Job):
+    """Remove the pages a job published before its server process stopped, so they do not pass for the document."""
+    metadata = document_store.get_metadata(job.document_id)
+    if metadata is not None and metadata["page_count"] < metadata["pages_total"]:
+        document_store.delete(job.document_id)
+        vector_index.get().delete_document(job.document_id)
+        logger.warning(f"Removed partial document {job.document_id} left by abandoned job {job.id}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs a previous run of this server (or a crashed worker) left unfinished
+    try:
+        await run_in_threadpool(ingest_jobs.reap)
+    except Exception as e:
+        logger.error(f"Could not reconcile abandoned jobs: {str(e)}")
+    # Neither task blocks startup: /health/live answers immediately, /health/ready once warm
+    background = [asyncio.create_task(ollama.start())]
+    if Config.EMBEDDING_WARMUP:
+        background.append(asyncio.create_task(_warm_up()))
+    yield
+    for task in background:
+        task.cancel()
+    await ollama.aclose()
+    metrics.mark_process_dead()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow frontend requests
 app.add_middleware(
@@ -35,6 +98,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts and latencies per route, for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Create necessary directories
 Config.create_directories()
 
@@ -44,70 +110,221 @@ if not Config.validate_poppler_path():
     print("Please install Poppler from: https://github.com/oschwartz10612/poppler-windows/releases/")
     print("After installation, make sure to add the Poppler bin directory to your PATH")
 
-# Store document metadata
-documents_store: Dict[str, Dict[str, Any]] = {}
+# Documents survive restarts and are shared by all workers; bodies are loaded on first use
+document_store = DocumentStore(Config.DOCUMENT_DB_PATH, Config.DOCUMENTS_DIR, Config.DOCUMENT_CACHE_SIZE)
+
+def _create_embedding_backend():
+    # torch and sentence_transformers are imported here, not at module import
+    from modules.embedding_backends import create_backend
+    return create_backend(
+        Config.EMBEDDING_BACKEND,
+        Config.EMBEDDING_MODEL,
+        model_dir=Config.EMBEDDING_MODEL_DIR,
+        batch_size=Config.EMBEDDING_BATCH_SIZE,
+        threads=Config.EMBEDDING_THREADS
+    )
+
+def _create_vector_index():
+    import chromadb
+    from chromadb.config import Settings
+    if Config.CHROMA_SERVER_HOST:
+        # Shared by every worker process
+        chroma_client = chromadb.HttpClient(
+            host=Config.CHROMA_SERVER_HOST,
+            port=Config.CHROMA_SERVER_PORT,
+            settings=Settings(anonymized_telemetry=False)
+        )
+    else:
+        chroma_client = chromadb.PersistentClient(
+            path=str(Config.CHROMA_DB_PATH),
+            settings=Settings(anonymized_telemetry=False)
+        )
+    return VectorIndex(chroma_client, Config.VECTOR_INDEX_COLLECTION)
 
-# Load the sentence transformer model
-model = SentenceTransformer(Config.EMBEDDING_MODEL)
+# Heavy components are built on first use (or by the startup warm-up), not at import
+# Embedding model on the configured backend
+embedding_backend = Provider("embedding_model", _create_embedding_backend)
 
-# Initialize ChromaDB
-chroma_client = chromadb.Client(Settings(
-    persist_directory="chroma_db",
-    anonymized_telemetry=False
+# Batches concurrent query encodes into single forward passes off the event loop
+embedding_service = Provider("embedding_service", lambda: EmbeddingService(
+    embedding_backend.get(),
+    max_batch_size=Config.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=Config.EMBEDDING_MAX_WAIT_MS,
+    cache_size=Config.EMBEDDING_CACHE_SIZE
 ))
 
-# Create or get collection
-collection = chroma_client.get_or_create_collection("pdf_documents")
+# ANN index over the chunks of every document, for library-wide search
+vector_index = Provider("vector_index", _create_vector_index)
+
+# Cache of ingest artifacts keyed by the hash of the uploaded PDF
+ingest_cache = IngestCache(Config.INGEST_CACHE_DIR, Config.INGEST_CACHE_MAX_BYTES)
+
+# Background ingestion workers, kept off the event loop; job state is shared with the other
+# server processes so any of them can report on or cancel a job
+ingest_jobs = JobManager(
+    max_workers=Config.INGEST_WORKERS,
+    max_queue=Config.INGEST_QUEUE_SIZE,
+    retention=Config.JOB_RETENTION_SECONDS,
+    store=JobStore(Config.JOB_DB_PATH),
+    on_change=lambda manager: metrics.observe_jobs(manager.counts()),
+    heartbeat_seconds=Config.JOB_HEARTBEAT_SECONDS,
+    stale_seconds=Config.JOB_STALE_SECONDS,
+    on_abandoned=lambda job: _discard_abandoned(job)
+)
 
 # Initialize Ollama handler
-ollama = OllamaHandler(model_name="phi3:latest")
+ollama = OllamaHandler(
+    model_name=Config.OLLAMA_MODEL,
+    base_url=Config.OLLAMA_BASE_URL,
+    timeout=Config.OLLAMA_TIMEOUT,
+    connect_timeout=Config.OLLAMA_CONNECT_TIMEOUT,
+    keep_alive=Config.OLLAMA_KEEP_ALIVE,
+    health_ttl=Config.OLLAMA_HEALTH_TTL,
+    max_connections=Config.OLLAMA_MAX_CONNECTIONS
+)
+
+# Bounds the generations running on Ollama, queueing the rest fairly across clients
+llm_scheduler = LLMScheduler(max_concurrency=Config.LLM_MAX_CONCURRENCY, max_queue=Config.LLM_MAX_QUEUE)
+
+# Generated answers, reused for repeated and reworded questions over the same chunks
+answer_cache = AnswerCache(
+    max_entries=Config.ANSWER_CACHE_SIZE,
+    ttl_seconds=Config.ANSWER_CACHE_TTL,
+    similarity_threshold=Config.ANSWER_CACHE_SIMILARITY
+)
+
+# Multi-turn conversations that continue from Ollama's context instead of re-sending it
+chat_sessions = ChatSessionStore(
+    ttl_seconds=Config.CHAT_SESSION_TTL,
+    max_sessions=Config.CHAT_SESSION_MAX,
+    max_context_tokens=Config.CHAT_SESSION_MAX_CONTEXT_TOKENS
+)
+
+class SearchFilters(BaseModel):
+    document_ids: Optional[List[str]] = None
+    filename: Optional[str] = None
+    uploaded_after: Optional[float] = None  # unix timestamps
+    uploaded_before: Optional[float] = None
+    tags: Optional[List[str]] = None
+
+class SearchRequest(SearchFilters):
+    query: str
+    top_k: int = Config.MAX_SEARCH_RESULTS
 
 class ChatRequest(BaseModel):
     query: str
     document_id: str = None
+    library: bool = False  # answer from every document matching `filters` instead of one
+    filters: Optional[SearchFilters] = None
+    timings: bool = False  # include a per-stage timing breakdown in the response
+    session_id: Optional[str] = None  # continue (or start) a multi-turn conversation kept by the server
 
 class ChatResponse(BaseModel):
     response: str
     sources: list = []
+    retrieval: Optional[Dict[str, Any]] = None  # mode and per-stage timings of single-document retrieval
+    timings: Optional[Dict[str, Optional[float]]] = None  # seconds per stage, if requested
+    coverage: Optional[Dict[str, Any]] = None  # pages the answer could draw on, while a document is still being indexed
+    context: Optional[Dict[str, Any]] = None  # size of the packed prompt context and Ollama's prompt token count
+    cached: Optional[str] = None  # "exact" or "semantic" when the answer came from the answer cache
+    session: Optional[Dict[str, Any]] = None  # the chat session's turn count and whether Ollama continued it
 
-def split_text_into_chunks(text: str, chunk_size: int = 500) -> List[str]:
-    """Split text into overlapping chunks."""
-    words = text.split()
-    chunks = []
-    for i in range(0, len(words), chunk_size // 2):
-        chunk = ' '.join(words[i:i + chunk_size])
-        chunks.append(chunk)
-    return chunks
-
-def get_most_relevant_chunks(query: str, chunks: List[str], top_k: int = 3) -> List[str]:
-    """Get the most relevant chunks for a query using sentence transformers."""
-    query_embedding = model.encode(query, convert_to_tensor=True)
-    chunk_embeddings = model.encode(chunks, convert_to_tensor=True)
-    
-    # Calculate cosine similarity
-    similarities = util.pytorch_cos_sim(query_embedding, chunk_embeddings)[0]
+def chunking_settings() -> Dict[str, Any]:
+    return {
+        "chunk_size": Config.CHUNK_SIZE,
+        "overlap": Config.OVERLAP_SIZE,
+        "snap_to_sentence": Config.CHUNK_SNAP_TO_SENTENCE
+    }
+
+def embedding_settings() -> Dict[str, Any]:
+    """The model chunk embeddings are made with; embeddings of another cannot be mixed into the index."""
+    return {
+        "model": Config.EMBEDDING_MODEL,
+        "backend": Config.EMBEDDING_BACKEND,
+        "dimension": embedding_backend.get().dimension
+    }
+
+def split_text_into_chunks(text: str) -> Chunks:
+    """Split text into overlapping chunks, kept as character spans into `text`."""
+    return Chunks.split(text, **chunking_settings())
+
+def split_pages_into_chunks(text: str, pages: List[Dict[str, Any]]) -> Chunks:
+    """Split each page of a text assembled by modules.pages into chunks of its own."""
+    return page_layout.split(text, pages, **chunking_settings())
+
+def embed_chunks(chunks: Chunks) -> np.ndarray:
+    """Encode chunks into L2-normalized embeddings, once per document at ingest."""
+    return embedding_service.get().encode_many(chunks)
+
+def embed_chunks_reusing(chunks: Sequence[str], previous: Dict[str, Any]) -> Tuple[np.ndarray, int]:
+    """
+    Encode the chunks of a new document version, copying the embedding of
+    every chunk whose text the previous version already had. Returns the
+    embeddings and how many of them were reused.
+    """
+    service = embedding_service.get()
+    dimension = service.backend.dimension
+    known = {}
+    # Embeddings of another model cannot be mixed in
+    if previous["embeddings"].shape[1:] == (dimension,):
+        for index, text in enumerate(previous["chunks"]):
+            known.setdefault(text, index)
+
+    embeddings = np.empty((len(chunks), dimension), dtype=np.float32)
+    missing = []
+    for index, text in enumerate(chunks):
+        if text in known:
+            embeddings[index] = previous["embeddings"][known[text]]
+        else:
+            missing.append(index)
+    if missing:
+        embeddings[missing] = service.encode_many([chunks[index] for index in missing])
+    return embeddings, len(chunks) - len(missing)
+
+def _chunk_metadata(chunks: Chunks, index: int, chunk_pages: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    char_start, char_end = chunks.span(index)
+    metadata = {"chunk_index": index, "char_start": char_start, "char_end": char_end}
+    if chunk_pages is not None:
+        metadata["page"] = int(chunk_pages[index])
+    return metadata
+
+async def get_most_relevant_chunks(query: str, document: Dict[str, Any],
+                                   top_k: int = Config.CONTEXT_CANDIDATES) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Get the most relevant chunks for a query from the document's BM25 index
+    and precomputed embeddings (see Config.RETRIEVAL_MODE), with the time
+    spent in each retrieval stage.
+    """
+    started = time.perf_counter()
+    stages = {}
+    with metrics.timed("chat", "query_embed", stages):
+        query_embedding = await (await embedding_service.aget()).encode(query)
+    with metrics.timed("chat", "retrieval"):
+        hits, timings = retrieval.hybrid_top_k(
+            query, query_embedding, document["embeddings"], document["bm25"], top_k,
+            mode=Config.RETRIEVAL_MODE,
+            fusion=Config.FUSION_METHOD,
+            candidates=Config.BM25_CANDIDATES,
+            rrf_k=Config.RRF_K,
+            dense_weight=Config.HYBRID_DENSE_WEIGHT
+        )
+    timings["embed_seconds"] = stages["query_embed_seconds"]
+    timings["total_seconds"] = time.perf_counter() - started
+    logger.debug(f"Retrieval timings: {timings}")
     
-    # Get top k chunks
-    top_indices = similarities.argsort(descending=True)[:top_k]
-    return [chunks[i] for i in top_indices]
-
-def generate_summary(text: str) -> str:
-    """Generate a summary using sentence transformers."""
-    chunks = split_text_into_chunks(text)
-    if not chunks:
+    chunks = document["chunks"]
+    return [{
+        "text": chunks[hit["index"]],
+        "similarity": hit["similarity"],
+        "metadata": _chunk_metadata(chunks, hit["index"], document.get("chunk_pages"))
+    } for hit in hits], timings
+
+def generate_summary(document: Dict[str, Any]) -> str:
+    """Generate a summary by picking the chunk closest to the mean embedding."""
+    if not document["chunks"]:
         return "No text content found to summarize."
     
-    # Get embeddings for all chunks
-    chunk_embeddings = model.encode(chunks, convert_to_tensor=True)
-    
-    # Calculate mean embedding
-    mean_embedding = chunk_embeddings.mean(dim=0)
-    
-    # Find the chunk most similar to the mean embedding
-    similarities = util.pytorch_cos_sim(mean_embedding.unsqueeze(0), chunk_embeddings)[0]
-    most_representative_idx = similarities.argmax().item()
-    
-    return chunks[most_representative_idx]
+    return document["chunks"][retrieval.most_representative(document["embeddings"])]
 
 @app.get("/")
 def read_root():
@@ -119,177 +336,856 @@ def add_numbers(a: int, b: int):
     result = processor_interface.add(a, b)
     return {"result": result}
 
-@app.post("/extract-text")
-async def extract_text_from_pdf(file: UploadFile = File(...)):
-    """Extract text from PDF and store in vector database"""
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-    
-    # Generate unique document ID
-    document_id = str(uuid.uuid4())
-    
+def _save_upload(source) -> tuple:
+    """Stream an upload to a temp file, hashing it on the way so repeat uploads hit the cache."""
     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-        shutil.copyfileobj(file.file, temp_file)
-        temp_path = temp_file.name
+        content_hash = hash_stream(source, temp_file)
+        return temp_file.name, content_hash
+
+def _index_document(document_id: str, filename: str, tags: List[str], cleaned_text: str,
+                    pages: List[Dict[str, Any]], chunks: Chunks, embeddings: np.ndarray, content_hash: str,
+                    uploaded_at: float, version: int = 1, pages_total: Optional[int] = None,
+                    indexed_chunks: int = 0) -> int:
+    """
+    Persist a document and index its chunks (dense and BM25), returning its
+    word count. The first `indexed_chunks` chunks are already in the vector
+    index, from an earlier publish of the same document.
+    """
+    word_count = processor_interface.count_words(cleaned_text)
+    answer_cache.invalidate_document(document_id)
+    chat_sessions.invalidate_document(document_id)
+    index = vector_index.get()
+    if version > 1:
+        index.delete_document(document_id)
+    index.add_document(
+        document_id, filename, chunks, embeddings, uploaded_at=uploaded_at, tags=tags, spans=chunks.spans,
+        pages=page_layout.chunk_pages(chunks.spans, pages), start=indexed_chunks
+    )
+    document_store.add(
+        document_id, filename, cleaned_text, chunks.spans, embeddings,
+        word_count=word_count, uploaded_at=uploaded_at, tags=tags, content_hash=content_hash,
+        bm25=BM25Index.build(chunks), version=version, pages=pages, pages_total=pages_total
+    )
+    return word_count
+
+def _store_document(document_id: str, filename: str, tags: List[str], cleaned_text: str,
+                    pages: List[Dict[str, Any]], chunks: Chunks, embeddings: np.ndarray, content_hash: str,
+                    cache_hit: bool, start_time: float, timings: Optional[Dict[str, float]] = None,
+                    version: int = 1, uploaded_at: Optional[float] = None, indexed_chunks: int = 0) -> Dict[str, Any]:
+    """
+    Register a processed document, persist and index its chunks and build the
+    ingest response, including the seconds spent in each stage so far
+    (`timings`). A `version` above 1 replaces the stored document of the same
+    ID; `uploaded_at` and `indexed_chunks` complete a document published
+    while it was being extracted.
+    """
+    timings = {} if timings is None else timings
+    uploaded_at = time.time() if uploaded_at is None else uploaded_at
+    with metrics.timed("ingest", "index", timings):
+        word_count = _index_document(
+            document_id, filename, tags, cleaned_text, pages, chunks, embeddings, content_hash, uploaded_at,
+            version=version, indexed_chunks=indexed_chunks
+        )
+    timings["total_seconds"] = time.time() - start_time
     
+    return {
+        "document_id": document_id,
+        "version": version,
+        "filename": filename,
+        "extracted_text": cleaned_text,
+        "word_count": word_count,
+        "status": "success",
+        "message": "Document processed and ready for chat",
+        "processing_time": time.time() - start_time,
+        "timings": timings,
+        "content_hash": content_hash,
+        "cache": {"hit": cache_hit, **ingest_cache.stats()},
+        "extraction": ocr.summarize_pages(pages),
+        "pages": [
+            {"page": page["page"], "source": page["source"], "seconds": page["seconds"],
+             "reused": page.get("reused", False)}
+            for page in pages
+        ]
+    }
+
+def _known_pages(document: Dict[str, Any]) -> Dict[str, str]:
+    """The OCR'd text of a stored document's scanned pages by page hash, so unchanged scans skip OCR."""
+    return {
+        page["hash"]: document["text"][page["char_start"]:page["char_end"]]
+        for page in document["pages"] if page.get("source") == "ocr" and page.get("hash")
+    }
+
+def _check_not_deleted(job: Job, stored: bool):
+    """Stop an ingest whose document was deleted since it was `stored` (published or replaced)."""
+    if stored and document_store.get_metadata(job.document_id) is None:
+        raise JobCancelled()
+
+def _publish_partial(job: Job, tags: List[str], content_hash: str, uploaded_at: float,
+                     indexer: ProgressiveIndexer):
+    """Make the pages indexed so far searchable and answerable while the rest are extracted."""
+    _check_not_deleted(job, indexer.published_at is not None)
+    chunks = indexer.chunks
+    _index_document(
+        job.document_id, job.filename, tags, indexer.text, indexer.pages, chunks, indexer.embeddings, content_hash,
+        uploaded_at, pages_total=indexer.pages_total, indexed_chunks=indexer.published_chunks
+    )
+    job.update(pages_indexed=len(indexer.pages))
+
+def _extracted_pages(pages: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Pass extracted pages through, reporting extraction failures as such.
+    Errors raised while a page is indexed happen in the caller's loop, not
+    here, and keep their own message.
+    """
+    try:
+        yield from pages
+    except JobCancelled:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Failed to process PDF: {str(e)}. Please make sure Poppler is properly installed.")
+
+def _ingest_document(job: Job, temp_path: str, content_hash: str, tags: List[str],
+                     replace: bool = False, ocr_profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs on an ingest worker: extracts, cleans and indexes one upload, reading
+    scanned pages with `ocr_profile`. Pages are indexed in batches as they
+    are extracted and, with Config.PROGRESSIVE_INDEXING, the document can be
+    searched and chatted with from the first batch on.
+
+    With `replace`, the upload is a new version of the job's stored document,
+    which keeps answering until the new version is complete: pages whose
+    content is unchanged are not OCR'd again and chunks whose text is
+    unchanged keep their embeddings.
+    """
     start_time = time.time()
+    uploaded_at = start_time
+    timings = {}
+    previous = document_store.get(job.document_id) if replace else None
+    chunks_reused = 0
+    
+    def embed(texts: List[str]) -> np.ndarray:
+        nonlocal chunks_reused
+        if previous is None:
+            return embedding_service.get().encode_many(texts)
+        embeddings, reused = embed_chunks_reusing(texts, previous)
+        chunks_reused += reused
+        return embeddings
+    
+    publish = None
+    if Config.PROGRESSIVE_INDEXING and not replace:
+        publish = lambda indexer: _publish_partial(job, tags, content_hash, uploaded_at, indexer)
+    indexer = ProgressiveIndexer(
+        chunking_settings(), embed, publish, first_batch=Config.PROGRESSIVE_FIRST_BATCH
+    )
+    
+    def on_page_count(count: int):
+        indexer.pages_total = count
+        job.update(pages_total=count)
+    
     try:
-        # Extract text using OCR
-        try:
-            extracted_text = ocr.extract_text_from_pdf(temp_path, poppler_path=Config.POPPLER_PATH)
-            if not extracted_text or len(extracted_text.strip()) == 0:
-                return {
-                    "error": "Failed to extract text from PDF",
-                    "status": "error",
-                    "details": "The PDF might be empty, corrupted, or contain only images. Please check the file and try again.",
-                    "processing_time": 0
-                }
-        except Exception as e:
-            return {
-                "error": "PDF processing error",
-                "status": "error",
-                "details": f"Failed to process PDF: {str(e)}. Please make sure Poppler is properly installed.",
-                "processing_time": 0
-            }
+        if replace and previous is None:
+            raise ValueError("The document was deleted before its new version was processed.")
+        job.update(stage="extracting")
+        extract_started = time.perf_counter()
+        page_stream = _extracted_pages(ocr.iter_pages(
+            temp_path,
+            poppler_path=Config.POPPLER_PATH,
+            min_native_chars=Config.NATIVE_TEXT_MIN_CHARS,
+            queue_depth=Config.OCR_QUEUE_DEPTH,
+            max_workers=Config.OCR_WORKERS,
+            on_page_count=on_page_count,
+            known_pages=_known_pages(previous) if previous else None,
+            profile=ocr_profile
+        ))
+        # closing() stops the OCR pipeline as soon as the job is cancelled
+        with closing(page_stream):
+            for pages_done, page in enumerate(page_stream, start=1):
+                job.update(pages_done=pages_done)
+                # OCR of the next pages carries on in the background meanwhile
+                indexer.add(page)
         
-        # Clean text using C++ bindings
-        cleaned_text = processor_interface.clean_text(extracted_text)
+        # Indexing the batches ran on this thread while later pages were extracted
+        timings["extract_seconds"] = time.perf_counter() - extract_started - indexer.busy_seconds
+        job.update(stage="indexing")
+        indexer.finish()
+        pages = indexer.pages
+        metrics.STAGE_SECONDS.labels("ingest", "extract").observe(timings["extract_seconds"])
+        metrics.observe_pages(pages, timings["extract_seconds"])
         
-        # Store document metadata
-        documents_store[document_id] = {
-            "filename": file.filename,
-            "text": cleaned_text,
-            "word_count": processor_interface.count_words(cleaned_text)
-        }
+        if not any(page["text"].strip() for page in pages):
+            raise ValueError("Failed to extract text from PDF. The PDF might be empty, corrupted, or contain only images.")
         
-        end_time = time.time()
-        processing_time = end_time - start_time
+        for stage in ("clean", "chunk", "embed"):
+            timings[f"{stage}_seconds"] = indexer.timings[f"{stage}_seconds"]
+            metrics.STAGE_SECONDS.labels("ingest", stage).observe(timings[f"{stage}_seconds"])
+        if indexer.published_at is not None:
+            timings["publish_seconds"] = indexer.timings["publish_seconds"]
+            timings["first_searchable_seconds"] = indexer.published_at - extract_started
         
-        return {
-            "document_id": document_id,
-            "filename": file.filename,
-            "extracted_text": cleaned_text,
-            "word_count": documents_store[document_id]["word_count"],
-            "status": "success",
-            "message": "Document processed and ready for chat",
-            "processing_time": processing_time
-        }
+        chunks, embeddings = indexer.chunks, indexer.embeddings
+        ingest_cache.put(
+            content_hash,
+            pages=pages,
+            cleaned_text=indexer.text,
+            spans=chunks.spans,
+            embeddings=embeddings,
+            source_bytes=os.path.getsize(temp_path),
+            chunking=chunking_settings(),
+            ocr_profile=ocr_profile,
+            embedding=embedding_settings()
+        )
         
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        return {
-            "error": str(e),
-            "traceback": tb,
-            "status": "error",
-            "message": "Failed to process document",
-            "processing_time": 0
-        }
+        _check_not_deleted(job, indexer.published_at is not None or previous is not None)
+        result = _store_document(
+            job.document_id, job.filename, tags, indexer.text, pages, chunks, embeddings, content_hash, False,
+            start_time, timings, version=previous["version"] + 1 if previous else 1, uploaded_at=uploaded_at,
+            indexed_chunks=indexer.published_chunks
+        )
+        job.update(pages_indexed=len(pages))
+        if previous:
+            scanned = [page for page in pages if page["source"] == "ocr"]
+            result["incremental"] = {
+                "previous_version": previous["version"],
+                "pages_reused": sum(1 for page in scanned if page.get("reused")),
+                "pages_ocr": sum(1 for page in scanned if not page.get("reused")),
+                "chunks_reused": chunks_reused,
+                "chunks_embedded": len(chunks) - chunks_reused
+            }
+        return result
+    except Exception:
+        # Do not leave the pages published so far behind as if they were the whole document
+        if indexer.published_at is not None:
+            document_store.delete(job.document_id)
+            vector_index.get().delete_document(job.document_id)
+        raise
     finally:
         os.remove(temp_path)
 
+def _parse_tags(tags: str) -> List[str]:
+    """Comma-separated labels usable as search filters."""
+    return [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+def _resolve_ocr_profile(name: Optional[str]) -> str:
+    """The OCR profile asked for by an upload, or the configured one."""
+    profile = name or Config.OCR_PROFILE
+    try:
+        ocr.get_profile(profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profile
+
+def _read_with_other_profile(cached: Dict[str, Any], profile: str) -> bool:
+    """Whether a cached extraction OCR'd pages with another profile than the one asked for."""
+    return cached["ocr_profile"] not in (None, profile) and any(page["source"] == "ocr" for page in cached["pages"])
+
+@app.post("/extract-text")
+async def extract_text_from_pdf(file: UploadFile = File(...), tags: str = Form(""),
+                                ocr_profile: Optional[str] = Form(None)):
+    """
+    Queue a PDF for text extraction and indexing, returning its job and
+    document IDs right away. `ocr_profile` picks how scanned pages are read
+    (see Config.OCR_PROFILE).
+    """
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    
+    tag_list = _parse_tags(tags)
+    profile = _resolve_ocr_profile(ocr_profile)
+    
+    # Generate unique document ID
+    document_id = str(uuid.uuid4())
+    
+    start_time = time.time()
+    temp_path, content_hash = await run_in_threadpool(_save_upload, file.file)
+    
+    cached = await run_in_threadpool(ingest_cache.get, content_hash)
+    if cached is not None and not _read_with_other_profile(cached, profile):
+        os.remove(temp_path)
+        timings = {}
+        cleaned_text = cached["cleaned_text"]
+        chunks = Chunks(cleaned_text, cached["spans"])
+        embeddings = cached["embeddings"]
+        # Chunk settings changed since the entry was cached, or it predates page layouts: re-chunk its pages
+        if cached["chunking"] != chunking_settings() or not page_layout.has_layout(cached["pages"]):
+            with metrics.timed("ingest", "chunk", timings):
+                cleaned_text = page_layout.assemble(cached["pages"])
+                chunks = split_pages_into_chunks(cleaned_text, cached["pages"])
+            embeddings = None
+        # Embedded by another model or backend than the one indexing now
+        elif cached["embedding"] != await run_in_threadpool(embedding_settings):
+            embeddings = None
+        if embeddings is None:
+            with metrics.timed("ingest", "embed", timings):
+                embeddings = await run_in_threadpool(embed_chunks, chunks)
+        return await run_in_threadpool(
+            _store_document, document_id, file.filename, tag_list, cleaned_text, cached["pages"],
+            chunks, embeddings, content_hash, True, start_time, timings
+        )
+    
+    job = Job(document_id, file.filename)
+    try:
+        ingest_jobs.submit(
+            job, lambda job: _ingest_document(job, temp_path, content_hash, tag_list, ocr_profile=profile)
+        )
+    except QueueFullError as e:
+        os.remove(temp_path)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "document_id": document_id,
+        "filename": file.filename,
+        "content_hash": content_hash,
+        "ocr_profile": profile,
+        "status": job.status,
+        "message": "Document queued for processing",
+        "cache": {"hit": False, **ingest_cache.stats()}
+    })
+
+@app.post("/documents/{document_id}/versions")
+async def upload_document_version(document_id: str, file: UploadFile = File(...), tags: Optional[str] = Form(None),
+                                  ocr_profile: Optional[str] = Form(None)):
+    """
+    Queue a new version of a document, returning its job right away. Only the
+    pages that changed are OCR'd and only chunks with new text are embedded;
+    the previous version keeps answering until the new one is stored. Tags are
+    kept unless given. Scanned pages are only recognized as unchanged when
+    read with the same `ocr_profile` as before.
+    """
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    profile = _resolve_ocr_profile(ocr_profile)
+    metadata = document_store.get_metadata(document_id)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    running = ingest_jobs.find_by_document(document_id)
+    if running is not None and not running.finished:
+        raise HTTPException(status_code=409, detail=f"Document is already being processed by job {running.id}")
+    
+    tag_list = metadata["tags"] if tags is None else _parse_tags(tags)
+    temp_path, content_hash = await run_in_threadpool(_save_upload, file.file)
+    job = Job(document_id, file.filename)
+    try:
+        ingest_jobs.submit(job, lambda job: _ingest_document(
+            job, temp_path, content_hash, tag_list, replace=True, ocr_profile=profile
+        ))
+    except QueueFullError as e:
+        os.remove(temp_path)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "document_id": document_id,
+        "version": metadata["version"] + 1,
+        "filename": file.filename,
+        "content_hash": content_hash,
+        "ocr_profile": profile,
+        "status": job.status,
+        "message": "New document version queued for processing"
+    })
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Report the progress of an ingestion job"""
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream job progress as Server-Sent Events until the job finishes"""
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        nonlocal job
+        last = None
+        while True:
+            # Jobs run by another worker are only seen through fresh snapshots
+            job = ingest_jobs.get(job_id) or job
+            snapshot = job.to_dict()
+            progress = {key: value for key, value in snapshot.items() if key != "eta_seconds"}
+            if progress != last:
+                yield f"data: {json.dumps(snapshot)}\n\n"
+                last = progress
+            if job.finished:
+                break
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued or running ingestion job"""
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not ingest_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return {"message": f"Job {job_id} cancellation requested"}
+
+def _find_chat_document(doc_id: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Look up the document to chat with, or explain why it is not available.
+    Blocking (a body-cache miss reads the document from disk), so it runs on
+    the threadpool.
+    """
+    document = document_store.get(doc_id) if doc_id else None
+    if document is not None and document["page_count"] >= document["pages_total"]:
+        return document, None
+    # Missing or partial: its ingest job tells whether more is coming
+    job = ingest_jobs.find_by_document(doc_id) if doc_id else None
+    if document is not None and job is not None and job.finished:
+        # Finished since, or abandoned and its partial document removed
+        document = document_store.get(doc_id)
+    if document is None and job is not None and not job.finished:
+        return None, f"The document is still being processed ({job.pages_done}/{job.pages_total} pages). Please try again shortly."
+    if document is None:
+        return None, "No document found. Please upload a PDF first."
+    return document, None
+
+def _coverage(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """How many of a document's pages are indexed; fewer than all while it is still being extracted."""
+    if document is None:
+        return None
+    indexed = document["page_count"] or len(document["pages"])
+    total = max(document["pages_total"], indexed)
+    return {"pages_indexed": indexed, "pages_total": total, "complete": indexed >= total}
+
+def _is_summary_request(query: str) -> bool:
+    return "summarize" in query.lower() or "summary" in query.lower()
+
+def _summary_sources(document: Dict[str, Any]) -> List[Dict[str, Any]]:
+    chunk_pages = document.get("chunk_pages")
+    return [{
+        "text": chunk,
+        "similarity": 1.0,
+        "metadata": {"type": "summary", **({"page": int(chunk_pages[index])} if chunk_pages is not None else {})}
+    } for index, chunk in enumerate(document["chunks"][:3])]  # Include top 3 chunks as sources
+
+def _pack_context(relevant_chunks: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    The prompt context for the retrieved chunks (see modules.context_packer),
+    the chunks it drew on and its size report.
+    """
+    context, report = context_packer.pack(relevant_chunks, Config.CONTEXT_TOKEN_BUDGET)
+    used = [relevant_chunks[position] for position in report.pop("hits")]
+    report["chunks_retrieved"], report["chunks_used"] = len(relevant_chunks), len(used)
+    return context, used, report
+
+def _context_report(report: Optional[Dict[str, Any]], llm_timings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if report is None:
+        return None
+    return {**report, "prompt_tokens": llm_timings.get("prompt_tokens")}
+
+async def _answer_cache_key(request: ChatRequest, document: Optional[Dict[str, Any]], context: str) -> Dict[str, Any]:
+    """What a chat answer is cached under: its document (or the library), the model and the prompt."""
+    query_embedding = None
+    if answer_cache.enabled and answer_cache.similarity_threshold is not None:
+        query_embedding = await (await embedding_service.aget()).encode(request.query)
+    return {
+        "scope": document["document_id"] if document is not None else "library",
+        "model": ollama.model_name,
+        "prompt": ollama.build_prompt(request.query, context),
+        "context": context,
+        "query_embedding": query_embedding
+    }
+
+def _answer_documents(document: Optional[Dict[str, Any]], used_chunks: List[Dict[str, Any]]) -> List[str]:
+    """The documents an answer was drawn from, so it is dropped when one changes."""
+    if document is not None:
+        return [document["document_id"]]
+    return [chunk["metadata"]["document_id"] for chunk in used_chunks if "document_id" in chunk.get("metadata", {})]
+
+def _chunk_key(document: Optional[Dict[str, Any]], chunk: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Identifies a passage a chat session has sent the model: by its text, not
+    its position, so a changed passage of a re-ingested document counts as
+    new even in a worker that never saw the re-ingest invalidate its sessions.
+    """
+    metadata = chunk.get("metadata", {})
+    document_id = metadata.get("document_id", document["document_id"] if document else None)
+    return document_id, hashlib.sha256(chunk["text"].encode("utf-8")).hexdigest()
+
+def _open_session(request: ChatRequest, document: Optional[Dict[str, Any]], used_chunks: List[Dict[str, Any]],
+                  context: str) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+    """
+    The Ollama conversation of the request's chat session, the context to
+    send in it (only chunks the conversation has not seen, when it goes on)
+    and the session report of the response.
+    """
+    conversation, continued = chat_sessions.open(
+        request.session_id, document["document_id"] if document is not None else "library"
+    )
+    new_chunks = len(used_chunks)
+    if continued:
+        fresh = chat_sessions.new_chunks(request.session_id, [_chunk_key(document, chunk) for chunk in used_chunks])
+        unseen = [chunk for chunk, new in zip(used_chunks, fresh) if new]
+        context, _ = context_packer.pack(unseen, Config.CONTEXT_TOKEN_BUDGET)
+        new_chunks = len(unseen)
+    return conversation, context, {"session_id": request.session_id, "continued": continued, "new_chunks": new_chunks}
+
+def _record_session(request: ChatRequest, document: Optional[Dict[str, Any]], used_chunks: List[Dict[str, Any]],
+                    conversation: Dict[str, Any], answer: str, session: Dict[str, Any]):
+    """Store a successful turn of a chat session and complete its report."""
+    chat_sessions.record(
+        request.session_id, conversation, request.query, answer,
+        [_chunk_key(document, chunk) for chunk in used_chunks], _answer_documents(document, used_chunks)
+    )
+    state = chat_sessions.get(request.session_id)
+    if state is not None:
+        session.update(turns=state["turns"], context_tokens=state["context_tokens"])
+
+def _relevant_sources(relevant_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{
+        "text": chunk["text"],
+        "similarity": chunk["similarity"],
+        "metadata": {"type": "relevant_chunk", **chunk.get("metadata", {})}
+    } for chunk in relevant_chunks]
+
+async def search_library(query: str, top_k: int, filters: Optional[SearchFilters] = None) -> List[Dict[str, Any]]:
+    """Find the closest chunks across every document matching `filters`."""
+    with metrics.timed("search", "query_embed"):
+        query_embedding = await (await embedding_service.aget()).encode(query)
+    index = await vector_index.aget()
+    with metrics.timed("search", "vector_query"):
+        return await run_in_threadpool(
+            index.query, query_embedding, top_k, **(filters.model_dump() if filters else {})
+        )
+
+async def _retrieve_for_chat(request: ChatRequest) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]],
+                                                             Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Resolve what a chat question is answered from: the single document it
+    targets (None in library mode), the chunks retrieved for it and the
+    retrieval timings, or a message explaining why nothing could be retrieved.
+    """
+    if request.library or request.filters is not None:
+        relevant_chunks = await search_library(request.query, Config.CONTEXT_CANDIDATES, request.filters)
+        if not relevant_chunks:
+            return None, [], None, "No documents match the search filters. Please upload a PDF first."
+        return None, relevant_chunks, None, None
+    
+    document, message = await run_in_threadpool(_find_chat_document, request.document_id)
+    if document is None or _is_summary_request(request.query):
+        return document, [], None, message
+    relevant_chunks, timings = await get_most_relevant_chunks(request.query, document)
+    return document, relevant_chunks, timings, None
+
+def _chat_timings(started: float, retrieval_timings: Optional[Dict[str, Any]],
+                  llm_timings: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """The `timings` breakdown of a chat answer."""
+    return {
+        "retrieval_seconds": retrieval_timings["total_seconds"] if retrieval_timings else None,
+        "llm_queue_seconds": llm_timings.get("llm_queue_seconds"),
+        "llm_time_to_first_token_seconds": llm_timings.get("llm_time_to_first_token_seconds"),
+        "llm_seconds": llm_timings.get("llm_seconds"),
+        "total_seconds": time.perf_counter() - started
+    }
+
+def _client_id(http_request: Request) -> str:
+    """Who a chat request is queued for: the X-Client-Id header, else the client address."""
+    client = http_request.headers.get("x-client-id")
+    if client:
+        return client
+    return http_request.client.host if http_request.client else "unknown"
+
+def _admit(request: ChatRequest):
+    """Refuse a question that would need the model while its queue is full, before retrieving anything."""
+    if _is_summary_request(request.query) and not request.library and request.filters is None:
+        return
+    try:
+        llm_scheduler.check()
+    except LLMQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def _cancel_on_disconnect(http_request: Request, awaitable, poll_seconds: float = 0.5):
+    """
+    Await `awaitable`, cancelling it if the client goes away first, so an
+    abandoned question frees its queue place or stops its generation.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        task.cancel()
+
+async def _generate(http_request: Request, request: ChatRequest, context: str, llm_timings: Dict[str, Any],
+                    conversation: Optional[Dict[str, Any]] = None) -> str:
+    """Generate an answer with Ollama once the scheduler grants a slot, unless the client disconnects."""
+    async def scheduled():
+        async with llm_scheduler.slot(_client_id(http_request), llm_timings):
+            return await ollama.generate_response(request.query, context, timings=llm_timings, conversation=conversation)
+    
+    try:
+        return await _cancel_on_disconnect(http_request, scheduled())
+    except LLMQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def _scheduled_tokens(http_request: Request, tokens: AsyncIterator[str], llm_timings: Dict[str, Any]):
+    """
+    Stream `tokens` once the scheduler grants a slot. Starlette cancels a
+    streaming response when its client disconnects, which ends the upstream
+    generation and frees the slot.
+    """
+    async with llm_scheduler.slot(_client_id(http_request), llm_timings):
+        async for token in tokens:
+            yield token
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_with_document(request: ChatRequest):
+async def chat_with_document(request: ChatRequest, http_request: Request):
+    started = time.perf_counter()
+    llm_timings = {}
+    report = cached = session = None
+    _admit(request)
     try:
-        # Retrieve the document text
-        doc_id = request.document_id
-        if not doc_id or doc_id not in documents_store:
+        # Retrieve the document, or the library chunks in multi-document mode
+        document, relevant_chunks, timings, message = await _retrieve_for_chat(request)
+        if message is not None:
             return ChatResponse(
-                response="No document found. Please upload a PDF first.",
-                sources=[]
+                response=message, sources=[], timings=_chat_timings(started, None, llm_timings) if request.timings else None
             )
         
-        document_text = documents_store[doc_id]["text"]
-        chunks = split_text_into_chunks(document_text)
-        
         # If the query is about summarizing, use the summarization function
-        if "summarize" in request.query.lower() or "summary" in request.query.lower():
-            response = generate_summary(document_text)
-            sources = [{
-                "text": chunk,
-                "similarity": 1.0,
-                "metadata": {"type": "summary"}
-            } for chunk in chunks[:3]]  # Include top 3 chunks as sources
+        if document is not None and _is_summary_request(request.query):
+            response = generate_summary(document)
+            sources = _summary_sources(document)
         else:
-            # Get most relevant chunks for the query
-            relevant_chunks = get_most_relevant_chunks(request.query, chunks)
-            
-            # Combine relevant chunks into context
-            context = "\n\n".join(relevant_chunks)
-            
-            # Generate response using Ollama
-            response = ollama.generate_response(request.query, context)
+            # Pack the relevant chunks into the context, within the token budget
+            context, used_chunks, report = _pack_context(relevant_chunks)
             
-            # Format sources
-            sources = []
-            for chunk in relevant_chunks:
-                sources.append({
-                    "text": chunk,
-                    "similarity": 1.0,
-                    "metadata": {"type": "relevant_chunk"}
-                })
+            if request.session_id is not None:
+                # Continue the session's conversation; its answers depend on the turns before, so are not cached
+                conversation, context, session = _open_session(request, document, used_chunks, context)
+                response = await _generate(http_request, request, context, llm_timings, conversation)
+                if "llm_seconds" in llm_timings:  # as with the cache, never record an error message
+                    _record_session(request, document, used_chunks, conversation, response, session)
+            else:
+                # Reuse a cached answer, or generate one using Ollama
+                cache_key = await _answer_cache_key(request, document, context)
+                response, cached = answer_cache.get(**cache_key)
+                if response is None:
+                    response = await _generate(http_request, request, context, llm_timings)
+                    # Generation times are only recorded on success, so error messages are never cached
+                    if "llm_seconds" in llm_timings:
+                        answer_cache.put(
+                            answer=response, documents=_answer_documents(document, used_chunks), **cache_key
+                        )
+            sources = _relevant_sources(used_chunks)
         
-        return ChatResponse(response=response, sources=sources)
+        return ChatResponse(
+            response=response, sources=sources, retrieval=timings,
+            timings=_chat_timings(started, timings, llm_timings) if request.timings else None,
+            coverage=_coverage(document), context=_context_report(report, llm_timings), cached=cached,
+            session=session
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+async def _single_token(text: str):
+    yield text
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def stream_chat_with_document(request: ChatRequest, http_request: Request):
+    """
+    Answer like /chat, but as Server-Sent Events: a `sources` event first, then
+    one `token` event per generated token and a final `done` event carrying
+    time-to-first-token, total generation time, retrieval timings, the
+    document's page coverage, the prompt context report, which answer cache
+    tier served the answer, if any, and the chat session report (plus the
+    `timings` breakdown if requested). Any failure once the stream has started
+    ends it with an `error` event carrying its detail instead of `done`.
+    Refused with 503 and Retry-After while the generation queue is full.
+    """
+    _admit(request)
+    
+    async def answer_events():
+        started = time.perf_counter()
+        llm_timings = {}
+        report = cached = cache_key = session = conversation = None
+        document, relevant_chunks, timings, message = await _retrieve_for_chat(request)
+        if message is not None:
+            yield _sse("sources", [])
+            yield _sse("token", {"token": message})
+            yield _sse("done", {"time_to_first_token": 0.0, "total_time": 0.0})
+            return
+        
+        if document is not None and _is_summary_request(request.query):
+            yield _sse("sources", _summary_sources(document))
+            tokens = _single_token(generate_summary(document))
+        else:
+            context, used_chunks, report = _pack_context(relevant_chunks)
+            yield _sse("sources", _relevant_sources(used_chunks))
+            if request.session_id is not None:
+                conversation, context, session = _open_session(request, document, used_chunks, context)
+                answer = None
+            else:
+                cache_key = await _answer_cache_key(request, document, context)
+                answer, cached = answer_cache.get(**cache_key)
+            if answer is not None:
+                tokens = _single_token(answer)
+            else:
+                tokens = _scheduled_tokens(
+                    http_request,
+                    ollama.stream_response(request.query, context, timings=llm_timings, conversation=conversation),
+                    llm_timings
+                )
+        
+        time_to_first_token = None
+        generated = []
+        async for token in tokens:
+            if time_to_first_token is None:
+                time_to_first_token = time.perf_counter() - started
+            generated.append(token)
+            yield _sse("token", {"token": token})
+        if cache_key is not None and cached is None and "llm_seconds" in llm_timings:
+            answer_cache.put(
+                answer="".join(generated), documents=_answer_documents(document, used_chunks), **cache_key
+            )
+        if session is not None and "llm_seconds" in llm_timings:
+            _record_session(request, document, used_chunks, conversation, "".join(generated), session)
+        
+        total_time = time.perf_counter() - started
+        logger.info(f"Streamed chat answer: time to first token {time_to_first_token}, total {total_time:.2f}s")
+        done = {
+            "time_to_first_token": time_to_first_token, "total_time": total_time, "retrieval": timings,
+            "coverage": _coverage(document), "context": _context_report(report, llm_timings), "cached": cached,
+            "session": session
+        }
+        if request.timings:
+            done["timings"] = _chat_timings(started, timings, llm_timings)
+        yield _sse("done", done)
+    
+    async def events():
+        # The response has already started, so errors can only be reported in the stream
+        try:
+            async for event in answer_events():
+                yield event
+        except Exception as e:
+            logger.error(f"Streamed chat failed: {str(e)}")
+            yield _sse("error", {"detail": e.detail if isinstance(e, HTTPException) else str(e)})
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/chat/sessions/{session_id}")
+def get_chat_session(session_id: str):
+    """A chat session's scope, turn count, Ollama context size and recent history"""
+    session = chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return session
+
+@app.delete("/chat/sessions/{session_id}")
+def end_chat_session(session_id: str):
+    """End a chat session, freeing its conversation state"""
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return {"message": f"Chat session {session_id} ended"}
+
+@app.post("/search")
+async def search_documents(request: SearchRequest):
+    """Semantic search over the chunks of every document, optionally pre-filtered by metadata"""
+    started = time.perf_counter()
+    filters = SearchFilters(**request.model_dump(exclude={"query", "top_k"}))
+    results = await search_library(request.query, request.top_k, filters)
+    return {"results": results, "search_time": time.perf_counter() - started}
+
 @app.get("/documents")
-def list_documents():
-    """List all uploaded documents"""
-    return {"documents": documents_store}
+def list_documents(offset: int = Query(0, ge=0), limit: int = Query(Config.DOCUMENTS_PAGE_SIZE, ge=1, le=1000),
+                   fields: Optional[str] = None):
+    """
+    List uploaded documents, newest first. Only metadata is returned unless
+    `fields` (comma-separated) asks for more, e.g. `fields=document_id,text`.
+    """
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        total, documents = document_store.list(offset=offset, limit=limit, fields=field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"total": total, "offset": offset, "limit": limit, "documents": documents}
+
+def _stop_ingest(jobs: List[Job]):
+    """Cancel ingest jobs and wait for them to stop, so none stores a document being deleted."""
+    for job in jobs:
+        ingest_jobs.cancel(job.id)
+    for job in jobs:
+        ingest_jobs.wait(job.id, Config.JOB_CANCEL_TIMEOUT)
 
 @app.delete("/documents/{document_id}")
 def delete_document(document_id: str):
-    """Delete a specific document"""
-    if document_id in documents_store:
-        del documents_store[document_id]
-        # Note: ChromaDB doesn't have easy single-document deletion
-        # You might need to rebuild the collection or implement document filtering
+    """Delete a specific document, cancelling its ingest if one is running"""
+    job = ingest_jobs.find_by_document(document_id)
+    ingesting = job is not None and not job.finished
+    if ingesting:
+        _stop_ingest([job])
+    if document_store.delete(document_id) or ingesting:
+        vector_index.get().delete_document(document_id)
+        answer_cache.invalidate_document(document_id)
+        chat_sessions.invalidate_document(document_id)
         return {"message": f"Document {document_id} deleted"}
     else:
         raise HTTPException(status_code=404, detail="Document not found")
 
 @app.delete("/documents")
 def clear_all_documents():
-    """Clear all documents"""
-    documents_store.clear()
+    """Clear all documents, cancelling every running ingest"""
+    _stop_ingest(ingest_jobs.unfinished())
+    document_store.clear()
+    vector_index.get().clear()
+    answer_cache.clear()
+    chat_sessions.clear()
     return {"message": "All documents cleared"}
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "model": Config.EMBEDDING_MODEL}
-
-@app.post("/chat")
-async def chat(request: ChatRequest):
-    try:
-        # Extract text from PDF if not already processed
-        pdf_name = os.path.basename(request.pdf_path)
-        if not collection.get(where={"pdf_name": pdf_name}):
-            text = ocr.extract_text_from_pdf(request.pdf_path)
-            chunks = [text[i:i+1000] for i in range(0, len(text), 1000)]
-            
-            # Store chunks in ChromaDB
-            collection.add(
-                documents=chunks,
-                metadatas=[{"pdf_name": pdf_name} for _ in chunks],
-                ids=[f"{pdf_name}_{i}" for i in range(len(chunks))]
-            )
+    return {
+        "status": "healthy",
+        "model": Config.EMBEDDING_MODEL,
+        "embedding_backend": Config.EMBEDDING_BACKEND,
+        # Reported once loaded; health checks never trigger the model load themselves
+        "embeddings": embedding_service.get().stats() if embedding_service.ready else None,
+        "answer_cache": answer_cache.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "llm_scheduler": llm_scheduler.stats()
+    }
 
-        # Get relevant chunks
-        query_embedding = model.encode(request.message)
-        results = collection.query(
-            query_embeddings=[query_embedding.tolist()],
-            n_results=3
-        )
+@app.get("/health/live")
+def liveness_check():
+    """The process is up and serving requests; does not wait for models"""
+    return {"status": "alive"}
 
-        # Generate response
-        context = " ".join(results['documents'][0])
-        response = f"Based on the PDF content, here's what I found:\n\n{context}"
+@app.get("/health/ready")
+def readiness_check():
+    """Ready once the embedding model and vector index are loaded; 503 until then"""
+    components = {provider.name: provider.status() for provider in (embedding_backend, embedding_service, vector_index)}
+    ready = all(component["ready"] for component in components.values())
+    content = {
+        "status": "ready" if ready else "starting",
+        "components": components,
+        "startup": startup_timings,
+        "ollama": ollama.cached_health()
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
 
-        return {"response": response}
+@app.get("/metrics")
+def prometheus_metrics():
+    """Per-stage latency histograms, queue depths and in-flight requests in Prometheus text format"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+startup_timings["import_seconds"] = time.perf_counter() - _import_started
 
 if __name__ == "__main__":
     import uvicorn
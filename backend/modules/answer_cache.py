@@ -0,0 +1,134 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from modules import metrics
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class AnswerCache:
+    """
+    In-memory LRU cache of generated chat answers, in two tiers. The exact
+    tier is keyed by scope (a document ID, or the library), model and the
+    full prompt. The semantic tier reuses an answer for a different wording
+    of a question: same scope, model and packed context (so the same
+    retrieved chunks), and a query embedding at least `similarity_threshold`
+    cosine-similar to the cached question's.
+
+    Entries expire after `ttl_seconds` and are dropped when a document they
+    were answered from is deleted or re-ingested (`invalidate_document`).
+    Each server process keeps its own cache; since the context is part of
+    every key, an answer is only reused for the chunks it was generated from.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, similarity_threshold: Optional[float] = 0.95,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold  # None disables the semantic tier
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "exact_hits": 0, "semantic_hits": 0, "stores": 0, "evictions": 0,
+                       "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return self.clock() - entry["stored_at"] > self.ttl_seconds
+
+    def _record(self, result: str):
+        self._stats["requests"] += 1
+        if result != "miss":
+            self._stats[f"{result}_hits"] += 1
+        metrics.ANSWER_CACHE_REQUESTS.labels(result).inc()
+
+    def get(self, scope: str, model: str, prompt: str, context: str,
+            query_embedding: Optional[np.ndarray] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        The cached answer to a prompt and which tier it came from ("exact" or
+        "semantic"), or (None, None) on a miss.
+        """
+        if not self.enabled:
+            return None, None
+        key = (scope, model, _digest(prompt))
+        context_key = _digest(context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                entry = None
+            result = "exact" if entry is not None else "miss"
+            if entry is None and query_embedding is not None and self.similarity_threshold is not None:
+                key, entry = self._closest(scope, model, context_key, query_embedding)
+                result = "semantic" if entry is not None else "miss"
+            if entry is not None:
+                self._entries.move_to_end(key)
+            self._record(result)
+            return (entry["answer"], result) if entry is not None else (None, None)
+
+    def _closest(self, scope: str, model: str, context_key: str,
+                 query_embedding: np.ndarray) -> Tuple[Optional[tuple], Optional[Dict[str, Any]]]:
+        """The freshest entry for the same chunks whose question is close enough to the query."""
+        best_key, best, best_similarity = None, None, self.similarity_threshold
+        for key, entry in list(self._entries.items()):
+            if key[:2] != (scope, model) or entry["context_key"] != context_key or entry["embedding"] is None:
+                continue
+            if self._expired(entry):
+                del self._entries[key]
+                continue
+            # Query embeddings are L2-normalized, so the dot product is the cosine similarity
+            similarity = float(np.dot(entry["embedding"], query_embedding))
+            if similarity >= best_similarity:
+                best_key, best, best_similarity = key, entry, similarity
+        return best_key, best
+
+    def put(self, scope: str, model: str, prompt: str, context: str, answer: str, documents: Iterable[str],
+            query_embedding: Optional[np.ndarray] = None):
+        """Cache the answer to a prompt, generated from the chunks of `documents`."""
+        if not self.enabled:
+            return
+        key = (scope, model, _digest(prompt))
+        with self._lock:
+            self._entries[key] = {
+                "answer": answer,
+                "context_key": _digest(context),
+                "embedding": query_embedding,
+                "documents": frozenset(documents),
+                "stored_at": self.clock()
+            }
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate_document(self, document_id: str) -> int:
+        """Drop every answer drawn from a document; returns how many were dropped."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if document_id in entry["documents"]]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counts and rates of both tiers, and the current size."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        requests = stats["requests"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / requests if requests else 0.0
+        stats["semantic_hit_rate"] = stats["semantic_hits"] / requests if requests else 0.0
+        return stats
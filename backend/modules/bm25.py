@@ -0,0 +1,107 @@
+import re
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Words, plus identifiers such as part numbers (XJ-900) and clause IDs (4.2.1)
+# kept whole; their parts are indexed as well
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-/]\w+)*")
+SEPARATOR_PATTERN = re.compile(r"[.\-/]")
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if SEPARATOR_PATTERN.search(token):
+            tokens.extend(part for part in SEPARATOR_PATTERN.split(token) if part)
+    return tokens
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunks of one document, as a CSR inverted index: the
+    postings of term t are chunk_ids[indptr[t]:indptr[t + 1]] with matching
+    term frequencies. Scoring a query touches only the postings of its terms.
+    """
+
+    def __init__(self, terms: np.ndarray, indptr: np.ndarray, chunk_ids: np.ndarray, frequencies: np.ndarray,
+                 chunk_lengths: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.terms = terms
+        self.vocabulary: Dict[str, int] = {str(term): i for i, term in enumerate(terms.tolist())}
+        self.indptr = indptr
+        self.chunk_ids = chunk_ids
+        self.frequencies = frequencies
+        self.chunk_lengths = chunk_lengths
+        self.k1 = k1
+        self.b = b
+        chunk_count = len(chunk_lengths)
+        document_frequency = np.diff(indptr)
+        self.idf = np.log1p((chunk_count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = chunk_lengths.mean() if chunk_count else 1.0
+        # Per-chunk part of the BM25 denominator, precomputed once
+        self._length_norm = (k1 * (1 - b + b * chunk_lengths / max(average_length, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, chunks: Sequence[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        term_ids, chunk_ids = [], []
+        chunk_lengths = np.zeros(len(chunks), dtype=np.float32)
+        for chunk_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            chunk_lengths[chunk_id] = len(tokens)
+            term_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+            chunk_ids.extend([chunk_id] * len(tokens))
+
+        # Count (term, chunk) pairs and lay the postings out term by term
+        pairs = np.asarray(term_ids, dtype=np.int64) * max(len(chunks), 1) + np.asarray(chunk_ids, dtype=np.int64)
+        unique_pairs, counts = np.unique(pairs, return_counts=True)
+        posting_terms = unique_pairs // max(len(chunks), 1)
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=len(vocabulary)), out=indptr[1:])
+        terms = np.array(list(vocabulary), dtype=str) if vocabulary else np.array([], dtype=str)
+        return cls(
+            terms, indptr, (unique_pairs % max(len(chunks), 1)).astype(np.int32), counts.astype(np.float32),
+            chunk_lengths, k1, b
+        )
+
+    def __len__(self) -> int:
+        return len(self.chunk_lengths)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for `query`; chunks sharing no term score 0."""
+        scores = np.zeros(len(self.chunk_lengths), dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            postings = slice(self.indptr[term], self.indptr[term + 1])
+            chunk_ids = self.chunk_ids[postings]
+            frequencies = self.frequencies[postings]
+            scores[chunk_ids] += self.idf[term] * frequencies * (self.k1 + 1) / (frequencies + self._length_norm[chunk_ids])
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """(chunk index, score) of the `k` best matching chunks with a non-zero score, best first."""
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores)
+        if len(matching) == 0 or k <= 0:
+            return []
+        k = min(k, len(matching))
+        best = matching[np.argpartition(-scores[matching], k - 1)[:k]]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(i), float(scores[i])) for i in best]
+
+    def save(self, path: Path):
+        with open(path, "wb") as f:
+            np.savez(
+                f, terms=self.terms, indptr=self.indptr, chunk_ids=self.chunk_ids, frequencies=self.frequencies,
+                chunk_lengths=self.chunk_lengths, params=np.array([self.k1, self.b])
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            return cls(
+                data["terms"], data["indptr"], data["chunk_ids"], data["frequencies"], data["chunk_lengths"], k1, b
+            )
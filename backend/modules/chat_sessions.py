@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+class ChatSessionStore:
+    """
+    Server-side state of multi-turn chats, kept in memory per server
+    process. A session holds Ollama's "context" of the conversation so far
+    (the token state /api/generate returns), so a follow-up question only
+    costs evaluating its own prompt, plus the chunks already sent to the
+    model so later turns add just the passages it has not seen.
+
+    Sessions idle for `ttl_seconds` expire and beyond `max_sessions` the
+    least recently used are dropped. A conversation whose context grows past
+    `max_context_tokens` starts over from a full prompt on its next turn,
+    which keeps it within the model's context window and bounds the memory
+    held per session.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_sessions: int = 256, max_context_tokens: int = 4096,
+                 max_history: int = 20, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_context_tokens = max_context_tokens
+        self.max_history = max_history  # turns kept for listing a session
+        self.clock = clock
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _reset(session: Dict[str, Any], scope: str):
+        session["scope"] = scope
+        session["context"] = None
+        session["sent_chunks"] = set()
+        session["documents"] = set()
+
+    def _expired(self, session: Dict[str, Any]) -> bool:
+        return self.clock() - session["last_used"] > self.ttl_seconds
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """A live session's scope, turns and recent history, or None if it does not exist or expired."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or self._expired(session):
+                self._sessions.pop(session_id, None)
+                return None
+            return {
+                "session_id": session_id,
+                "scope": session["scope"],
+                "turns": session["turns"],
+                "context_tokens": len(session["context"] or ()),
+                "history": list(session["history"])
+            }
+
+    def open(self, session_id: str, scope: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        The session to answer a question about `scope` (a document ID, or the
+        library) in, and whether it continues an earlier conversation. An
+        unknown or expired ID starts a new session; a session moving to
+        another scope starts its conversation over.
+        """
+        with self._lock:
+            now = self.clock()
+            session = self._sessions.get(session_id)
+            if session is None or self._expired(session):
+                session = {"session_id": session_id, "created_at": now, "turns": 0, "history": []}
+                self._reset(session, scope)
+                self._sessions[session_id] = session
+            elif session["scope"] != scope:
+                self._reset(session, scope)
+            session["last_used"] = now
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return {"context": session["context"]}, session["context"] is not None
+
+    def new_chunks(self, session_id: str, chunk_keys: Iterable[Any]) -> List[bool]:
+        """For each chunk, whether the session's conversation has not been sent it yet."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            sent = session["sent_chunks"] if session is not None and session["context"] is not None else set()
+            return [key not in sent for key in chunk_keys]
+
+    def record(self, session_id: str, conversation: Dict[str, Any], query: str, answer: str,
+               chunk_keys: Iterable[Any], documents: Iterable[str]):
+        """
+        Store a completed turn: the conversation's new Ollama context and the
+        chunks and documents its prompt drew on.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            context = conversation.get("context")
+            if not context or len(context) > self.max_context_tokens:
+                # Too long to continue (or nothing to continue from): the next turn starts over
+                self._reset(session, session["scope"])
+            else:
+                session["context"] = context
+                session["sent_chunks"].update(chunk_keys)
+                session["documents"].update(documents)
+            session["turns"] += 1
+            session["history"] = (session["history"] + [{"query": query, "answer": answer}])[-self.max_history:]
+            session["last_used"] = self.clock()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def invalidate_document(self, document_id: str) -> int:
+        """Start over every conversation that has seen a document's chunks; returns how many did."""
+        with self._lock:
+            stale = [
+                session for session in self._sessions.values()
+                if session["scope"] == document_id or document_id in session["documents"]
+            ]
+            for session in stale:
+                self._reset(session, session["scope"])
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live = [session for session in self._sessions.values() if not self._expired(session)]
+            return {
+                "sessions": len(live),
+                "context_tokens": sum(len(session["context"] or ()) for session in live)
+            }
@@ -0,0 +1,52 @@
+from collections.abc import Sequence
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from modules import processor_interface
+
+class Chunks(Sequence):
+    """
+    The chunks of a document as (start, end) character spans into its text.
+    Overlapping chunks share the one copy of the text; a chunk's string is
+    only sliced out when it is indexed, e.g. for embedding or as a source.
+    """
+
+    def __init__(self, text: str, spans: np.ndarray):
+        self.text = text
+        self.spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+    @classmethod
+    def split(cls, text: str, chunk_size: int, overlap: int, snap_to_sentence: bool = True) -> "Chunks":
+        return cls(text, processor_interface.chunk_spans(text, chunk_size, overlap, snap_to_sentence))
+
+    @classmethod
+    def split_pages(cls, text: str, page_spans: np.ndarray, chunk_size: int, overlap: int,
+                    snap_to_sentence: bool = True) -> Tuple["Chunks", np.ndarray]:
+        """
+        Chunk each page's (start, end) span of `text` on its own, so no chunk
+        crosses a page boundary and a page's chunks can be reused when only
+        other pages change. Also returns each page's (first, end) chunk range.
+        """
+        spans, ranges = [], []
+        count = 0
+        for start, end in np.asarray(page_spans, dtype=np.int64).reshape(-1, 2).tolist():
+            page_chunks = processor_interface.chunk_spans(text[start:end], chunk_size, overlap, snap_to_sentence)
+            spans.append(page_chunks + start)
+            ranges.append((count, count + len(page_chunks)))
+            count += len(page_chunks)
+        all_spans = np.concatenate(spans) if spans else np.zeros((0, 2), dtype=np.int64)
+        return cls(text, all_spans), np.array(ranges, dtype=np.int64).reshape(-1, 2)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self.text[start:end] for start, end in self.spans[index].tolist()]
+        start, end = self.spans[index]
+        return self.text[start:end]
+
+    def span(self, index: int) -> Tuple[int, int]:
+        start, end = self.spans[index]
+        return int(start), int(end)
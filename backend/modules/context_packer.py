@@ -0,0 +1,102 @@
+"""
+Assembles the context of a chat prompt from retrieved chunks. Overlapping or
+adjacent chunks of the same document are merged into one span, so text
+shared by neighbouring chunks is sent once; sentences already packed are
+dropped; and spans are added by relevance until a token budget is spent.
+Ollama's prompt evaluation time grows with the prompt, so every repeated or
+marginal sentence costs latency on each question.
+"""
+import math
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Sentence ends in cleaned text, which has no line breaks left
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Characters merged across between two chunks that are adjacent rather than overlapping
+MAX_GAP = 1
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of English text for LLM tokenizers: about four characters a token."""
+    return math.ceil(len(text) / 4)
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
+
+def _normalize(sentence: str) -> str:
+    return " ".join(sentence.lower().split())
+
+def merge_hits(hits: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge hits whose character spans overlap or touch within the same
+    document into spans, each scored by its most similar hit and listing the
+    hits it covers. Hits without offsets stay spans of their own. Returns
+    the spans best first.
+    """
+    located, spans = [], []
+    for position, hit in enumerate(hits):
+        metadata = hit.get("metadata", {})
+        if "char_start" in metadata and "char_end" in metadata:
+            located.append((metadata.get("document_id"), metadata["char_start"], metadata["char_end"], position))
+        else:
+            spans.append({"text": hit["text"], "similarity": hit["similarity"], "hits": [position]})
+
+    current = None
+    for document_id, start, end, position in sorted(located, key=lambda item: (str(item[0]), item[1], item[2])):
+        hit = hits[position]
+        if current is not None and current["document_id"] == document_id and start <= current["end"] + MAX_GAP:
+            if end > current["end"]:
+                # The hit's text is the document text from `start`, so only its tail is new
+                tail = hit["text"][max(0, current["end"] - start):]
+                current["text"] += (" " if start > current["end"] else "") + tail
+                current["end"] = end
+            current["similarity"] = max(current["similarity"], hit["similarity"])
+            current["hits"].append(position)
+            continue
+        current = {"document_id": document_id, "end": end, "text": hit["text"], "similarity": hit["similarity"],
+                   "hits": [position]}
+        spans.append(current)
+
+    return sorted(spans, key=lambda span: -span["similarity"])
+
+def pack(hits: Sequence[Dict[str, Any]], budget_tokens: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the prompt context from retrieval hits (text, similarity and, for
+    merging, metadata with char_start/char_end and optionally document_id).
+    Returns the context and a report: its estimated tokens, the spans and
+    hits it used and the sentences dropped as duplicates or over budget.
+    """
+    seen = set()
+    parts, used_hits = [], []
+    tokens = duplicates = over_budget = 0
+    for span in merge_hits(hits):
+        kept = []
+        for sentence in split_sentences(span["text"]):
+            key = _normalize(sentence)
+            if key in seen:
+                duplicates += 1
+                continue
+            cost = estimate_tokens(sentence) + 1
+            if tokens + cost > budget_tokens:
+                over_budget += 1
+                continue
+            seen.add(key)
+            kept.append(sentence)
+            tokens += cost
+        if kept:
+            parts.append(" ".join(kept))
+            used_hits.extend(span["hits"])
+
+    context = "\n\n".join(parts)
+    return context, {
+        "tokens": estimate_tokens(context),
+        "budget_tokens": budget_tokens,
+        "spans": len(parts),
+        "hits": sorted(used_hits),
+        "duplicate_sentences": duplicates,
+        "over_budget_sentences": over_budget
+    }
+
+def join_hits(hits: Sequence[Dict[str, Any]]) -> str:
+    """The unpacked context: the texts of the hits joined as they come."""
+    return "\n\n".join(hit["text"] for hit in hits)
@@ -0,0 +1,307 @@
+import gc
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from modules.bm25 import BM25Index
+from modules.chunks import Chunks
+from modules import pages as page_layout
+
+logger = logging.getLogger(__name__)
+
+# Columns of the metadata table, in the order they are selected
+METADATA_FIELDS = (
+    "document_id", "filename", "word_count", "uploaded_at", "tags", "content_hash", "chunk_count", "version",
+    "page_count", "pages_total"
+)
+# Columns added after the metadata table was first released, with their definitions
+ADDED_COLUMNS = {
+    "version": "INTEGER NOT NULL DEFAULT 1",
+    "page_count": "INTEGER NOT NULL DEFAULT 0",
+    "pages_total": "INTEGER NOT NULL DEFAULT 0"
+}
+# Columns of the pages table, in the order they are selected
+PAGE_FIELDS = ("page", "hash", "source", "char_start", "char_end", "chunk_start", "chunk_end")
+REMOVE_ATTEMPTS = 3  # tries at deleting a body whose files may still be memory-mapped
+
+class DocumentStore:
+    """
+    Durable document store. Metadata lives in a SQLite table; each document's
+    body (cleaned text, chunk spans, chunk embeddings and BM25 index) is
+    written to its own directory and loaded lazily, with the most recently
+    used bodies kept in memory. Opening the store reads no bodies.
+
+    Each document also has a page table: the hash of every page and the
+    character and chunk ranges it covers. Re-adding a document stores it as a
+    new version; only the latest version's body is kept. A document can also
+    be added while it is still being extracted, with fewer pages than its
+    `pages_total`, and re-added as more pages are indexed.
+
+    Several processes (uvicorn workers) can share one store: SQLite in WAL
+    mode serializes writers, a document becomes visible to every process as
+    soon as its row is committed, and embeddings are memory-mapped read-only
+    so all workers share one copy through the page cache.
+    """
+
+    def __init__(self, db_path: Path, bodies_dir: Path, cache_size: int = 16):
+        self.db_path = Path(db_path)
+        self.bodies_dir = Path(bodies_dir)
+        self.cache_size = cache_size
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bodies: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        # Wait for other processes' write transactions instead of failing
+        self._db = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    word_count INTEGER NOT NULL,
+                    uploaded_at REAL NOT NULL,
+                    tags TEXT NOT NULL,
+                    content_hash TEXT,
+                    chunk_count INTEGER NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    page_count INTEGER NOT NULL DEFAULT 0,
+                    pages_total INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Stores created by earlier releases
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(documents)")}
+            for column, definition in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE documents ADD COLUMN {column} {definition}")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    document_id TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    hash TEXT,
+                    source TEXT NOT NULL,
+                    char_start INTEGER NOT NULL,
+                    char_end INTEGER NOT NULL,
+                    chunk_start INTEGER NOT NULL,
+                    chunk_end INTEGER NOT NULL,
+                    PRIMARY KEY (document_id, page)
+                )
+            """)
+
+    @staticmethod
+    def _revision(version: int, page_count: int, pages_total: int) -> str:
+        """Name of a body: its version, plus its page count while the document is partial."""
+        return f"v{version}" if page_count >= pages_total else f"v{version}-p{page_count}"
+
+    def _body_dir(self, document_id: str, revision: str = "v1") -> Path:
+        body_dir = self.bodies_dir / document_id / revision
+        legacy_dir = self.bodies_dir / document_id
+        # Bodies written before documents were versioned sit directly in the document's directory
+        if revision == "v1" and not body_dir.exists() and (legacy_dir / "text.txt").exists():
+            return legacy_dir
+        return body_dir
+
+    def _metadata_revision(self, metadata: Dict[str, Any]) -> str:
+        return self._revision(metadata["version"], metadata["page_count"], metadata["pages_total"])
+
+    @staticmethod
+    def _row_to_metadata(row: sqlite3.Row) -> Dict[str, Any]:
+        metadata = dict(row)
+        metadata["tags"] = json.loads(metadata["tags"])
+        return metadata
+
+    def add(self, document_id: str, filename: str, text: str, spans: np.ndarray, embeddings: np.ndarray,
+            word_count: int, uploaded_at: float, tags: Sequence[str] = (), content_hash: Optional[str] = None,
+            bm25: Optional[BM25Index] = None, version: int = 1, pages: Sequence[Dict[str, Any]] = (),
+            pages_total: Optional[int] = None):
+        """
+        Write a document's body to disk, then make it visible by inserting its
+        metadata and page table (`pages` as laid out by modules.pages). Adding
+        a higher `version` of an existing document, or more of its pages while
+        fewer than `pages_total` are indexed, replaces it: readers switch over
+        when the row is committed, and the older bodies are removed.
+        """
+        pages_total = len(pages) if pages_total is None else pages_total
+        body_dir = self.bodies_dir / document_id / self._revision(version, len(pages), pages_total)
+        body_dir.mkdir(parents=True, exist_ok=True)
+        (body_dir / "text.txt").write_text(text, encoding="utf-8")
+        np.save(body_dir / "spans.npy", spans)
+        np.save(body_dir / "embeddings.npy", embeddings)
+        if bm25 is not None:
+            bm25.save(body_dir / "bm25.npz")
+
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO documents ({', '.join(METADATA_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (document_id, filename, word_count, uploaded_at, json.dumps(list(tags)), content_hash, len(spans),
+                 version, len(pages), pages_total)
+            )
+            self._db.execute("DELETE FROM pages WHERE document_id = ?", (document_id,))
+            self._db.executemany(
+                f"INSERT INTO pages (document_id, {', '.join(PAGE_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(document_id, *(page.get(field) for field in PAGE_FIELDS)) for page in pages]
+            )
+        self._remove_other_versions(document_id, body_dir)
+
+    def _remove_other_versions(self, document_id: str, body_dir: Path):
+        # Readers that still have an older body open keep it until they close it
+        with self._lock:
+            for key in [key for key in self._bodies if key[0] == document_id and key[1] != body_dir.name]:
+                del self._bodies[key]
+        for path in (self.bodies_dir / document_id).iterdir():
+            if path != body_dir:
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path: Path) -> bool:
+        """
+        Delete a body's directory (or a stray file). Windows refuses to delete
+        a file that is still memory-mapped, so after a failure unreferenced maps
+        of evicted bodies are collected and the removal retried; what is still
+        in use is logged and left behind. Returns whether the path is gone.
+        """
+        for attempt in range(REMOVE_ATTEMPTS):
+            try:
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink(missing_ok=True)
+                return True
+            except FileNotFoundError:
+                return True
+            except OSError as e:
+                error = e
+                gc.collect()
+                time.sleep(0.1 * (attempt + 1))
+        logger.warning(f"Could not remove {path}, it is still in use: {error}")
+        return False
+
+    def __contains__(self, document_id: str) -> bool:
+        return self.get_metadata(document_id) is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def get_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(METADATA_FIELDS)} FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        return self._row_to_metadata(row) if row else None
+
+    def get_pages(self, document_id: str) -> List[Dict[str, Any]]:
+        """The page table of a document, in page order; empty for documents stored without one."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(PAGE_FIELDS)} FROM pages WHERE document_id = ? ORDER BY page", (document_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _load_body(self, document_id: str, revision: str = "v1") -> Dict[str, Any]:
+        key = (document_id, revision)
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                return body
+
+        body_dir = self._body_dir(document_id, revision)
+        text = (body_dir / "text.txt").read_text(encoding="utf-8")
+        chunks = Chunks(text, np.load(body_dir / "spans.npy", mmap_mode="r"))
+        bm25_path = body_dir / "bm25.npz"
+        pages = self.get_pages(document_id) or page_layout.layout_from_text(text)
+        body = {
+            "text": text,
+            "chunks": chunks,
+            "embeddings": np.load(body_dir / "embeddings.npy", mmap_mode="r"),
+            "bm25": BM25Index.load(bm25_path) if bm25_path.exists() else BM25Index.build(chunks),
+            "pages": pages,
+            "chunk_pages": page_layout.chunk_pages(chunks.spans, pages)
+        }
+        with self._lock:
+            self._bodies[key] = body
+            while len(self._bodies) > self.cache_size:
+                self._bodies.popitem(last=False)
+        return body
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadata and body of a document, or None if it does not exist. The
+        metadata is always read from the database, so a document deleted by
+        another process (or replaced by a newer version or more pages) is not
+        served from this process's body cache.
+        """
+        metadata = self.get_metadata(document_id)
+        if metadata is None:
+            return None
+        try:
+            body = self._load_body(document_id, self._metadata_revision(metadata))
+        except FileNotFoundError:
+            # Replaced between reading the metadata and the body
+            metadata = self.get_metadata(document_id)
+            if metadata is None:
+                return None
+            body = self._load_body(document_id, self._metadata_revision(metadata))
+        return {**metadata, **body}
+
+    def get_text(self, document_id: str, revision: str = "v1") -> str:
+        """Read only the cleaned text, without loading or caching chunks and embeddings."""
+        with self._lock:
+            body = self._bodies.get((document_id, revision))
+        if body is not None:
+            return body["text"]
+        return (self._body_dir(document_id, revision) / "text.txt").read_text(encoding="utf-8")
+
+    def list(self, offset: int = 0, limit: int = 50, fields: Optional[Sequence[str]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Page through documents, newest first. `fields` projects each entry onto
+        the given metadata fields, plus "text" if requested; by default all
+        metadata fields and no body are returned.
+        """
+        fields = list(fields) if fields else list(METADATA_FIELDS)
+        unknown = [field for field in fields if field not in METADATA_FIELDS and field != "text"]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT {', '.join(METADATA_FIELDS)} FROM documents ORDER BY uploaded_at DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+
+        documents = []
+        for row in rows:
+            metadata = self._row_to_metadata(row)
+            entry = {field: metadata[field] for field in fields if field != "text"}
+            if "text" in fields:
+                entry["text"] = self.get_text(metadata["document_id"], self._metadata_revision(metadata))
+            documents.append(entry)
+        return total, documents
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock, self._db:
+            deleted = self._db.execute("DELETE FROM documents WHERE document_id = ?", (document_id,)).rowcount
+            self._db.execute("DELETE FROM pages WHERE document_id = ?", (document_id,))
+            for key in [key for key in self._bodies if key[0] == document_id]:
+                del self._bodies[key]
+        self._remove(self.bodies_dir / document_id)
+        return bool(deleted)
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM documents")
+            self._db.execute("DELETE FROM pages")
+            self._bodies.clear()
+        for path in self.bodies_dir.iterdir():
+            self._remove(path)
@@ -0,0 +1,88 @@
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Type, Union
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBackend(ABC):
+    """Turns texts into L2-normalized float32 embeddings, one row per text."""
+
+    name = ""
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        ...
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        ...
+
+def load_sentence_transformer(model_name: str, model_dir: Optional[Union[str, Path]] = None,
+                              device: str = "cpu") -> SentenceTransformer:
+    """
+    Load from `model_dir` if it holds a saved model, so no network is needed.
+    Otherwise fetch `model_name` once and save it there for later starts.
+    """
+    if model_dir is not None and (Path(model_dir) / "modules.json").exists():
+        return SentenceTransformer(str(model_dir), device=device)
+    model = SentenceTransformer(model_name, device=device)
+    if model_dir is not None:
+        logger.info(f"Saving embedding model {model_name} to {model_dir} for offline use")
+        model.save(str(model_dir))
+    return model
+
+class TorchBackend(EmbeddingBackend):
+    """The SentenceTransformer model on fp32 PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str, model_dir: Optional[Union[str, Path]] = None, batch_size: int = 32,
+                 threads: Optional[int] = None, device: str = "cpu"):
+        if threads:
+            # Intra-op threads are process-wide in PyTorch
+            torch.set_num_threads(threads)
+        self.model = load_sentence_transformer(model_name, model_dir, device)
+        self.model.eval()
+        self.batch_size = batch_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype(np.float32)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    The same model with its Linear layers dynamically quantized to int8, which
+    cuts CPU inference time and weight memory at a small cost in accuracy.
+    CPU only.
+    """
+
+    name = "quantized"
+
+    def __init__(self, model_name: str, model_dir: Optional[Union[str, Path]] = None, batch_size: int = 32,
+                 threads: Optional[int] = None, device: str = "cpu"):
+        if device != "cpu":
+            raise ValueError("The quantized embedding backend only runs on the CPU")
+        super().__init__(model_name, model_dir, batch_size, threads, device)
+        torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    backend.name: backend for backend in (TorchBackend, QuantizedTorchBackend)
+}
+
+def create_backend(name: str, model_name: str, **options) -> EmbeddingBackend:
+    """Instantiate the backend registered as `name` (see BACKENDS)."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {name!r}, expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_name, **options)
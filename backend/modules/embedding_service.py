@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from modules import metrics
+
+class EmbeddingService:
+    """
+    Micro-batching front end for an embedding backend (see
+    modules.embedding_backends). Concurrent `encode` calls are collected for
+    up to `max_wait_ms` (or until `max_batch_size` are pending) and run as one
+    forward pass on a dedicated executor thread, keeping the model off the
+    event loop. Repeated query strings are served from an LRU cache.
+    """
+
+    def __init__(self, backend, max_batch_size: int = 32, max_wait_ms: float = 5, cache_size: int = 1024,
+                 ingest_batch_size: int = 64):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self.ingest_batch_size = ingest_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "batches": 0,
+            "batched_items": 0,
+            "max_batch": 0,
+            "batch_seconds": 0.0,
+            "wait_seconds": 0.0
+        }
+
+    def _encode_batch(self, texts: List[str], kind: str = "query") -> np.ndarray:
+        started = time.perf_counter()
+        vectors = self.backend.encode(texts)
+        metrics.EMBEDDING_BATCH_SECONDS.labels(kind).observe(time.perf_counter() - started)
+        metrics.EMBEDDING_BATCH_SIZE.labels(kind).observe(len(texts))
+        return vectors
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        """Start the batching task, once per event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._batch_loop(self._queue))
+        return self._queue
+
+    def _cache_get(self, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            self._stats["requests"] += 1
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                self._stats["cache_hits"] += 1
+            return vector
+
+    def _cache_put(self, text: str, vector: np.ndarray):
+        with self._lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode one query into an L2-normalized embedding."""
+        vector = self._cache_get(text)
+        if vector is not None:
+            return vector
+
+        future = asyncio.get_running_loop().create_future()
+        pending = self._ensure_worker()
+        await pending.put((text, future, time.perf_counter()))
+        metrics.EMBEDDING_QUEUE_DEPTH.set(pending.qsize())
+        vector = await future
+        self._cache_put(text, vector)
+        return vector
+
+    async def _batch_loop(self, pending: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await pending.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            metrics.EMBEDDING_QUEUE_DEPTH.set(pending.qsize())
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            started = time.perf_counter()
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode_batch, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            by_text = dict(zip(texts, vectors))
+            for text, future, queued_at in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["batched_items"] += len(batch)
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+                self._stats["batch_seconds"] += finished - started
+                self._stats["wait_seconds"] += sum(started - queued_at for _, _, queued_at in batch)
+
+    def encode_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode document chunks from a worker thread. Runs on the same executor
+        in slices of `ingest_batch_size`, so pending queries can interleave
+        with a long ingest instead of waiting for all of it.
+        """
+        if not texts:
+            return np.zeros((0, self.backend.dimension), dtype=np.float32)
+        # Submit one slice at a time so queued query batches run in between
+        return np.concatenate([
+            self._executor.submit(self._encode_batch, texts[i:i + self.ingest_batch_size], "ingest").result()
+            for i in range(0, len(texts), self.ingest_batch_size)
+        ])
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput and latency figures of the batcher and the query cache."""
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats["batches"] or 1
+        items = stats["batched_items"] or 1
+        stats["mean_batch_size"] = stats["batched_items"] / batches
+        stats["mean_batch_seconds"] = stats["batch_seconds"] / batches
+        stats["mean_wait_seconds"] = stats["wait_seconds"] / items
+        stats["items_per_second"] = stats["batched_items"] / stats["batch_seconds"] if stats["batch_seconds"] else 0.0
+        stats["cache_hit_rate"] = stats["cache_hits"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def hash_stream(source, destination, block_size: int = 1024 * 1024) -> str:
+    """Copy `source` into `destination` block by block, returning the SHA-256 of the bytes copied."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: source.read(block_size), b""):
+        digest.update(block)
+        destination.write(block)
+    return digest.hexdigest()
+
+class IngestCache:
+    """
+    Content-addressed on-disk cache of ingest artifacts, keyed by the SHA-256 of
+    the uploaded PDF. Each entry is a directory holding the per-page text with
+    the OCR profile that read it, the cleaned text, the chunk spans with the
+    settings that produced them and (optionally) the chunk embeddings with the
+    model that produced them. Entries are evicted least-recently-used first once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0  # size of the uploads served without re-processing
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, digest: str) -> Path:
+        return self.cache_dir / digest
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the cached artifacts for `digest`, or None on a miss."""
+        entry = self._entry_dir(digest)
+        meta_path = entry / "meta.json"
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            artifacts = {
+                "pages": json.loads((entry / "pages.json").read_text(encoding="utf-8")),
+                "cleaned_text": (entry / "cleaned.txt").read_text(encoding="utf-8"),
+                "spans": np.load(entry / "spans.npy"),
+                "chunking": meta.get("chunking"),
+                "ocr_profile": meta.get("ocr_profile"),
+                "embedding": meta.get("embedding"),
+                "embeddings": np.load(entry / "embeddings.npy") if (entry / "embeddings.npy").exists() else None
+            }
+            # Touch the entry so eviction sees it as recently used
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += meta.get("source_bytes", 0)
+        return artifacts
+
+    def put(self, digest: str, pages: List[Dict[str, Any]], cleaned_text: str, spans: np.ndarray,
+            embeddings: Optional[np.ndarray] = None, source_bytes: int = 0,
+            chunking: Optional[Dict[str, Any]] = None, ocr_profile: Optional[str] = None,
+            embedding: Optional[Dict[str, Any]] = None):
+        """
+        Store the artifacts derived from one upload and evict old entries if
+        needed. `embedding` describes the model the embeddings come from. The cache only saves work, so a failed write (a full disk, an
+        entry held open by a reader) is logged and the upload left uncached.
+        Returns whether the entry was stored.
+        """
+        try:
+            meta = {"source_bytes": source_bytes, "chunking": chunking, "ocr_profile": ocr_profile,
+                    "embedding": embedding}
+            self._write(digest, pages, cleaned_text, spans, embeddings, meta)
+            self.evict()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not cache ingest artifacts for {digest}: {e}")
+            return False
+        return True
+
+    def _write(self, digest: str, pages: List[Dict[str, Any]], cleaned_text: str, spans: np.ndarray,
+               embeddings: Optional[np.ndarray], meta: Dict[str, Any]):
+        staging = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".staging-"))
+        try:
+            (staging / "pages.json").write_text(json.dumps(pages), encoding="utf-8")
+            (staging / "cleaned.txt").write_text(cleaned_text, encoding="utf-8")
+            np.save(staging / "spans.npy", spans)
+            if embeddings is not None:
+                np.save(staging / "embeddings.npy", embeddings)
+            (staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+            entry = self._entry_dir(digest)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        total = 0
+        for entry in self.cache_dir.iterdir():
+            meta_path = entry / "meta.json"
+            if entry.name.startswith(".") or not meta_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((meta_path.stat().st_mtime, size, entry))
+            total += size
+
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes_saved": self.bytes_saved}
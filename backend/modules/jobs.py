@@ -0,0 +1,432 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+# Columns added to the jobs table after it was first released, with their definitions
+ADDED_COLUMNS = {"owner": "TEXT", "updated_at": "REAL"}
+# Result fields left out of stored snapshots: large, and served elsewhere (the document's text)
+UNSTORED_RESULT_FIELDS = ("extracted_text",)
+ABANDONED_ERROR = "The server process running this job stopped before it finished."
+
+class JobCancelled(Exception):
+    """Raised inside a job's work function once cancellation has been requested."""
+
+class QueueFullError(Exception):
+    """Raised when the ingest queue has no room for another job."""
+
+def _process_id() -> str:
+    """This server process: host and pid, plus a token telling it apart from an earlier process with that pid."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _owner_gone(owner: Optional[str], me: str) -> bool:
+    """Whether the process that stored a job is known to have exited (on this host)."""
+    if not owner or owner.count(":") < 2:
+        return False
+    host, pid, _ = owner.rsplit(":", 2)
+    my_host, my_pid, _ = me.rsplit(":", 2)
+    if host != my_host:
+        return False
+    if pid == my_pid:
+        # This pid, but an earlier process (e.g. the server before a container restart)
+        return owner != me
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows: rely on the heartbeat there
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+# This server process, as recorded as the owner of the jobs it runs
+PROCESS_ID = _process_id()
+
+def _current(jobs: List["Job"]) -> Optional["Job"]:
+    """The job that speaks for a document: its newest unfinished job, else its newest."""
+    if not jobs:
+        return None
+    return max(jobs, key=lambda job: (not job.finished, job.created_at))
+
+class Job:
+    """Progress and outcome of one background ingestion."""
+
+    def __init__(self, document_id: str, filename: str):
+        self.id = str(uuid.uuid4())
+        self.document_id = document_id
+        self.filename = filename
+        self.status = "queued"
+        self.stage = "queued"
+        self.pages_done = 0
+        self.pages_total = 0
+        self.pages_indexed = 0  # pages already searchable while the rest are extracted
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self._cancel_event = threading.Event()
+        # Called with the job on every progress update (see JobManager)
+        self._listener: Optional[Callable[["Job"], None]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def update(self, stage: Optional[str] = None, pages_done: Optional[int] = None, pages_total: Optional[int] = None,
+               pages_indexed: Optional[int] = None):
+        """Record progress, raising JobCancelled if the job has been cancelled."""
+        if stage is not None:
+            self.stage = stage
+        if pages_done is not None:
+            self.pages_done = pages_done
+        if pages_total is not None:
+            self.pages_total = pages_total
+        if pages_indexed is not None:
+            self.pages_indexed = pages_indexed
+        if self._listener is not None:
+            self._listener(self)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def eta(self) -> Optional[float]:
+        """Seconds left, extrapolated from the page rate so far."""
+        if not self.started_at or not self.pages_done or not self.pages_total or self.finished:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.pages_done * (self.pages_total - self.pages_done)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "document_id": self.document_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "pages_indexed": self.pages_indexed,
+            "eta_seconds": self.eta(),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result": self.result
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        """Rebuild a job from `to_dict` output, e.g. one run by another process."""
+        job = cls(data["document_id"], data["filename"])
+        job.id = data["job_id"]
+        for field in ("status", "stage", "pages_done", "pages_total", "created_at", "started_at",
+                      "finished_at", "error", "result"):
+            setattr(job, field, data[field])
+        job.pages_indexed = data.get("pages_indexed", 0)  # absent from older snapshots
+        return job
+
+class JobStore:
+    """
+    Job snapshots in a SQLite table, so every server process can report on
+    and cancel jobs that another process is running. A cancellation request
+    is a flag the owning process picks up on the job's next progress update.
+
+    Each unfinished job records the process running it and when that process
+    last vouched for it; `reap` fails the jobs left behind by a process that
+    exited or stopped sending heartbeats.
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    document_id TEXT NOT NULL,
+                    snapshot TEXT NOT NULL,
+                    finished_at REAL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Stores created by earlier releases
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for column, definition in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_document_id ON jobs (document_id)")
+
+    def save(self, job: Job, owner: Optional[str] = None) -> bool:
+        """Store the job's current state as run by `owner`; returns whether cancellation was requested."""
+        snapshot = job.to_dict()
+        if snapshot["result"]:
+            snapshot["result"] = {
+                key: value for key, value in snapshot["result"].items() if key not in UNSTORED_RESULT_FIELDS
+            }
+        with self._lock, self._db:
+            self._db.execute(
+                """INSERT INTO jobs (job_id, document_id, snapshot, finished_at, owner, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (job_id) DO UPDATE SET snapshot = excluded.snapshot, finished_at = excluded.finished_at,
+                   owner = excluded.owner, updated_at = excluded.updated_at""",
+                (job.id, job.document_id, json.dumps(snapshot), job.finished_at, owner, time.time())
+            )
+            row = self._db.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job.id,)).fetchone()
+        return bool(row[0])
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT snapshot FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job.from_dict(json.loads(row[0])) if row else None
+
+    def find_by_document(self, document_id: str) -> Optional[Job]:
+        """A document's newest unfinished job, else its most recently created one."""
+        with self._lock:
+            rows = self._db.execute("SELECT snapshot FROM jobs WHERE document_id = ?", (document_id,)).fetchall()
+        return _current([Job.from_dict(json.loads(row[0])) for row in rows])
+
+    def unfinished(self) -> List[Job]:
+        """Jobs of every process that are still queued or running."""
+        with self._lock:
+            rows = self._db.execute("SELECT snapshot FROM jobs WHERE finished_at IS NULL").fetchall()
+        return [Job.from_dict(json.loads(row[0])) for row in rows]
+
+    def heartbeat(self, job_ids: List[str]):
+        """Record that the process running these jobs is still alive."""
+        if not job_ids:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE job_id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), *job_ids)
+            )
+
+    def reap(self, me: str, stale_before: float) -> List[Job]:
+        """
+        Fail the unfinished jobs of processes that exited, or that have not
+        sent a heartbeat since `stale_before`, and return them. `me` is the
+        calling process, whose own jobs are never reaped.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT snapshot, owner, updated_at FROM jobs WHERE finished_at IS NULL AND owner IS NOT ?", (me,)
+            ).fetchall()
+        reaped = []
+        for snapshot, owner, updated_at in rows:
+            if (updated_at or 0) >= stale_before and not _owner_gone(owner, me):
+                continue
+            job = Job.from_dict(json.loads(snapshot))
+            job.status = "failed"
+            job.error = ABANDONED_ERROR
+            job.finished_at = time.time()
+            with self._lock, self._db:
+                # Unless the owner stored the job again meanwhile, or another process reaped it first
+                updated = self._db.execute(
+                    """UPDATE jobs SET snapshot = ?, finished_at = ?, updated_at = ?
+                       WHERE job_id = ? AND finished_at IS NULL AND updated_at IS ?""",
+                    (json.dumps(job.to_dict()), job.finished_at, job.finished_at, job.id, updated_at)
+                ).rowcount
+            if updated:
+                reaped.append(job)
+        return reaped
+
+    def request_cancel(self, job_id: str):
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+
+    def prune(self, cutoff: float):
+        """Forget jobs that finished before `cutoff`."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+
+class JobManager:
+    """
+    Runs ingestion jobs on a worker pool off the event loop. At most
+    `max_queue` jobs may wait for a worker; further submissions are refused
+    with QueueFullError. Finished jobs are kept for `retention` seconds.
+
+    With a `store`, job state is also written there on every change, so jobs
+    submitted to this manager can be looked up and cancelled from managers in
+    other processes sharing the store. The queue limit stays per process.
+    `on_change`, if given, is called with the manager whenever a job is
+    queued, starts or finishes (e.g. to export `counts()` as metrics).
+
+    The manager sends a heartbeat for its unfinished jobs every
+    `heartbeat_seconds`. Jobs that another process left unfinished when it
+    exited, or whose heartbeat is older than `stale_seconds`, are failed on
+    lookup and passed to `on_abandoned` (e.g. to remove what they published).
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, retention: float = 3600,
+                 store: Optional[JobStore] = None, on_change: Optional[Callable[["JobManager"], None]] = None,
+                 heartbeat_seconds: float = 10, stale_seconds: float = 60,
+                 on_abandoned: Optional[Callable[[Job], None]] = None):
+        self.max_queue = max_queue
+        self.retention = retention
+        self.store = store
+        self.on_change = on_change
+        self.stale_seconds = stale_seconds
+        self.on_abandoned = on_abandoned
+        self.owner = PROCESS_ID
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        if store is not None:
+            threading.Thread(
+                target=self._heartbeat, args=(heartbeat_seconds,), name="job-heartbeat", daemon=True
+            ).start()
+
+    def submit(self, job: Job, work: Callable[[Job], Dict[str, Any]]) -> Job:
+        """Queue `work(job)`; its return value becomes the job's result."""
+        with self._lock:
+            self._prune()
+            queued = sum(1 for existing in self._jobs.values() if existing.status == "queued")
+            if queued >= self.max_queue:
+                raise QueueFullError(f"{queued} ingestion jobs are already waiting")
+            self._jobs[job.id] = job
+        if self.store is not None:
+            job._listener = self._persist
+            self._persist(job)
+        self._changed()
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs of this manager that are queued and running."""
+        statuses = [job.status for job in list(self._jobs.values())]
+        return {"queued": statuses.count("queued"), "running": statuses.count("running")}
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def _persist(self, job: Job):
+        """Write the job to the store and pick up cancellations requested elsewhere."""
+        if self.store.save(job, self.owner) and not job.finished:
+            job._cancel_event.set()
+
+    def _heartbeat(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.store.heartbeat([job.id for job in list(self._jobs.values()) if not job.finished])
+            except sqlite3.Error:
+                # A locked or briefly unavailable database: the next beat is well within stale_seconds
+                pass
+
+    def reap(self) -> List[Job]:
+        """Fail the jobs other processes abandoned (see JobStore.reap) and return them."""
+        if self.store is None:
+            return []
+        reaped = self.store.reap(self.owner, time.time() - self.stale_seconds)
+        for job in reaped:
+            if self.on_abandoned is not None:
+                self.on_abandoned(job)
+        return reaped
+
+    def _run(self, job: Job, work: Callable[[Job], Dict[str, Any]]):
+        if job.status == "cancelled":
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        self._changed()
+        try:
+            # Records the start and honours a cancellation requested while queued
+            job.update()
+            job.result = work(job)
+            job.status = "completed"
+            job.stage = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if self.store is not None:
+                self._persist(job)
+            self._changed()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job, or a snapshot of it if another process runs it."""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            self.reap()
+            job = self.store.load(job_id)
+        return job
+
+    def find_by_document(self, document_id: str) -> Optional[Job]:
+        """
+        A document's newest unfinished job, else its most recently created
+        one, among this manager's jobs and those other processes stored.
+        """
+        jobs = [job for job in list(self._jobs.values()) if job.document_id == document_id]
+        self.reap()
+        stored = self.store.find_by_document(document_id) if self.store is not None else None
+        if stored is not None and stored.id not in {job.id for job in jobs}:
+            jobs.append(stored)
+        return _current(jobs)
+
+    def unfinished(self) -> List[Job]:
+        """Jobs still queued or running, in this process or (with a store) any other."""
+        jobs = {job.id: job for job in list(self._jobs.values()) if not job.finished}
+        if self.store is not None:
+            self.reap()
+            for job in self.store.unfinished():
+                jobs.setdefault(job.id, job)
+        return list(jobs.values())
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Wait up to `timeout` seconds for a job to finish; returns its latest state."""
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and not job.finished and time.monotonic() < deadline:
+            time.sleep(0.05)
+            job = self.get(job_id)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; returns False if the job has already finished."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return self._cancel_elsewhere(job_id)
+        if job.finished:
+            return False
+        job._cancel_event.set()
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            if self.store is not None:
+                self._persist(job)
+            self._changed()
+        return True
+
+    def _cancel_elsewhere(self, job_id: str) -> bool:
+        """Flag a job owned by another process; it stops at its next update."""
+        job = self.get(job_id) if self.store is not None else None
+        if job is None or job.finished:
+            return False
+        self.store.request_cancel(job_id)
+        return True
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+        if self.store is not None:
+            self.store.prune(cutoff)
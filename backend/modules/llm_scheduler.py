@@ -0,0 +1,117 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from modules import metrics
+
+class LLMQueueFullError(Exception):
+    """Raised when too many generations are already waiting for the model."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after  # seconds until a slot is likely free
+
+class LLMScheduler:
+    """
+    Admission control in front of Ollama. At most `max_concurrency`
+    generations run at once (what the local model can serve; see Ollama's
+    OLLAMA_NUM_PARALLEL) and up to `max_queue` more wait for a slot. Waiting
+    requests are served round-robin across clients, so one client sending
+    many questions cannot starve the others. Beyond that, requests are
+    refused with LLMQueueFullError and an estimate of when to retry.
+
+    Runs on the event loop; each server process schedules its own requests.
+    """
+
+    def __init__(self, max_concurrency: int = 1, max_queue: int = 16, expected_seconds: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._running = 0
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self._mean_seconds = expected_seconds  # running average of slot hold times, for Retry-After
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to admit another request."""
+        return max(1, math.ceil(self._mean_seconds * (self._queued + 1) / max(1, self.max_concurrency)))
+
+    def check(self):
+        """Refuse early, before any retrieval work, when a generation could not be queued."""
+        if self._running >= self.max_concurrency and self._queued >= self.max_queue:
+            metrics.LLM_REJECTED.inc()
+            raise LLMQueueFullError(
+                f"The model is busy: {self._queued} questions are waiting. Please try again shortly.",
+                self.retry_after()
+            )
+
+    async def _acquire(self, client: str):
+        if self._running < self.max_concurrency and not self._queued:
+            self._running += 1
+            return
+        self.check()
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client, deque()).append(future)
+        self._queued += 1
+        metrics.LLM_QUEUE_DEPTH.inc()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as the wait was cancelled: hand it on
+                self._release()
+            else:
+                self._dequeue(client, future)
+            raise
+
+    def _dequeue(self, client: str, future: asyncio.Future):
+        waiting = self._waiting.get(client)
+        if waiting is not None and future in waiting:
+            waiting.remove(future)
+            if not waiting:
+                del self._waiting[client]
+            self._queued -= 1
+            metrics.LLM_QUEUE_DEPTH.dec()
+
+    def _release(self):
+        self._running -= 1
+        while self._waiting and self._running < self.max_concurrency:
+            # Take the next client in turn, moving it to the back if it has more waiting
+            client, waiting = self._waiting.popitem(last=False)
+            future = waiting.popleft()
+            if waiting:
+                self._waiting[client] = waiting
+            self._queued -= 1
+            metrics.LLM_QUEUE_DEPTH.dec()
+            if not future.done():
+                self._running += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, client: str, timings: Optional[Dict[str, float]] = None) -> AsyncIterator[None]:
+        """
+        Hold a generation slot for the block, waiting for one in turn with
+        `client`'s other requests. The wait is observed as a metric and, if
+        `timings` is given, added to it.
+        """
+        queued_at = time.perf_counter()
+        await self._acquire(client)
+        started = time.perf_counter()
+        metrics.LLM_QUEUE_WAIT.observe(started - queued_at)
+        if timings is not None:
+            timings["llm_queue_seconds"] = started - queued_at
+        try:
+            yield
+        finally:
+            self._mean_seconds = 0.8 * self._mean_seconds + 0.2 * (time.perf_counter() - started)
+            self._release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"running": self._running, "queued": self._queued, "clients_waiting": len(self._waiting),
+                "retry_after_seconds": self.retry_after()}
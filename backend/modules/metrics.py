@@ -0,0 +1,145 @@
+"""
+Prometheus instruments for the ingest, chat and search pipelines, served on
+/metrics. Under several server workers, set PROMETHEUS_MULTIPROC_DIR (run.py
+does) so every worker writes its samples there and a scrape of any worker
+reports the aggregate.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# Seconds, from sub-millisecond retrieval to OCR'd documents taking minutes
+SECONDS_BUCKETS = (
+    .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300, float("inf")
+)
+
+HTTP_IN_FLIGHT = Gauge(
+    "pdfchat_http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum"
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "pdfchat_http_request_seconds", "HTTP request time, until the response body is sent",
+    ["method", "route", "status"], buckets=SECONDS_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "pdfchat_stage_seconds", "Time spent in each pipeline stage", ["pipeline", "stage"], buckets=SECONDS_BUCKETS
+)
+PAGES = Counter("pdfchat_ingest_pages_total", "Pages extracted, by text source", ["source"])
+PAGES_PER_SECOND = Histogram(
+    "pdfchat_ingest_pages_per_second", "Extraction rate of each ingested document",
+    buckets=(.1, .25, .5, 1, 2, 5, 10, 25, 50, 100, 250, float("inf"))
+)
+PAGE_SECONDS = Histogram(
+    "pdfchat_page_seconds", "Extraction time per page: pdftotext share, rasterization or Tesseract",
+    ["step"], buckets=SECONDS_BUCKETS
+)
+INGEST_JOBS = Gauge(
+    "pdfchat_ingest_jobs", "Ingestion jobs of this server by state", ["state"], multiprocess_mode="livesum"
+)
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "pdfchat_embedding_batch_seconds", "Forward pass time per embedding batch", ["kind"], buckets=SECONDS_BUCKETS
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "pdfchat_embedding_batch_size", "Texts per embedding batch", ["kind"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, float("inf"))
+)
+EMBEDDING_QUEUE_DEPTH = Gauge(
+    "pdfchat_embedding_queue_depth", "Queries waiting to be batched for embedding", multiprocess_mode="livesum"
+)
+LLM_IN_FLIGHT = Gauge("pdfchat_llm_requests_in_flight", "Generations running on Ollama", multiprocess_mode="livesum")
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "pdfchat_llm_time_to_first_token_seconds", "Time until Ollama produced the first token", ["mode"],
+    buckets=SECONDS_BUCKETS
+)
+LLM_GENERATION_SECONDS = Histogram(
+    "pdfchat_llm_generation_seconds", "Total Ollama generation time", ["mode"], buckets=SECONDS_BUCKETS
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "pdfchat_llm_queue_depth", "Generations waiting for a slot on Ollama", multiprocess_mode="livesum"
+)
+LLM_QUEUE_WAIT = Histogram(
+    "pdfchat_llm_queue_wait_seconds", "Time a generation waited for a slot on Ollama", buckets=SECONDS_BUCKETS
+)
+LLM_REJECTED = Counter("pdfchat_llm_rejected_total", "Chat requests refused because the generation queue was full")
+ANSWER_CACHE_REQUESTS = Counter(
+    "pdfchat_answer_cache_requests_total", "Chat answer cache lookups by result: exact, semantic or miss", ["result"]
+)
+
+@contextmanager
+def timed(pipeline: str, stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """
+    Observe the block's duration as a stage and, if given, add it to
+    `timings` as `<stage>_seconds`. Blocks that raise are not observed.
+    """
+    started = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - started
+    STAGE_SECONDS.labels(pipeline, stage).observe(seconds)
+    if timings is not None:
+        timings[f"{stage}_seconds"] = seconds
+
+def observe_jobs(counts: Dict[str, int]):
+    """Export JobManager.counts() of this process."""
+    for state, count in counts.items():
+        INGEST_JOBS.labels(state).set(count)
+
+def observe_pages(pages, seconds: float):
+    """Record the extraction of one document's pages (see modules.ocr.iter_pages)."""
+    for page in pages:
+        PAGES.labels(page["source"]).inc()
+        if page["source"] == "native":
+            PAGE_SECONDS.labels("native").observe(page["seconds"])
+        else:
+            PAGE_SECONDS.labels("render").observe(page.get("render_seconds", 0.0))
+            PAGE_SECONDS.labels("ocr").observe(page.get("ocr_seconds", 0.0))
+    if pages and seconds > 0:
+        PAGES_PER_SECOND.observe(len(pages) / seconds)
+
+def multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+def render() -> Tuple[bytes, str]:
+    """The exposition body and its content type, aggregated over workers if multiprocess."""
+    registry = REGISTRY
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the aggregate, on shutdown."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
+class MetricsMiddleware:
+    """ASGI middleware counting in-flight requests and timing each by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router records the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status["code"])
+            ).observe(time.perf_counter() - started)
@@ -1,20 +1,223 @@
-from pdf2image import convert_from_path, pdfinfo_from_path
+from pdf2image import pdfinfo_from_path
+from pdf2image.parsers import parse_buffer_to_pgm, parse_buffer_to_ppm
 from PIL import Image
 import pytesseract
+import hashlib
 import os
-import tempfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-def _process_page(image: Image) -> str:
+# Pages whose embedded text layer has fewer non-whitespace characters than this
+# are treated as scanned and sent through rasterization + Tesseract.
+MIN_NATIVE_CHARS = 50
+
+# Rendered pages allowed to wait for OCR at once; bounds peak memory.
+QUEUE_DEPTH = 8
+
+# How scanned pages are rasterized and read. Tesseract's cost grows with the pixel
+# count and colour does not help it read text, so every profile renders grayscale.
+# `fast` also binarizes and assumes one uniform block of text (--psm 6); `adaptive`
+# renders at low resolution first and renders pages again at `retry_dpi` when
+# Tesseract's mean word confidence on them is below `min_confidence` (0-100).
+OCR_PROFILES = {
+    "fast": {"dpi": 150, "grayscale": True, "binarize": True, "tesseract_config": "--psm 6"},
+    "balanced": {"dpi": 200, "grayscale": True, "binarize": False, "tesseract_config": "--psm 3"},
+    "accurate": {"dpi": 300, "grayscale": True, "binarize": False, "tesseract_config": "--psm 3"},
+    "adaptive": {
+        "dpi": 150, "grayscale": True, "binarize": False, "tesseract_config": "--psm 3",
+        "retry_dpi": 300, "min_confidence": 80
+    }
+}
+DEFAULT_PROFILE = "balanced"
+
+# Gray level below which a binarized pixel turns black
+BINARIZE_THRESHOLD = 160
+
+_DONE = object()
+
+def get_profile(name: Optional[str]) -> Dict[str, Any]:
+    """The settings of an OCR profile; None selects the default."""
+    try:
+        return OCR_PROFILES[name or DEFAULT_PROFILE]
+    except KeyError:
+        raise ValueError(f"Unknown OCR profile {name!r}, expected one of: {', '.join(OCR_PROFILES)}")
+
+def _process_page(image: Image, config: str = "") -> str:
     """Helper function to run OCR on a single image."""
-    return pytesseract.image_to_string(image)
+    return pytesseract.image_to_string(image, config=config)
 
-def extract_text_from_pdf(pdf_path: str, poppler_path: str = None) -> str:
+def _process_page_scored(image: Image, config: str = "") -> Tuple[str, Optional[float]]:
+    """
+    OCR a single image, also returning Tesseract's mean word confidence, or
+    None if it found no words.
+    """
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+    lines, confidences = {}, []
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        confidences.append(confidence)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return text, sum(confidences) / len(confidences) if confidences else None
+
+def _poppler_command(name: str, poppler_path: Optional[str] = None) -> str:
+    """Resolve a poppler executable, preferring the configured install directory."""
+    if poppler_path:
+        executable = name + ('.exe' if os.name == 'nt' else '')
+        candidate = os.path.join(poppler_path, executable)
+        if os.path.exists(candidate):
+            return candidate
+    return name
+
+def extract_native_text(pdf_path: str, poppler_path: str = None) -> List[str]:
     """
-    Extracts text from a PDF using a memory-efficient, parallelized approach.
-    It processes the PDF in batches to keep memory usage low and uses multiple
-    threads to speed up OCR on each batch.
+    Pulls the embedded text layer of every page with poppler's pdftotext in a
+    single call. Returns one string per page, or an empty list if pdftotext is
+    unavailable or fails on this file.
     """
+    command = [_poppler_command("pdftotext", poppler_path), "-enc", "UTF-8", pdf_path, "-"]
+    try:
+        result = subprocess.run(command, capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"pdftotext failed, every page will be OCR'd. Error: {e}")
+        return []
+
+    # pdftotext terminates every page with a form feed
+    return result.stdout.decode("utf-8", errors="replace").split("\f")
+
+def has_text_layer(text: str, min_chars: int = MIN_NATIVE_CHARS) -> bool:
+    """Whether a page's native text is dense enough to skip OCR."""
+    return len("".join(text.split())) >= min_chars
+
+def _render_pages(pdf_path: str, first_page: int, last_page: int, poppler_path: str = None, dpi: int = 200,
+                  grayscale: bool = False) -> List[Image]:
+    """
+    Rasterizes a range of pages to in-memory PPM (or grayscale PGM) images
+    with a single pdftoppm run writing to stdout, without touching disk.
+    pdf2image's convert_from_path would also run pdfinfo on every call, and
+    each run parses the whole file.
+    """
+    command = [_poppler_command("pdftoppm", poppler_path), "-r", str(dpi), "-f", str(first_page), "-l", str(last_page)]
+    if grayscale:
+        command.append("-gray")
+    command.append(pdf_path)
+    result = subprocess.run(command, capture_output=True, check=True)
+    return (parse_buffer_to_pgm if grayscale else parse_buffer_to_ppm)(result.stdout)
+
+def _render_for_ocr(pdf_path: str, first_page: int, last_page: int, poppler_path: str, profile: Dict[str, Any],
+                    dpi: Optional[int] = None) -> List[Image]:
+    """Renders a range of pages the way `profile` prepares them for Tesseract."""
+    images = _render_pages(pdf_path, first_page, last_page, poppler_path, dpi=dpi or profile["dpi"],
+                           grayscale=profile["grayscale"])
+    if profile["binarize"]:
+        images = [image.convert("L").point(lambda value: 255 if value >= BINARIZE_THRESHOLD else 0) for image in images]
+    return images
+
+def _rerender(pdf_path: str, page_number: int, poppler_path: str, profile: Dict[str, Any], dpi: int) -> Image:
+    return _render_for_ocr(pdf_path, page_number, page_number, poppler_path, profile, dpi)[0]
+
+def _windows(page_numbers: List[int], size: int) -> Iterator[Tuple[int, int]]:
+    """Split page numbers into (first, last) ranges of at most `size` consecutive pages."""
+    first = last = None
+    for page_number in page_numbers:
+        if first is not None and page_number == last + 1 and page_number - first < size:
+            last = page_number
+            continue
+        if first is not None:
+            yield first, last
+        first = last = page_number
+    if first is not None:
+        yield first, last
+
+def page_hash(source: str, content: bytes) -> str:
+    """Identity of a page's content: its text layer, or the pixels it renders to."""
+    return hashlib.sha256(source.encode() + b"\0" + content).hexdigest()
+
+def _timed_ocr(image: Image, profile: Dict[str, Any], rerender: Callable[[int], Image]):
+    """OCR a rendered page; adaptive profiles re-render it once if it reads poorly."""
+    started = time.perf_counter()
+    details = {"dpi": profile["dpi"]}
+    if "min_confidence" not in profile:
+        text = _process_page(image, profile["tesseract_config"])
+    else:
+        text, confidence = _process_page_scored(image, profile["tesseract_config"])
+        if confidence is not None and confidence < profile["min_confidence"]:
+            image = rerender(profile["retry_dpi"])
+            text, confidence = _process_page_scored(image, profile["tesseract_config"])
+            details["dpi"] = profile["retry_dpi"]
+            details["rerendered"] = True
+        details["ocr_confidence"] = confidence
+    return text, time.perf_counter() - started, details
+
+def _put(pipeline: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the consumer has gone away."""
+    while not stop.is_set():
+        try:
+            pipeline.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _acquire(slots: threading.Semaphore, count: int, stop: threading.Event) -> bool:
+    """Take `count` slots, giving up once the consumer has gone away."""
+    for _ in range(count):
+        while not slots.acquire(timeout=0.1):
+            if stop.is_set():
+                return False
+    return True
+
+def _rasterize(pdf_path: str, page_numbers: List[int], poppler_path: str, executor: ThreadPoolExecutor,
+               pipeline: queue.Queue, slots: threading.Semaphore, window: int, stop: threading.Event,
+               known_pages: Dict[str, str], profile: Dict[str, Any]):
+    """
+    Producer: renders pages in order, up to `window` consecutive ones per
+    pdftoppm run, and hands each one to the OCR pool. A window is only
+    rendered once it has a slot for each of its pages; the consumer frees a
+    slot per page it takes, so at most the number of slots of rendered pages
+    wait for OCR. Pages whose rendering hashes to an entry of `known_pages`
+    skip OCR.
+    """
+    try:
+        for first, last in _windows(page_numbers, window):
+            if not _acquire(slots, last - first + 1, stop):
+                return
+            started = time.perf_counter()
+            try:
+                images = _render_for_ocr(pdf_path, first, last, poppler_path, profile)
+                error = None
+            except Exception as exc:
+                images, error = [], exc
+            render_seconds = (time.perf_counter() - started) / (last - first + 1)
+            for page_number in range(first, last + 1):
+                digest = None
+                future = Future()
+                if page_number - first < len(images):
+                    image = images[page_number - first]
+                    images[page_number - first] = None
+                    digest = page_hash("ocr", image.tobytes())
+                    if digest in known_pages:
+                        future.set_result((known_pages[digest], 0.0, {}))
+                    else:
+                        rerender = partial(_rerender, pdf_path, page_number, poppler_path, profile)
+                        future = executor.submit(_timed_ocr, image, profile, rerender)
+                    del image
+                else:
+                    future.set_exception(error or RuntimeError(f"pdftoppm did not render page {page_number}"))
+                if not _put(pipeline, (page_number, render_seconds, future, digest), stop):
+                    return
+    finally:
+        _put(pipeline, _DONE, stop)
+
+def _classify_pages(pdf_path: str, poppler_path: str, min_native_chars: int) -> List[Dict[str, Any]]:
+    """Reads the text layer of every page and marks the ones that need OCR."""
     try:
         info = pdfinfo_from_path(pdf_path, userpw=None, poppler_path=poppler_path)
         total_pages = info['Pages']
@@ -23,45 +226,142 @@ def extract_text_from_pdf(pdf_path: str, poppler_path: str = None) -> str:
         print(f"Could not get PDF info, proceeding without page count. Error: {e}")
         total_pages = 0 # Indicates we don't know the page count
 
-    full_text = []
-    batch_size = 10  # Process 10 pages at a time
-    
-    # Determine the number of workers based on CPU cores, but not more than the batch size
-    max_workers = min(os.cpu_count() or 1, batch_size)
-
-    for i in range(1, total_pages + 1, batch_size):
-        first_page = i
-        last_page = min(i + batch_size - 1, total_pages)
-        
-        with tempfile.TemporaryDirectory() as temp_dir:
-            images = convert_from_path(
-                pdf_path,
-                output_folder=temp_dir,
-                fmt='png',
-                poppler_path=poppler_path,
-                first_page=first_page,
-                last_page=last_page,
-                thread_count=max_workers # Use threads for faster image conversion
-            )
-            
-            page_texts = ["" for _ in range(len(images))]
-
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Create a future for each page's OCR task
-                future_to_index = {
-                    executor.submit(_process_page, image): j for j, image in enumerate(images)
-                }
-
-                for future in as_completed(future_to_index):
-                    index = future_to_index[future]
-                    try:
-                        text = future.result()
-                        page_number = first_page + index
-                        page_texts[index] = f"--- Page {page_number} ---\n{text}\n\n"
-                    except Exception as exc:
-                        page_number = first_page + index
-                        print(f'Page {page_number} generated an exception: {exc}')
-
-            full_text.extend(page_texts)
-
-    return "".join(full_text)
+    started = time.perf_counter()
+    native_texts = extract_native_text(pdf_path, poppler_path=poppler_path)
+    native_elapsed = time.perf_counter() - started
+
+    if not total_pages:
+        # Fall back to the pdftotext page count, dropping the empty tail after the last form feed
+        total_pages = len(native_texts) - 1 if native_texts and not native_texts[-1] else len(native_texts)
+    native_seconds = native_elapsed / total_pages if total_pages else 0.0
+
+    pages = []
+    for page_number in range(1, total_pages + 1):
+        text = native_texts[page_number - 1] if page_number <= len(native_texts) else ""
+        if has_text_layer(text, min_native_chars):
+            pages.append({
+                "page": page_number, "text": text, "source": "native", "seconds": native_seconds,
+                "hash": page_hash("native", text.encode("utf-8"))
+            })
+        else:
+            pages.append({"page": page_number, "text": "", "source": "ocr", "seconds": native_seconds})
+    return pages
+
+def iter_pages(pdf_path: str, poppler_path: str = None, min_native_chars: int = MIN_NATIVE_CHARS,
+               queue_depth: int = QUEUE_DEPTH, max_workers: Optional[int] = None,
+               on_page_count: Optional[Callable[[int], None]] = None,
+               known_pages: Optional[Dict[str, str]] = None, profile: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Extracts text page by page and yields each page in order as soon as it is
+    ready. Pages with a usable embedded text layer are read directly with
+    pdftotext; only pages with no or a very sparse text layer are rasterized
+    and OCR'd.
+
+    Scanned pages flow through a producer/consumer pipeline: one thread renders
+    upcoming pages to in-memory PPM images, runs of consecutive scanned pages
+    up to half of `queue_depth` at a time with one pdftoppm call, while a
+    thread pool OCRs the current ones. The bounded queue between them caps the
+    number of rendered pages waiting in memory at `queue_depth`, independent
+    of the page count.
+
+    Each yielded dict carries the page number, its text, its provenance
+    ("native" or "ocr") and the seconds spent extracting it; OCR'd pages also
+    split that into "render_seconds" and "ocr_seconds". `on_page_count`,
+    if given, is called with the number of pages before the first is yielded.
+
+    Every page also carries a "hash" of its content (see `page_hash`): of the
+    text layer for native pages, of the rendered pixels for scanned ones.
+    `known_pages` maps hashes of previously OCR'd pages to their text; such
+    pages are still rendered but not OCR'd again, and are marked "reused".
+
+    `profile` names the OCR_PROFILES entry scanned pages are rendered and read
+    with. OCR'd pages report the "dpi" they were finally read at; with the
+    adaptive profile also their "ocr_confidence" and whether they were
+    "rerendered" (the second rendering counts towards "ocr_seconds").
+    """
+    settings = get_profile(profile)
+    pages = _classify_pages(pdf_path, poppler_path, min_native_chars)
+    if on_page_count is not None:
+        on_page_count(len(pages))
+    ocr_page_numbers = [page["page"] for page in pages if page["source"] == "ocr"]
+    if not ocr_page_numbers:
+        yield from pages
+        return
+
+    pipeline = queue.Queue(maxsize=max(1, queue_depth))
+    slots = threading.Semaphore(max(1, queue_depth))
+    # Half the queue, so the next window renders while the rest of the queue is OCR'd
+    window = max(1, queue_depth // 2)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+    producer = threading.Thread(
+        target=_rasterize,
+        args=(pdf_path, ocr_page_numbers, poppler_path, executor, pipeline, slots, window, stop, known_pages or {},
+              settings),
+        daemon=True
+    )
+    producer.start()
+
+    try:
+        for page in pages:
+            if page["source"] == "ocr":
+                item = pipeline.get()
+                if item is _DONE:
+                    break
+                slots.release()
+                page_number, render_seconds, future, digest = item
+                try:
+                    text, ocr_seconds, details = future.result()
+                except Exception as exc:
+                    print(f'Page {page_number} generated an exception: {exc}')
+                    text, ocr_seconds, details = "", 0.0, {}
+                page.update(details)
+                page["text"] = text
+                page["hash"] = digest
+                page["reused"] = digest in (known_pages or {})
+                page["render_seconds"] = render_seconds
+                page["ocr_seconds"] = ocr_seconds
+                page["seconds"] += render_seconds + ocr_seconds
+            yield page
+    finally:
+        # Also reached when the caller stops iterating early
+        stop.set()
+        producer.join()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def extract_pages(pdf_path: str, poppler_path: str = None, min_native_chars: int = MIN_NATIVE_CHARS,
+                  queue_depth: int = QUEUE_DEPTH, max_workers: Optional[int] = None,
+                  known_pages: Optional[Dict[str, str]] = None, profile: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Collects every page produced by `iter_pages`."""
+    return list(iter_pages(
+        pdf_path,
+        poppler_path=poppler_path,
+        min_native_chars=min_native_chars,
+        queue_depth=queue_depth,
+        max_workers=max_workers,
+        known_pages=known_pages,
+        profile=profile
+    ))
+
+def format_pages(pages: List[Dict[str, Any]]) -> str:
+    """Joins extracted pages into a single text tagged with page markers."""
+    return "".join(f"--- Page {page['page']} ---\n{page['text']}\n\n" for page in pages)
+
+def summarize_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarizes the native/OCR split of an extraction."""
+    native = [page for page in pages if page["source"] == "native"]
+    scanned = [page for page in pages if page["source"] == "ocr"]
+    return {
+        "native_pages": len(native),
+        "ocr_pages": len(scanned),
+        "rerendered_pages": sum(1 for page in scanned if page.get("rerendered")),
+        "native_seconds": sum(page["seconds"] for page in native),
+        "ocr_seconds": sum(page["seconds"] for page in scanned)
+    }
+
+def extract_text_from_pdf(pdf_path: str, poppler_path: str = None) -> str:
+    """
+    Extracts text from a PDF, using the embedded text layer where there is one
+    and OCR for scanned pages.
+    """
+    return format_pages(extract_pages(pdf_path, poppler_path=poppler_path))
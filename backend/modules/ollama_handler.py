@@ -1,16 +1,87 @@
-import requests
-from typing import Optional
+import asyncio
+import json
+import time
+import httpx
+from typing import Any, AsyncIterator, Dict, Optional
+
+from modules import metrics
 
 class OllamaHandler:
-    def __init__(self, model_name: str = "phi3", base_url: str = "http://localhost:11434"):
+    def __init__(self, model_name: str = "phi3", base_url: str = "http://localhost:11434",
+                 timeout: float = 300, connect_timeout: float = 5, keep_alive: Optional[str] = None,
+                 health_ttl: float = 30, max_connections: int = 10):
         self.model_name = model_name
         self.base_url = base_url
         self.api_endpoint = f"{base_url}/api/generate"
-        self.timeout = 300  # 300 seconds timeout
+        self.timeout = timeout  # seconds to wait for generation
+        self.connect_timeout = connect_timeout
+        self.keep_alive = keep_alive  # how long Ollama keeps the model loaded, e.g. "30m"
+        self.health_ttl = health_ttl
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._health: Optional[tuple[bool, Optional[str]]] = None
+        self._health_checked_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive connection pool, bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def start(self):
+        """Warm the health cache and keep it fresh in the background."""
+        await self.ensure_healthy()
+        self._refresh_task = asyncio.create_task(self._refresh_health())
+
+    async def aclose(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _refresh_health(self):
+        while True:
+            await asyncio.sleep(self.health_ttl)
+            await self._update_health()
 
-    def generate_response(self, query: str, context: str) -> str:
-        """Generate a response using Ollama based on the query and context."""
-        prompt = f"""Based on the following context from a PDF document, please answer the question. 
+    async def _update_health(self) -> tuple[bool, Optional[str]]:
+        self._health = await self.check_health()
+        self._health_checked_at = time.monotonic()
+        return self._health
+
+    async def ensure_healthy(self) -> tuple[bool, Optional[str]]:
+        """
+        Cached variant of check_health. A healthy result is trusted for
+        `health_ttl` seconds; a failed one is re-checked on every call so that
+        recovery is noticed immediately.
+        """
+        fresh = time.monotonic() - self._health_checked_at < self.health_ttl
+        if self._health is not None and self._health[0] and fresh:
+            return self._health
+        return await self._update_health()
+
+    def cached_health(self) -> Optional[dict]:
+        """Last health check result without making a request, or None before the first check."""
+        if self._health is None:
+            return None
+        healthy, error = self._health
+        return {"healthy": healthy, "error": error, "age_seconds": time.monotonic() - self._health_checked_at}
+
+    def build_prompt(self, query: str, context: str) -> str:
+        """Build the question-answering prompt sent to the model."""
+        return f"""Based on the following context from a PDF document, please answer the question. 
         Be concise, clear, and only use information from the provided context.
 
         Context:
@@ -20,43 +91,135 @@ class OllamaHandler:
 
         Answer:"""
 
+    def build_followup_prompt(self, query: str, context: str) -> str:
+        """Build the prompt of a follow-up question, holding only passages the conversation has not seen yet."""
+        if not context:
+            return f"""Question: {query}
+
+        Answer:"""
+        return f"""Additional context from the document:
+        {context}
+
+        Question: {query}
+
+        Answer:"""
+
+    def _prompt(self, query: str, context: str, conversation: Optional[Dict[str, Any]]) -> str:
+        if conversation is not None and conversation.get("context"):
+            return self.build_followup_prompt(query, context)
+        return self.build_prompt(query, context)
+
+    def _payload(self, prompt: str, stream: bool, conversation: Optional[Dict[str, Any]] = None) -> dict:
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": stream
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if conversation is not None and conversation.get("context"):
+            # Ollama resumes from this state instead of evaluating the earlier turns again
+            payload["context"] = conversation["context"]
+        return payload
+
+    async def generate_response(self, query: str, context: str, timings: Optional[Dict[str, float]] = None,
+                                conversation: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a response using Ollama based on the query and context. If
+        `timings` is given, the generation time, time to first token and the
+        prompt's token count are added to it. A `conversation` (see
+        modules.chat_sessions) continues from its Ollama "context", asking
+        with a follow-up prompt, and receives the new context on success.
+        """
+        prompt = self._prompt(query, context, conversation)
+
         try:
             # Check if Ollama is available first
-            health_check, error_msg = self.check_health()
+            health_check, error_msg = await self.ensure_healthy()
             if not health_check:
                 return f"Ollama service error: {error_msg}"
 
-            response = requests.post(
-                self.api_endpoint,
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=self.timeout
-            )
+            started = time.perf_counter()
+            with metrics.LLM_IN_FLIGHT.track_inprogress():
+                response = await self._get_client().post(
+                    self.api_endpoint, json=self._payload(prompt, stream=False, conversation=conversation)
+                )
             response.raise_for_status()
-            return response.json()["response"].strip()
-        except requests.Timeout:
+            result = response.json()
+            # Unstreamed, the first token is only visible in Ollama's own stats (nanoseconds)
+            first_token = (result.get("load_duration", 0) + result.get("prompt_eval_duration", 0)) / 1e9
+            self._observe(started, first_token or None, "complete", timings, result.get("prompt_eval_count"))
+            if conversation is not None:
+                conversation["context"] = result.get("context")
+            return result["response"].strip()
+        except httpx.TimeoutException:
             return "Error: Request to Ollama timed out. Please try again."
-        except requests.ConnectionError:
+        except httpx.ConnectError:
             return "Error: Could not connect to Ollama. Please ensure the service is running."
         except Exception as e:
             return f"Error generating response: {str(e)}"
 
-    def check_health(self) -> tuple[bool, Optional[str]]:
+    async def stream_response(self, query: str, context: str, timings: Optional[Dict[str, float]] = None,
+                              conversation: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a response token by token from Ollama's NDJSON generate API.
+        Raises RuntimeError if Ollama is unavailable or reports an error.
+        `timings`, if given, receives the generation times and prompt token
+        count once the stream ends, and `conversation` its new context, as
+        with generate_response.
+        """
+        health_check, error_msg = await self.ensure_healthy()
+        if not health_check:
+            raise RuntimeError(f"Ollama service error: {error_msg}")
+
+        payload = self._payload(self._prompt(query, context, conversation), stream=True, conversation=conversation)
+        started = time.perf_counter()
+        first_token = prompt_tokens = None
+        with metrics.LLM_IN_FLIGHT.track_inprogress():
+            async with self._get_client().stream("POST", self.api_endpoint, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(f"Ollama error: {chunk['error']}")
+                    if chunk.get("response"):
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        prompt_tokens = chunk.get("prompt_eval_count")
+                        if conversation is not None:
+                            conversation["context"] = chunk.get("context")
+                        break
+        self._observe(started, first_token, "stream", timings, prompt_tokens)
+
+    @staticmethod
+    def _observe(started: float, first_token: Optional[float], mode: str, timings: Optional[Dict[str, float]],
+                 prompt_tokens: Optional[int] = None):
+        seconds = time.perf_counter() - started
+        metrics.LLM_GENERATION_SECONDS.labels(mode).observe(seconds)
+        if first_token is not None:
+            metrics.LLM_TIME_TO_FIRST_TOKEN.labels(mode).observe(first_token)
+        if timings is not None:
+            timings["llm_seconds"] = seconds
+            timings["llm_time_to_first_token_seconds"] = first_token
+            timings["prompt_tokens"] = prompt_tokens
+
+    async def check_health(self) -> tuple[bool, Optional[str]]:
         """Check if Ollama is running and the model is available."""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = await self._get_client().get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 models = [model["name"] for model in response.json()["models"]]
                 if self.model_name in models:
                     return True, None
                 return False, f"Model {self.model_name} not found. Available models: {', '.join(models)}"
             return False, f"Ollama returned status code {response.status_code}"
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return False, "Ollama health check timed out"
-        except requests.ConnectionError:
+        except httpx.ConnectError:
             return False, "Could not connect to Ollama. Is it running?"
         except Exception as e:
-            return False, f"Error checking Ollama health: {str(e)}" 
\ No newline at end of file
+            return False, f"Error checking Ollama health: {str(e)}"
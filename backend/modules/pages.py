@@ -0,0 +1,71 @@
+"""
+Page layout of a document's cleaned text. Pages are cleaned one by one and
+kept as contiguous spans of the text, after a "--- Page N ---" marker, so
+chunks never cross a page, every chunk can be traced back to its page and
+an unchanged page of a new document version produces the same chunks.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from modules import processor_interface
+from modules.chunks import Chunks
+from modules.ocr import page_hash
+
+_PAGE_MARKER = re.compile(r"--- Page (\d+) ---")
+
+def assemble(pages: List[Dict[str, Any]], text: str = "") -> str:
+    """
+    Clean each extracted page and join them into the document text, after the
+    already assembled `text` of earlier pages if given. Annotates every page
+    in place with the "char_start"/"char_end" of its cleaned body and, for
+    pages extracted without one, a "hash" of that body.
+    """
+    for page in pages:
+        body = processor_interface.clean_text(page["text"])
+        text += (" " if text else "") + f"--- Page {page['page']} ---"
+        if body:
+            text += " "
+        page["char_start"] = len(text)
+        text += body
+        page["char_end"] = len(text)
+        if page.get("hash") is None:
+            page["hash"] = page_hash(page["source"], body.encode("utf-8"))
+    return text
+
+def has_layout(pages: List[Dict[str, Any]]) -> bool:
+    """Whether `pages` were laid out by `assemble` and chunked by `split`."""
+    return all("chunk_start" in page for page in pages)
+
+def split(text: str, pages: List[Dict[str, Any]], chunk_size: int, overlap: int,
+          snap_to_sentence: bool = True, first_chunk: int = 0) -> Chunks:
+    """
+    Chunk every page of an assembled text on its own, annotating each page
+    with the "chunk_start"/"chunk_end" range of its chunks (and so of their
+    embedding rows), counted from `first_chunk` when earlier pages were
+    chunked separately.
+    """
+    spans = np.array([(page["char_start"], page["char_end"]) for page in pages], dtype=np.int64).reshape(-1, 2)
+    chunks, ranges = Chunks.split_pages(text, spans, chunk_size, overlap, snap_to_sentence)
+    for page, (chunk_start, chunk_end) in zip(pages, ranges.tolist()):
+        page["chunk_start"], page["chunk_end"] = first_chunk + chunk_start, first_chunk + chunk_end
+    return chunks
+
+def layout_from_text(text: str) -> List[Dict[str, Any]]:
+    """Recover page spans from the page markers of a text stored without a layout."""
+    markers = list(_PAGE_MARKER.finditer(text))
+    return [{
+        "page": int(marker.group(1)),
+        "char_start": marker.end(),
+        "char_end": markers[i + 1].start() if i + 1 < len(markers) else len(text)
+    } for i, marker in enumerate(markers)]
+
+def chunk_pages(spans: np.ndarray, pages: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Page number of each chunk, by where it starts; None without a layout."""
+    if not pages:
+        return None
+    starts = np.array([page["char_start"] for page in pages], dtype=np.int64)
+    numbers = np.array([page["page"] for page in pages], dtype=np.int64)
+    index = np.searchsorted(starts, np.asarray(spans)[:, 0], side="right") - 1
+    return numbers[np.clip(index, 0, None)]
@@ -1,7 +1,6 @@
 # modules/processor_interface.py
 import processor_bindings
-from typing import List
-import re
+import numpy as np
 
 def add(a: int, b: int) -> int:
     """Test function - add two integers"""
@@ -13,20 +12,18 @@ def reverse_text(text: str) -> str:
 
 def clean_text(text: str) -> str:
     """
-    Clean and normalize text
+    Clean and normalize text: collapse whitespace, keep only word characters
+    and basic punctuation, and trim. Done in a single C++ pass that releases
+    the GIL, so concurrent ingest workers can clean in parallel.
     """
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Remove special characters but keep basic punctuation
-    text = re.sub(r'[^\w\s.,!?-]', '', text)
-    
-    """Clean text by removing extra whitespaces using C++"""
-    return processor_bindings.clean_text(text)
+    return processor_bindings.normalize_text(text)
 
-def split_into_chunks(text: str, chunk_size: int = 100) -> List[str]:
-    """Split text into chunks using C++"""
-    return processor_bindings.split_into_chunks(text, chunk_size)
+def chunk_spans(text: str, chunk_size: int, overlap: int, snap_to_sentence: bool = True) -> np.ndarray:
+    """
+    Split text into overlapping chunks of `chunk_size` words using C++,
+    returned as an (n, 2) int64 array of (start, end) character offsets
+    """
+    return processor_bindings.chunk_spans(text, chunk_size, overlap, snap_to_sentence)
 
 def count_words(text: str) -> int:
     """Count words in text using C++"""
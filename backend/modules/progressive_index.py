@@ -0,0 +1,91 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from modules import pages as page_layout
+from modules.chunks import Chunks
+
+class ProgressiveIndexer:
+    """
+    Builds a document's cleaned text, chunks and embeddings batch by batch
+    while its pages are still being extracted, handing each grown prefix of
+    the document to `publish` so it can be searched long before the last page
+    of a long scan is OCR'd.
+
+    Pages are cleaned and chunked on their own (see modules.pages), so the
+    chunks and embeddings of earlier pages never change as pages are
+    appended, and the finished index is the one a single pass would build.
+    Every publish stores the whole prefix again (text, spans, embeddings and
+    a BM25 index over all its chunks), so batches start at `first_batch`
+    pages and then double without a cap: each publish covers twice the pages
+    of the one before, the prefixes published add up to less than twice the
+    document, and the total republishing cost stays linear in its length.
+    """
+
+    def __init__(self, chunking: Dict[str, Any], embed: Callable[[List[str]], np.ndarray],
+                 publish: Optional[Callable[["ProgressiveIndexer"], None]] = None,
+                 first_batch: int = 4):
+        self.chunking = chunking
+        self.embed = embed
+        self.publish = publish
+        self.first_batch = first_batch
+        self.pages: List[Dict[str, Any]] = []
+        self.pages_total = 0  # set once known; the complete document is stored by the caller, not published
+        self.text = ""
+        self.published_chunks = 0  # chunks already handed to `publish`
+        self.published_at: Optional[float] = None  # perf_counter of the first publish
+        self.timings = {"clean_seconds": 0.0, "chunk_seconds": 0.0, "embed_seconds": 0.0, "publish_seconds": 0.0}
+        self._pending: List[Dict[str, Any]] = []
+        self._spans: List[np.ndarray] = [np.zeros((0, 2), dtype=np.int64)]
+        self._embeddings: List[np.ndarray] = []
+
+    @property
+    def chunks(self) -> Chunks:
+        return Chunks(self.text, np.concatenate(self._spans))
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        if not self._embeddings:
+            return self.embed([])
+        return np.concatenate(self._embeddings)
+
+    @property
+    def busy_seconds(self) -> float:
+        """Time spent indexing and publishing, as opposed to waiting for pages."""
+        return sum(self.timings.values())
+
+    def _batch_size(self) -> int:
+        return max(self.first_batch, len(self.pages))
+
+    def add(self, page: Dict[str, Any]):
+        """Queue an extracted page, indexing and publishing once a batch is full."""
+        self._pending.append(page)
+        if len(self._pending) >= self._batch_size():
+            self._index_pending()
+            if self.publish is not None and len(self.pages) < self.pages_total:
+                started = time.perf_counter()
+                self.publish(self)
+                self.published_chunks = len(self.chunks)
+                self.published_at = self.published_at or time.perf_counter()
+                self.timings["publish_seconds"] += time.perf_counter() - started
+
+    def finish(self):
+        """Index the remaining pages; the caller stores the complete document."""
+        self._index_pending()
+
+    def _index_pending(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        started = time.perf_counter()
+        self.text = page_layout.assemble(batch, self.text)
+        cleaned = time.perf_counter()
+        new_chunks = page_layout.split(self.text, batch, **self.chunking, first_chunk=len(self.chunks))
+        chunked = time.perf_counter()
+        self._embeddings.append(self.embed(list(new_chunks)))
+        self._spans.append(new_chunks.spans)
+        self.pages.extend(batch)
+        self.timings["clean_seconds"] += cleaned - started
+        self.timings["chunk_seconds"] += chunked - cleaned
+        self.timings["embed_seconds"] += time.perf_counter() - chunked
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Provider(Generic[T]):
+    """
+    Builds an expensive component (a model, a database client) on first use
+    instead of at import time. Concurrent first callers wait for a single
+    build; a failed build is retried on the next call. The build time is kept
+    so startup costs stay visible.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._ready = False
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                started = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.seconds = time.perf_counter() - started
+                self.error = None
+                self._ready = True
+        return self._value
+
+    async def aget(self) -> T:
+        """Like get, but builds on a worker thread so the event loop keeps serving."""
+        if self._ready:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready": self._ready, "seconds": self.seconds, "error": self.error}
@@ -0,0 +1,100 @@
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+def top_k(query_embedding: np.ndarray, embeddings: np.ndarray, k: int = 3) -> List[Tuple[int, float]]:
+    """
+    Return (chunk index, cosine similarity) of the `k` chunks closest to the
+    query, best first. Both sides must be L2-normalized, so a single
+    matrix-vector product gives the cosine similarities.
+    """
+    if len(embeddings) == 0 or k <= 0:
+        return []
+    scores = embeddings @ query_embedding
+    k = min(k, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    return [(int(i), float(scores[i])) for i in best]
+
+def most_representative(embeddings: np.ndarray) -> int:
+    """Index of the chunk closest to the document's mean embedding."""
+    mean = embeddings.mean(axis=0)
+    norm = np.linalg.norm(mean)
+    if norm:
+        mean = mean / norm
+    return int(np.argmax(embeddings @ mean))
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based rank of every entry, highest score first."""
+    ranks = np.empty(len(scores), dtype=np.float32)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return ranks
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    spread = scores.max() - scores.min() if len(scores) else 0
+    return (scores - scores.min()) / spread if spread else np.ones_like(scores)
+
+def fuse(similarities: np.ndarray, bm25_scores: np.ndarray, method: str = "rrf", rrf_k: int = 60,
+         dense_weight: float = 0.5) -> np.ndarray:
+    """
+    Combine dense and BM25 scores of the same candidates. "rrf" is reciprocal
+    rank fusion (chunks without a BM25 match get no lexical contribution);
+    "weighted" mixes min-max normalized scores with `dense_weight`.
+    """
+    if method == "rrf":
+        lexical = np.where(bm25_scores > 0, 1.0 / (rrf_k + _ranks(bm25_scores)), 0.0)
+        return (1.0 / (rrf_k + _ranks(similarities)) + lexical).astype(np.float32)
+    if method == "weighted":
+        return dense_weight * _min_max(similarities) + (1 - dense_weight) * _min_max(bm25_scores)
+    raise ValueError(f"Unknown fusion method: {method}")
+
+def hybrid_top_k(query: str, query_embedding: np.ndarray, embeddings: np.ndarray, bm25, k: int = 3,
+                 mode: str = "hybrid", fusion: str = "rrf", candidates: int = 100, rrf_k: int = 60,
+                 dense_weight: float = 0.5) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Retrieve the `k` best chunks as [{index, similarity, score}], best first,
+    plus per-stage timings. `mode` is "dense" (cosine over every chunk),
+    "bm25" (lexical matches only) or "hybrid": BM25 prunes the document to
+    its top `candidates` chunks, only those are scored densely and the two
+    rankings are fused. When BM25 finds fewer than `k` matches, the dense
+    top-k over the whole document is added to the candidates.
+    """
+    timings: Dict[str, Any] = {"mode": mode}
+    if mode == "dense":
+        started = time.perf_counter()
+        hits = top_k(query_embedding, embeddings, k)
+        timings["dense_seconds"] = time.perf_counter() - started
+        return [{"index": i, "similarity": s, "score": s} for i, s in hits], timings
+
+    started = time.perf_counter()
+    lexical = bm25.top_k(query, k if mode == "bm25" else candidates)
+    timings["bm25_seconds"] = time.perf_counter() - started
+    timings["candidates"] = len(lexical)
+
+    started = time.perf_counter()
+    candidate_ids = np.array([i for i, _ in lexical], dtype=np.int64)
+    if mode == "hybrid" and len(candidate_ids) < k:
+        dense_ids = [i for i, _ in top_k(query_embedding, embeddings, k)]
+        candidate_ids = np.concatenate([candidate_ids, np.setdiff1d(dense_ids, candidate_ids)]).astype(np.int64)
+    similarities = embeddings[candidate_ids] @ query_embedding if len(candidate_ids) else np.zeros(0, np.float32)
+    timings["dense_seconds"] = time.perf_counter() - started
+
+    if mode == "bm25":
+        return [
+            {"index": i, "similarity": float(similarity), "score": score}
+            for (i, score), similarity in zip(lexical, similarities)
+        ], timings
+    if mode != "hybrid":
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+
+    started = time.perf_counter()
+    bm25_scores = np.zeros(len(candidate_ids), dtype=np.float32)
+    bm25_scores[:len(lexical)] = [score for _, score in lexical]
+    fused = fuse(similarities, bm25_scores, fusion, rrf_k, dense_weight)
+    best = np.argsort(-fused, kind="stable")[:k]
+    timings["fusion_seconds"] = time.perf_counter() - started
+    return [
+        {"index": int(candidate_ids[j]), "similarity": float(similarities[j]), "score": float(fused[j])}
+        for j in best
+    ], timings
@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Chroma rejects very large add() calls, so chunks are written in slices
+ADD_BATCH_SIZE = 1000
+
+def build_where(document_ids: Optional[Sequence[str]] = None, filename: Optional[str] = None,
+                uploaded_after: Optional[float] = None, uploaded_before: Optional[float] = None,
+                tags: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """Translate search filters into a Chroma metadata `where` clause."""
+    conditions = []
+    if document_ids:
+        conditions.append({"document_id": {"$in": list(document_ids)}})
+    if filename:
+        conditions.append({"filename": {"$eq": filename}})
+    if uploaded_after is not None:
+        conditions.append({"uploaded_at": {"$gte": uploaded_after}})
+    if uploaded_before is not None:
+        conditions.append({"uploaded_at": {"$lte": uploaded_before}})
+    for tag in tags or []:
+        conditions.append({f"tag:{tag}": {"$eq": True}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+class VectorIndex:
+    """
+    Approximate nearest-neighbour index over the chunks of every document,
+    backed by the HNSW index of a Chroma collection in cosine space. Chunk
+    metadata (document, filename, upload time, tags) lets searches be
+    pre-filtered to a subset of the library.
+    """
+
+    def __init__(self, client, name: str = "document_chunks", search_ef: int = 100, construction_ef: int = 200):
+        self.client = client
+        self.name = name
+        # Chroma's default search_ef of 10 trades too much recall for speed at top-k of 5-10
+        self._collection_metadata = {
+            "hnsw:space": "cosine",
+            "hnsw:search_ef": search_ef,
+            "hnsw:construction_ef": construction_ef
+        }
+        self.collection = client.get_or_create_collection(name, metadata=self._collection_metadata)
+
+    def add_document(self, document_id: str, filename: str, chunks: Sequence[str], embeddings: np.ndarray,
+                     uploaded_at: float, tags: Sequence[str] = (), spans: Optional[np.ndarray] = None,
+                     pages: Optional[np.ndarray] = None, start: int = 0):
+        """
+        Index a document's chunks from index `start` on, the earlier ones
+        having been indexed already; `spans` adds each chunk's character
+        offsets to its metadata and `pages` the number of the page it comes from.
+        """
+        metadata = {"document_id": document_id, "filename": filename, "uploaded_at": uploaded_at}
+        metadata.update({f"tag:{tag}": True for tag in tags})
+        for start in range(start, len(chunks), ADD_BATCH_SIZE):
+            end = min(start + ADD_BATCH_SIZE, len(chunks))
+            metadatas = [{**metadata, "chunk_index": i} for i in range(start, end)]
+            if spans is not None:
+                for chunk_metadata, (char_start, char_end) in zip(metadatas, spans[start:end].tolist()):
+                    chunk_metadata.update(char_start=char_start, char_end=char_end)
+            if pages is not None:
+                for chunk_metadata, page in zip(metadatas, pages[start:end].tolist()):
+                    chunk_metadata["page"] = page
+            self.collection.add(
+                ids=[f"{document_id}:{i}" for i in range(start, end)],
+                embeddings=embeddings[start:end].tolist(),
+                documents=list(chunks[start:end]),
+                metadatas=metadatas
+            )
+
+    def delete_document(self, document_id: str):
+        self.collection.delete(where={"document_id": document_id})
+
+    def clear(self):
+        """
+        Remove every chunk. The collection is emptied in place rather than
+        dropped and recreated, since other workers sharing the Chroma server
+        hold its ID and would otherwise fail on their next add or query.
+        """
+        while True:
+            ids = self.collection.get(limit=ADD_BATCH_SIZE, include=[])["ids"]
+            if not ids:
+                break
+            self.collection.delete(ids=ids)
+
+    def query(self, query_embedding: np.ndarray, top_k: int = 5, **filters) -> List[Dict[str, Any]]:
+        """Return the `top_k` closest chunks matching `filters` (see build_where), best first."""
+        results = self.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=top_k,
+            where=build_where(**filters),
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            {"text": text, "similarity": 1.0 - distance, "metadata": metadata}
+            for text, metadata, distance in zip(
+                results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+        ]
@@ -1,22 +1,75 @@
 // processor_bindings.cpp (in backend root directory)
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
+#include <cstdint>
 #include <string>
 #include <vector>
 
 namespace py = pybind11;
 
+using CodepointPredicate = bool (*)(uint32_t);
+
 // Forward declarations from processor.cpp
 std::string reverse_text(const std::string& input);
 std::string clean_text(const std::string& input);
-std::vector<std::string> split_into_chunks(const std::string& text, int chunk_size);
 int count_words(const std::string& text);
+std::string normalize_text(const char* data, size_t size, CodepointPredicate is_word, CodepointPredicate is_space);
+std::vector<int64_t> chunk_spans(const char* data, size_t size, int chunk_size, int overlap,
+                                 bool snap_to_sentence, CodepointPredicate is_space);
+
+// Python's own Unicode tables, as used by the re module for \w and \s. They
+// are static lookups and safe to call without the GIL.
+static bool is_word_codepoint(uint32_t codepoint) {
+    return Py_UNICODE_ISALNUM(codepoint) || codepoint == '_';
+}
+
+static bool is_space_codepoint(uint32_t codepoint) {
+    return Py_UNICODE_ISSPACE(codepoint);
+}
+
+// Reads the str's cached UTF-8 buffer directly, so the only copy made is the
+// cleaned output, and releases the GIL while cleaning
+py::str normalize_text_py(const py::str& text) {
+    Py_ssize_t size;
+    const char* data = PyUnicode_AsUTF8AndSize(text.ptr(), &size);
+    if (data == nullptr) {
+        throw py::error_already_set();
+    }
+    std::string result;
+    {
+        py::gil_scoped_release release;
+        result = normalize_text(data, static_cast<size_t>(size), is_word_codepoint, is_space_codepoint);
+    }
+    return py::str(result);
+}
 
 // Simple add function for testing
 int add(int i, int j) {
     return i + j;
 }
 
+// Computes the spans without the GIL and hands them to NumPy without a copy
+py::array_t<int64_t> chunk_spans_py(const py::str& text, int chunk_size, int overlap, bool snap_to_sentence) {
+    Py_ssize_t size;
+    const char* data = PyUnicode_AsUTF8AndSize(text.ptr(), &size);
+    if (data == nullptr) {
+        throw py::error_already_set();
+    }
+    auto spans = new std::vector<int64_t>();
+    try {
+        py::gil_scoped_release release;
+        *spans = chunk_spans(data, static_cast<size_t>(size), chunk_size, overlap, snap_to_sentence,
+                             is_space_codepoint);
+    } catch (...) {
+        delete spans;
+        throw;
+    }
+    py::capsule owner(spans, [](void* p) { delete static_cast<std::vector<int64_t>*>(p); });
+    py::ssize_t rows = static_cast<py::ssize_t>(spans->size() / 2);
+    return py::array_t<int64_t>({rows, py::ssize_t(2)}, spans->data(), owner);
+}
+
 PYBIND11_MODULE(processor_bindings, m) {
     m.doc() = "PDF Processor bindings module";
 
@@ -26,7 +79,11 @@ PYBIND11_MODULE(processor_bindings, m) {
     // Text processing functions
     m.def("reverse_text", &reverse_text, "Reverse a string");
     m.def("clean_text", &clean_text, "Clean text by removing extra whitespaces");
-    m.def("split_into_chunks", &split_into_chunks, "Split text into chunks",
-        py::arg("text"), py::arg("chunk_size") = 100);
+    m.def("normalize_text", &normalize_text_py,
+        "Collapse whitespace and drop characters other than word characters and .,!?- in one pass",
+        py::arg("text"));
+    m.def("chunk_spans", &chunk_spans_py,
+        "Overlapping word chunks of text as an (n, 2) int64 array of (start, end) character offsets",
+        py::arg("text"), py::arg("chunk_size"), py::arg("overlap"), py::arg("snap_to_sentence") = true);
     m.def("count_words", &count_words, "Count words in text");
 }
\ No newline at end of file
@@ -1,3 +1,5 @@
+import os
+import shutil
 import uvicorn
 from uvicorn_config import log_config
 from config import Config
@@ -5,17 +7,33 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def worker_count() -> int:
+    """Configured workers, or 1 when the vector index cannot be shared between processes."""
+    if Config.API_WORKERS > 1 and not Config.CHROMA_SERVER_HOST:
+        logger.warning(
+            f"API_WORKERS={Config.API_WORKERS} needs a Chroma server (CHROMA_SERVER_HOST); "
+            "the embedded vector index is single-process, starting 1 worker"
+        )
+        return 1
+    return Config.API_WORKERS
+
 if __name__ == "__main__":
     try:
-        logger.info(f"Starting server on {Config.API_HOST}:{Config.API_PORT}")
+        workers = worker_count()
+        if workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+            # Workers write their metrics here so /metrics reports all of them; stale files would double count
+            shutil.rmtree(Config.METRICS_DIR, ignore_errors=True)
+            Config.METRICS_DIR.mkdir(parents=True)
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(Config.METRICS_DIR)
+        logger.info(f"Starting server on {Config.API_HOST}:{Config.API_PORT} with {workers} worker(s)")
         uvicorn.run(
             "main:app",
             host=Config.API_HOST,
             port=Config.API_PORT,
             reload=False,
             log_config=log_config,
-            workers=1
+            workers=workers
         )
     except Exception as e:
         logger.error(f"Failed to start server: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
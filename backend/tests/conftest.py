@@ -0,0 +1,20 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from config import Config
+
+# The app under test gets stores of its own, set before any test imports main, so test runs
+# neither see nor leave behind the documents, jobs and index entries of the real data directory
+_data_dir = Path(tempfile.mkdtemp(prefix="pdf-chatbot-tests-"))
+Config.CHROMA_DB_PATH = _data_dir / "chroma_db"
+Config.TEMP_DIR = _data_dir / "temp"
+Config.INGEST_CACHE_DIR = _data_dir / "ingest_cache"
+Config.DATA_DIR = _data_dir / "data"
+Config.DOCUMENT_DB_PATH = Config.DATA_DIR / "documents.sqlite3"
+Config.DOCUMENTS_DIR = Config.DATA_DIR / "documents"
+Config.JOB_DB_PATH = Config.DATA_DIR / "jobs.sqlite3"
+Config.METRICS_DIR = Config.DATA_DIR / "metrics"
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_data_dir, ignore_errors=True)
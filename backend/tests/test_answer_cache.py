@@ -0,0 +1,58 @@
+import numpy as np
+
+from modules.answer_cache import AnswerCache
+
+def _unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_exact_hit_needs_the_same_document_model_and_prompt():
+    cache = AnswerCache()
+    cache.put("doc", "phi3", "prompt", "context", "answer", ["doc"])
+
+    assert cache.get("doc", "phi3", "prompt", "context") == ("answer", "exact")
+    assert cache.get("other", "phi3", "prompt", "context") == (None, None)
+    assert cache.get("doc", "llama2", "prompt", "context") == (None, None)
+    assert cache.get("doc", "phi3", "another prompt", "context") == (None, None)
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["hit_rate"] == 0.25
+
+def test_semantic_hit_needs_the_same_chunks_and_a_close_query():
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.put("doc", "phi3", "What is the notice period?", "context", "30 days", ["doc"], _unit(1, 0.1))
+
+    assert cache.get("doc", "phi3", "How long is the notice?", "context", _unit(1, 0.2)) == ("30 days", "semantic")
+    assert cache.get("doc", "phi3", "How long is the notice?", "other context", _unit(1, 0.2)) == (None, None)
+    assert cache.get("doc", "phi3", "Who pays travel?", "context", _unit(0, 1)) == (None, None)
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_entries_expire_and_least_recently_used_are_evicted():
+    clock = _Clock()
+    cache = AnswerCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put("doc", "phi3", "a", "context", "A", ["doc"])
+    cache.put("doc", "phi3", "b", "context", "B", ["doc"])
+    cache.get("doc", "phi3", "a", "context")
+    cache.put("doc", "phi3", "c", "context", "C", ["doc"])
+
+    assert cache.get("doc", "phi3", "b", "context") == (None, None)
+    assert cache.get("doc", "phi3", "a", "context") == ("A", "exact")
+
+    clock.now = 11
+    assert cache.get("doc", "phi3", "c", "context") == (None, None)
+
+def test_invalidating_a_document_drops_every_answer_drawn_from_it():
+    cache = AnswerCache()
+    cache.put("doc", "phi3", "a", "context", "A", ["doc"])
+    cache.put("library", "phi3", "b", "context", "B", ["doc", "other"])
+    cache.put("other", "phi3", "c", "context", "C", ["other"])
+
+    assert cache.invalidate_document("doc") == 2
+    assert cache.get("library", "phi3", "b", "context") == (None, None)
+    assert cache.get("other", "phi3", "c", "context") == ("C", "exact")
@@ -0,0 +1,58 @@
+import re
+
+import json
+
+from benchmarks import suite
+from benchmarks.suite import compare, word_recall
+from benchmarks.synthetic_pdf import build_pdf
+
+def _report(throughputs, workload=None, quality=None):
+    results = {}
+    for name, throughput in throughputs.items():
+        results[name] = {"skipped": "missing tool"} if throughput is None else {"throughput": throughput, "unit": "MB"}
+    if quality:
+        results["extract"]["quality"] = quality
+    return {"meta": {"workload": workload or {"repeats": 3}, "mode": "test", "cpu_count": 1}, "results": results}
+
+def test_compare_flags_regressions_against_baseline():
+    baseline = _report({"clean_text": 100.0, "chunking": 100.0, "retrieval": 100.0, "embedding": None})
+    current = _report({"clean_text": 70.0, "chunking": 90.0, "retrieval": 140.0, "embedding": 50.0, "new": 1.0})
+
+    statuses = {row["stage"]: row["status"] for row in compare(current, baseline, tolerance=0.25)}
+    assert statuses == {
+        "clean_text": "regression", "chunking": "ok", "retrieval": "improved", "embedding": "new", "new": "new"
+    }
+
+    other_workload = _report({"clean_text": 10.0}, workload={"repeats": 1})
+    assert compare(other_workload, baseline, tolerance=0.25)[0]["status"] == "incomparable"
+
+def test_baseline_of_another_workload_fails_the_run(monkeypatch, tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(_report({"clean_text": 100.0}, workload=suite.WORKLOADS["quick"])))
+    monkeypatch.setattr(suite, "run_stages", lambda names, mode: _report({"clean_text": 100.0},
+                                                                          workload=suite.WORKLOADS[mode]))
+    argv = ["--stages", "clean_text", "--baseline", str(baseline), "--output", str(tmp_path / "results.json")]
+
+    assert suite.main(argv + ["--quick"]) == 0
+    assert suite.main(argv) == 2
+
+def test_compare_flags_quality_drops():
+    baseline = _report({"extract": 10.0}, quality={"word_recall": 0.98})
+    current = _report({"extract": 10.0}, quality={"word_recall": 0.90})
+    assert compare(current, baseline, tolerance=0.25)[0]["status"] == "regression"
+
+def test_synthetic_pdf_structure():
+    data, texts = build_pdf(4, "mixed")
+    assert len(texts) == 4 and all(texts)
+    assert data.startswith(b"%PDF-1.4") and data.rstrip().endswith(b"%%EOF")
+    # Text pages draw with the font, scanned pages with an image
+    assert len(re.findall(rb"/Type /Page ", data)) == 4
+    assert len(re.findall(rb"/Subtype /Image", data)) == 2
+    # Every cross-reference entry points at its object
+    xref = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    offsets = [int(line[:10]) for line in data[xref:].split(b"\n")[3:] if re.match(rb"\d{10} 00000 n", line)]
+    for number, offset in enumerate(offsets, start=1):
+        assert data[offset:].startswith(f"{number} 0 obj".encode())
+
+def test_word_recall():
+    assert word_recall(["Alpha beta beta."], ["alpha beta"]) == 2 / 3
@@ -0,0 +1,29 @@
+import numpy as np
+
+from modules.bm25 import BM25Index, tokenize
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("Part XJ-900, see clause 4.2.1.") == [
+        "part", "xj-900", "xj", "900", "see", "clause", "4.2.1", "4", "2", "1"
+    ]
+
+def test_scores_rank_rare_terms_and_skip_unmatched_chunks():
+    bm25 = BM25Index.build([
+        "the contract the contract",
+        "the warranty for part xj-900",
+        "the notice period",
+    ])
+
+    scores = bm25.scores("warranty XJ-900")
+    assert np.argmax(scores) == 1
+    assert scores[0] == 0 and scores[2] == 0
+    assert bm25.top_k("the", 5)[0][0] in (0, 1, 2)
+    assert bm25.top_k("missing", 5) == []
+
+def test_save_and_load_round_trip(tmp_path):
+    bm25 = BM25Index.build(["alpha beta", "beta gamma gamma"])
+    bm25.save(tmp_path / "bm25.npz")
+    loaded = BM25Index.load(tmp_path / "bm25.npz")
+
+    assert np.allclose(loaded.scores("gamma beta"), bm25.scores("gamma beta"))
+    assert len(BM25Index.build([])) == 0
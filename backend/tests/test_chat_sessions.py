@@ -0,0 +1,50 @@
+from modules.chat_sessions import ChatSessionStore
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _turn(store, session_id, context, chunks, scope="doc"):
+    conversation, continued = store.open(session_id, scope)
+    fresh = store.new_chunks(session_id, chunks)
+    conversation["context"] = context
+    store.record(session_id, conversation, "question", "answer", chunks, [scope])
+    return continued, fresh
+
+def test_follow_ups_continue_the_conversation_with_unseen_chunks_only():
+    store = ChatSessionStore()
+
+    assert _turn(store, "s", [1, 2], [("doc", 0), ("doc", 1)]) == (False, [True, True])
+    assert _turn(store, "s", [1, 2, 3], [("doc", 1), ("doc", 2)]) == (True, [False, True])
+    assert store.get("s")["turns"] == 2
+    assert store.get("s")["context_tokens"] == 3
+
+def test_changing_scope_or_outgrowing_the_context_starts_over():
+    store = ChatSessionStore(max_context_tokens=3)
+    _turn(store, "s", [1, 2], [("doc", 0)])
+
+    assert _turn(store, "s", [1, 2], [("doc", 0)], scope="other") == (False, [True])
+    _turn(store, "s", [1, 2, 3, 4], [("other", 0)], scope="other")
+    assert store.open("s", "other")[1] is False
+
+def test_sessions_expire_and_are_capped():
+    clock = _Clock()
+    store = ChatSessionStore(ttl_seconds=10, max_sessions=2, clock=clock)
+    for session_id in ("a", "b", "c"):
+        _turn(store, session_id, [1], [("doc", 0)])
+
+    assert store.get("a") is None
+    clock.now = 11
+    assert store.get("b") is None and store.get("c") is None
+
+def test_invalidating_a_document_restarts_its_conversations():
+    store = ChatSessionStore()
+    _turn(store, "s", [1, 2], [("doc", 0)])
+    _turn(store, "t", [1, 2], [("other", 0)], scope="other")
+
+    assert store.invalidate_document("doc") == 1
+    assert store.open("s", "doc")[1] is False
+    assert store.open("t", "other")[1] is True
@@ -0,0 +1,47 @@
+from modules import context_packer
+
+TEXT = "Alpha is first. Beta follows alpha. Gamma closes the section. Delta starts another one."
+
+def _hit(start, end, similarity, document_id="doc"):
+    return {"text": TEXT[start:end], "similarity": similarity,
+            "metadata": {"document_id": document_id, "char_start": start, "char_end": end}}
+
+def test_overlapping_and_adjacent_hits_merge_into_one_span():
+    # "Alpha is first. Beta follows alpha." / "Beta follows alpha. Gamma ..." / "Delta ..."
+    hits = [_hit(16, 61, 0.9), _hit(0, 35, 0.5), _hit(62, len(TEXT), 0.4)]
+
+    spans = context_packer.merge_hits(hits)
+
+    assert len(spans) == 1
+    assert spans[0]["text"] == TEXT
+    assert spans[0]["similarity"] == 0.9
+    assert sorted(spans[0]["hits"]) == [0, 1, 2]
+
+def test_hits_of_other_documents_are_not_merged():
+    spans = context_packer.merge_hits([_hit(0, 35, 0.5), _hit(16, 61, 0.9, document_id="other")])
+
+    assert [span["hits"] for span in spans] == [[1], [0]]
+
+def test_pack_drops_repeated_sentences_and_keeps_within_budget():
+    hits = [
+        {"text": "Beta follows alpha. Gamma closes the section.", "similarity": 0.9},
+        {"text": "beta  follows alpha. Something new.", "similarity": 0.8},
+        {"text": "A much longer sentence that does not fit into what is left of the budget.", "similarity": 0.1}
+    ]
+
+    context, report = context_packer.pack(hits, budget_tokens=30)
+
+    assert context == "Beta follows alpha. Gamma closes the section.\n\nSomething new."
+    assert report["duplicate_sentences"] == 1
+    assert report["over_budget_sentences"] == 1
+    assert report["hits"] == [0, 1]
+    assert report["tokens"] <= 30
+
+def test_packed_context_is_no_larger_than_joined_hits():
+    hits = [_hit(0, 61, 0.9), _hit(16, len(TEXT), 0.8)]
+
+    context, report = context_packer.pack(hits, budget_tokens=1000)
+
+    assert context == TEXT
+    assert len(context) < len(context_packer.join_hits(hits))
+    assert report["spans"] == 1
@@ -0,0 +1,163 @@
+import logging
+
+import numpy as np
+import pytest
+
+from modules import document_store
+from modules.document_store import DocumentStore
+
+def _add(store, document_id, uploaded_at, text="Hello world"):
+    store.add(
+        document_id, f"{document_id}.pdf", text, np.array([[0, 5], [6, 11]]), np.ones((2, 4), dtype=np.float32),
+        word_count=2, uploaded_at=uploaded_at, tags=["report"], content_hash="abc"
+    )
+
+def test_round_trip_survives_reopen(tmp_path):
+    store = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    _add(store, "a", 1.0)
+
+    reopened = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    assert "a" in reopened
+    assert reopened._bodies == {}
+    document = reopened.get("a")
+
+    assert document["filename"] == "a.pdf"
+    assert document["tags"] == ["report"]
+    assert document["chunk_count"] == 2
+    assert document["text"] == "Hello world"
+    assert list(document["chunks"]) == ["Hello", "world"]
+    assert np.array_equal(document["embeddings"], np.ones((2, 4), dtype=np.float32))
+
+def test_list_pages_and_projects(tmp_path):
+    store = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    for i in range(5):
+        _add(store, f"doc{i}", float(i), text=f"text {i}")
+
+    total, documents = store.list(offset=1, limit=2)
+    assert total == 5
+    assert [document["document_id"] for document in documents] == ["doc3", "doc2"]
+    assert "text" not in documents[0]
+
+    _, documents = store.list(limit=1, fields=["document_id", "text"])
+    assert documents == [{"document_id": "doc4", "text": "text 4"}]
+    # Listing text does not pull chunks and embeddings into memory
+    assert store._bodies == {}
+
+    with pytest.raises(ValueError):
+        store.list(fields=["embeddings"])
+
+def test_delete_and_clear(tmp_path):
+    store = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    _add(store, "a", 1.0)
+    _add(store, "b", 2.0)
+    store.get("a")
+
+    assert store.delete("a")
+    assert not store.delete("a")
+    assert store.get("a") is None
+    assert not (tmp_path / "bodies" / "a").exists()
+
+    store.clear()
+    assert store.count() == 0
+    assert list((tmp_path / "bodies").iterdir()) == []
+
+def test_body_still_in_use_is_evicted_and_logged(tmp_path, monkeypatch, caplog):
+    store = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    _add(store, "a", 1.0)
+    store.get("a")
+
+    def in_use(path):
+        raise PermissionError("file is mapped")
+
+    monkeypatch.setattr(document_store.shutil, "rmtree", in_use)
+    monkeypatch.setattr(document_store.time, "sleep", lambda seconds: None)
+    with caplog.at_level(logging.WARNING, logger="modules.document_store"):
+        store.add("a", "a.pdf", "Hello world", np.array([[0, 5], [6, 11]]), np.ones((2, 4), dtype=np.float32),
+                  word_count=2, uploaded_at=2.0, version=2)
+
+    # The old body's maps are dropped before removing it; what could not be removed is reported
+    assert ("a", "v1") not in store._bodies
+    assert (tmp_path / "bodies" / "a" / "v1").exists()
+    assert "Could not remove" in caplog.text and "v1" in caplog.text
+    assert store.get("a")["version"] == 2
+
+def test_stores_share_documents_and_map_embeddings(tmp_path):
+    # Two stores on the same files stand in for two server workers
+    writer = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    reader = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+
+    _add(writer, "a", 1.0)
+    document = reader.get("a")
+    assert document["chunk_count"] == 2
+    assert isinstance(document["embeddings"], np.memmap)
+    assert not document["embeddings"].flags.writeable
+
+    writer.delete("a")
+    # The reader's cached body is not served once the row is gone
+    assert reader.get("a") is None
+    assert reader.count() == 0
+
+def test_new_version_replaces_body_and_pages(tmp_path):
+    writer = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    reader = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    _add(writer, "a", 1.0)
+    assert reader.get("a")["version"] == 1
+
+    pages = [
+        {"page": 1, "hash": "h1", "source": "native", "char_start": 15, "char_end": 20, "chunk_start": 0, "chunk_end": 1},
+        {"page": 2, "hash": "h2", "source": "ocr", "char_start": 36, "char_end": 41, "chunk_start": 1, "chunk_end": 2}
+    ]
+    text = "--- Page 1 --- Hello --- Page 2 --- world"
+    writer.add(
+        "a", "a.pdf", text, np.array([[15, 20], [36, 41]]), np.zeros((2, 4), dtype=np.float32),
+        word_count=10, uploaded_at=2.0, version=2, pages=pages
+    )
+
+    document = reader.get("a")
+    assert document["version"] == 2 and document["page_count"] == 2
+    assert list(document["chunks"]) == ["Hello", "world"]
+    assert document["chunk_pages"].tolist() == [1, 2]
+    assert reader.get_pages("a") == pages
+    assert [path.name for path in (tmp_path / "bodies" / "a").iterdir()] == ["v2"]
+
+def test_opens_unversioned_store(tmp_path):
+    import sqlite3
+    db = sqlite3.connect(str(tmp_path / "docs.sqlite3"))
+    db.execute("""CREATE TABLE documents (document_id TEXT PRIMARY KEY, filename TEXT NOT NULL, word_count INTEGER NOT NULL,
+                  uploaded_at REAL NOT NULL, tags TEXT NOT NULL, content_hash TEXT, chunk_count INTEGER NOT NULL)""")
+    db.execute("INSERT INTO documents VALUES ('a', 'a.pdf', 2, 1.0, '[]', NULL, 1)")
+    db.commit()
+    body_dir = tmp_path / "bodies" / "a"
+    body_dir.mkdir(parents=True)
+    (body_dir / "text.txt").write_text("--- Page 3 --- Hello", encoding="utf-8")
+    np.save(body_dir / "spans.npy", np.array([[15, 20]]))
+    np.save(body_dir / "embeddings.npy", np.ones((1, 4), dtype=np.float32))
+
+    document = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies").get("a")
+
+    assert document["version"] == 1
+    assert list(document["chunks"]) == ["Hello"]
+    # Chunk pages come from the page markers of the text
+    assert document["chunk_pages"].tolist() == [3]
+
+def test_partial_document_grows_to_complete(tmp_path):
+    store = DocumentStore(tmp_path / "docs.sqlite3", tmp_path / "bodies")
+    pages = [
+        {"page": number, "hash": f"h{number}", "source": "ocr", "char_start": 0, "char_end": 5,
+         "chunk_start": number - 1, "chunk_end": number}
+        for number in (1, 2)
+    ]
+    spans = np.array([[0, 5], [6, 11]])
+    embeddings = np.ones((2, 4), dtype=np.float32)
+    store.add("a", "a.pdf", "Hello world", spans[:1], embeddings[:1], word_count=1, uploaded_at=1.0,
+              pages=pages[:1], pages_total=2)
+
+    document = store.get("a")
+    assert (document["page_count"], document["pages_total"]) == (1, 2)
+    assert list(document["chunks"]) == ["Hello"]
+
+    store.add("a", "a.pdf", "Hello world", spans, embeddings, word_count=2, uploaded_at=1.0, pages=pages)
+    document = store.get("a")
+    assert (document["page_count"], document["pages_total"]) == (2, 2)
+    assert list(document["chunks"]) == ["Hello", "world"]
+    assert [path.name for path in (tmp_path / "bodies" / "a").iterdir()] == ["v1"]
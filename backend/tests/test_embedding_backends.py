@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import torch
+from sentence_transformers import SentenceTransformer, models
+from transformers import BertConfig, BertModel, BertTokenizer
+
+from modules.embedding_backends import BACKENDS, EmbeddingBackend, create_backend
+
+VOCABULARY = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + [f"w{i}" for i in range(200)]
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    """A tiny randomly initialized model saved locally, so no download is needed."""
+    path = tmp_path_factory.mktemp("model")
+    (path / "vocab.txt").write_text("\n".join(VOCABULARY))
+    BertTokenizer(str(path / "vocab.txt")).save_pretrained(str(path / "bert"))
+    torch.manual_seed(0)
+    BertModel(BertConfig(
+        vocab_size=len(VOCABULARY), hidden_size=64, num_hidden_layers=2, num_attention_heads=2, intermediate_size=128
+    )).save_pretrained(str(path / "bert"))
+    transformer = models.Transformer(str(path / "bert"), max_seq_length=64)
+    SentenceTransformer(modules=[transformer, models.Pooling(64, "mean")]).save(str(path / "saved"))
+    return path / "saved"
+
+def _texts(count):
+    return [" ".join(f"w{(i * 7 + j * 3) % 200}" for j in range(20)) for i in range(count)]
+
+def test_backends_load_from_local_directory(model_dir):
+    for name in BACKENDS:
+        backend = create_backend(name, "not-a-downloadable-model", model_dir=model_dir, batch_size=8)
+        embeddings = backend.encode(_texts(5))
+
+        assert embeddings.shape == (5, backend.dimension)
+        assert embeddings.dtype == np.float32
+        assert np.allclose(np.linalg.norm(embeddings, axis=1), 1, atol=1e-5)
+
+def test_quantized_backend_agrees_with_fp32(model_dir):
+    texts = _texts(40)
+    baseline = create_backend("torch", "unused", model_dir=model_dir).encode(texts)
+    quantized = create_backend("quantized", "unused", model_dir=model_dir).encode(texts)
+
+    assert (baseline * quantized).sum(axis=1).min() > 0.98
+    query = baseline[0]
+    assert set(np.argsort(-(baseline @ query))[:5]) == set(np.argsort(-(quantized @ query))[:5])
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend("tensorrt", "unused")
+
+def test_backend_missing_a_method_fails_when_created():
+    class NoDimension(EmbeddingBackend):
+        def encode(self, texts):
+            return np.zeros((len(texts), 4), dtype=np.float32)
+
+    with pytest.raises(TypeError):
+        NoDimension()
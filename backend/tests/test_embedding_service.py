@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from modules.embedding_service import EmbeddingService
+
+class CountingModel:
+    """Deterministic embedding backend that records each forward pass."""
+
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    @property
+    def dimension(self):
+        return 4
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        self.threads.add(threading.current_thread().name)
+        vectors = np.array([[len(text), 1, 0, 0] for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_concurrent_queries_share_one_forward_pass():
+    model = CountingModel()
+    service = EmbeddingService(model, max_batch_size=32, max_wait_ms=50)
+    queries = [f"question {'x' * i}" for i in range(10)]
+
+    async def ask_all():
+        return await asyncio.gather(*(service.encode(query) for query in queries))
+
+    vectors = asyncio.run(ask_all())
+
+    assert len(model.calls) == 1
+    assert sorted(model.calls[0]) == sorted(queries)
+    assert all(thread.startswith("embedding") for thread in model.threads)
+    assert np.allclose(vectors[3], model.encode([queries[3]])[0])
+    assert service.stats()["max_batch"] == 10
+
+def test_batches_are_capped():
+    model = CountingModel()
+    service = EmbeddingService(model, max_batch_size=4, max_wait_ms=50)
+
+    async def ask_all():
+        return await asyncio.gather(*(service.encode(f"q{i}") for i in range(10)))
+
+    asyncio.run(ask_all())
+
+    assert [len(call) for call in model.calls] == [4, 4, 2]
+
+def test_repeated_queries_hit_the_cache():
+    model = CountingModel()
+    service = EmbeddingService(model, max_wait_ms=1, cache_size=2)
+
+    async def ask():
+        for query in ["a", "a", "b", "c", "a"]:
+            await service.encode(query)
+
+    asyncio.run(ask())
+
+    # "a" was evicted by "b" and "c" before it was asked again
+    assert model.calls == [["a"], ["b"], ["c"], ["a"]]
+    stats = service.stats()
+    assert stats["cache_hits"] == 1
+    assert stats["requests"] == 5
+
+def test_encode_many_slices_ingest_batches():
+    model = CountingModel()
+    service = EmbeddingService(model, ingest_batch_size=3)
+
+    vectors = service.encode_many([f"chunk {i}" for i in range(7)])
+
+    assert vectors.shape == (7, 4)
+    assert [len(call) for call in model.calls] == [3, 3, 1]
+    assert service.encode_many([]).shape == (0, 4)
@@ -0,0 +1,69 @@
+import hashlib
+import io
+import os
+import time
+
+import numpy as np
+
+from modules.ingest_cache import IngestCache, hash_stream
+
+PAGES = [{"page": 1, "text": "Hello world", "source": "native", "seconds": 0.01}]
+
+def test_hash_stream_copies_and_hashes():
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    destination = io.BytesIO()
+
+    digest = hash_stream(io.BytesIO(data), destination, block_size=64 * 1024)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert destination.getvalue() == data
+
+def test_round_trip_and_stats(tmp_path):
+    cache = IngestCache(tmp_path, max_bytes=10 * 1024 * 1024)
+    embeddings = np.ones((2, 4), dtype=np.float32)
+
+    assert cache.get("abc") is None
+    spans = np.array([[0, 5], [6, 11]])
+    cache.put("abc", PAGES, "Hello world", spans, embeddings=embeddings, source_bytes=1234,
+              chunking={"chunk_size": 1, "overlap": 0}, ocr_profile="fast",
+              embedding={"model": "all-MiniLM-L6-v2", "backend": "torch", "dimension": 4})
+    cached = cache.get("abc")
+
+    assert cached["pages"] == PAGES
+    assert cached["cleaned_text"] == "Hello world"
+    assert np.array_equal(cached["spans"], spans)
+    assert cached["chunking"] == {"chunk_size": 1, "overlap": 0}
+    assert cached["ocr_profile"] == "fast"
+    assert cached["embedding"] == {"model": "all-MiniLM-L6-v2", "backend": "torch", "dimension": 4}
+    assert np.array_equal(cached["embeddings"], embeddings)
+    assert cache.stats() == {"hits": 1, "misses": 1, "bytes_saved": 1234}
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = IngestCache(tmp_path, max_bytes=3 * 1024)
+    text = "x" * 1024
+    cache.put("old", PAGES, text, np.zeros((0, 2)))
+    cache.put("recent", PAGES, text, np.zeros((0, 2)))
+    # Reading an entry marks it as recently used
+    past = time.time() - 60
+    os.utime(tmp_path / "recent" / "meta.json", (past, past))
+    os.utime(tmp_path / "old" / "meta.json", (past - 60, past - 60))
+    assert cache.get("old") is not None
+
+    cache.put("new", PAGES, text, np.zeros((0, 2)))
+
+    assert cache.get("recent") is None
+    assert cache.get("old") is not None
+    assert cache.get("new") is not None
+
+def test_failed_write_is_logged_not_raised(tmp_path, monkeypatch):
+    cache = IngestCache(tmp_path, max_bytes=10 * 1024 * 1024)
+
+    def fail(source, destination):
+        raise PermissionError("entry in use")
+
+    monkeypatch.setattr(os, "replace", fail)
+
+    assert cache.put("abc", PAGES, "Hello world", np.zeros((1, 2), dtype=np.int64)) is False
+    assert cache.get("abc") is None
+    # No staging directory is left behind
+    assert list(tmp_path.iterdir()) == []
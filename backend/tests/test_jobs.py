@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from modules.jobs import Job, JobManager, JobStore, QueueFullError
+
+def _wait_until_finished(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+def test_job_runs_and_reports_progress():
+    manager = JobManager(max_workers=1, max_queue=4)
+
+    def work(job):
+        job.update(stage="extracting", pages_total=3)
+        for page in range(1, 4):
+            job.update(pages_done=page)
+        return {"status": "success"}
+
+    job = _wait_until_finished(manager.submit(Job("doc-1", "a.pdf"), work))
+
+    assert job.status == "completed"
+    assert job.to_dict()["pages_done"] == 3
+    assert job.result == {"status": "success"}
+    assert manager.find_by_document("doc-1") is job
+
+def test_find_by_document_prefers_the_running_job(tmp_path):
+    manager = JobManager(max_workers=1, max_queue=4, store=JobStore(tmp_path / "jobs.sqlite3"))
+    release = threading.Event()
+    old = _wait_until_finished(manager.submit(Job("doc-1", "a.pdf"), lambda job: None))
+    new = manager.submit(Job("doc-1", "a.pdf"), lambda job: release.wait(5))
+
+    assert manager.find_by_document("doc-1") is new
+    assert manager.store.find_by_document("doc-1").id == new.id
+    release.set()
+    _wait_until_finished(new)
+    assert manager.find_by_document("doc-1") is new and old.finished
+
+def test_failed_job_records_error():
+    manager = JobManager(max_workers=1, max_queue=4)
+
+    def work(job):
+        raise ValueError("corrupt PDF")
+
+    job = _wait_until_finished(manager.submit(Job("doc-1", "a.pdf"), work))
+
+    assert job.status == "failed"
+    assert job.error == "corrupt PDF"
+
+def test_cancel_running_job():
+    manager = JobManager(max_workers=1, max_queue=4)
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while True:
+            job.update(pages_done=job.pages_done + 1)
+            time.sleep(0.01)
+
+    job = manager.submit(Job("doc-1", "a.pdf"), work)
+    started.wait(5)
+    assert manager.cancel(job.id)
+
+    assert _wait_until_finished(job).status == "cancelled"
+    assert not manager.cancel(job.id)
+
+def test_queue_is_bounded():
+    manager = JobManager(max_workers=1, max_queue=1)
+    release = threading.Event()
+    manager.submit(Job("running", "a.pdf"), lambda job: release.wait(5))
+    time.sleep(0.05)
+    queued = manager.submit(Job("queued", "b.pdf"), lambda job: None)
+
+    with pytest.raises(QueueFullError):
+        manager.submit(Job("rejected", "c.pdf"), lambda job: None)
+
+    assert manager.cancel(queued.id)
+    assert queued.status == "cancelled"
+    release.set()
+
+def test_jobs_are_shared_through_the_store(tmp_path):
+    # Two managers on one store stand in for two server processes
+    owner = JobManager(max_workers=1, max_queue=4, store=JobStore(tmp_path / "jobs.sqlite3"))
+    other = JobManager(max_workers=1, max_queue=4, store=JobStore(tmp_path / "jobs.sqlite3"))
+    started = threading.Event()
+
+    def work(job):
+        job.update(stage="extracting", pages_total=100)
+        started.set()
+        while True:
+            job.update(pages_done=job.pages_done + 1)
+            time.sleep(0.01)
+
+    job = owner.submit(Job("doc-1", "a.pdf"), work)
+    started.wait(5)
+
+    remote = other.get(job.id)
+    assert remote.status == "running" and remote.pages_total == 100
+    assert other.find_by_document("doc-1").id == job.id
+
+    assert other.cancel(job.id)
+    assert _wait_until_finished(job).status == "cancelled"
+    assert other.get(job.id).status == "cancelled"
+    assert not other.cancel(job.id)
+
+def test_jobs_of_a_stopped_process_are_failed(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    crashed, silent, alive = Job("doc-1", "a.pdf"), Job("doc-2", "b.pdf"), Job("doc-3", "c.pdf")
+    for job in (crashed, silent, alive):
+        job.status = "running"
+    abandoned = []
+    manager = JobManager(max_workers=1, max_queue=4, store=store, stale_seconds=60, on_abandoned=abandoned.append)
+    host = manager.owner.split(":")[0]
+    # A process on this host that has exited, one elsewhere that stopped sending heartbeats, one still running
+    store.save(crashed, owner=f"{host}:{2 ** 22 + 1}:dead")
+    store.save(silent, owner="other-host:1:a")
+    store.save(alive, owner="other-host:2:b")
+    store._db.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (time.time() - 120, silent.id))
+    store._db.commit()
+
+    assert manager.find_by_document("doc-1").status == "failed"
+    assert manager.get(silent.id).status == "failed"
+    assert manager.get(alive.id).status == "running"
+    assert {job.id for job in abandoned} == {crashed.id, silent.id}
+    assert [job.id for job in manager.unfinished()] == [alive.id]
+    # Cancelling a job that is already failed returns at once instead of waiting out a timeout
+    assert not manager.cancel(crashed.id)
+
+def test_stored_snapshots_leave_out_the_extracted_text(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    manager = JobManager(max_workers=1, max_queue=4, store=store)
+
+    job = _wait_until_finished(manager.submit(Job("doc-1", "a.pdf"), lambda job: {
+        "document_id": "doc-1", "word_count": 2, "extracted_text": "Hello world"
+    }))
+
+    assert job.result["extracted_text"] == "Hello world"
+    assert store.load(job.id).result == {"document_id": "doc-1", "word_count": 2}
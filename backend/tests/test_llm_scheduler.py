@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from modules.llm_scheduler import LLMQueueFullError, LLMScheduler
+
+def test_waiting_clients_are_served_in_turn():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+
+    async def generate(client, name, release=None):
+        async with scheduler.slot(client):
+            order.append(name)
+            if release is not None:
+                await release.wait()
+
+    async def run():
+        release = asyncio.Event()
+        first = asyncio.create_task(generate("a", "a1", release))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(generate(client, name)) for client, name in (("a", "a2"), ("a", "a3"), ("b", "b1"))]
+        await asyncio.sleep(0)
+        assert scheduler.queued == 3
+        release.set()
+        await asyncio.gather(first, *waiting)
+
+    asyncio.run(run())
+
+    assert order == ["a1", "a2", "b1", "a3"]
+    assert scheduler.stats()["running"] == 0
+
+def test_full_queue_is_refused_with_a_retry_estimate():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=1, expected_seconds=4)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("a"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(LLMQueueFullError) as refused:
+            async with scheduler.slot("b"):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return refused.value
+
+    assert asyncio.run(run()).retry_after == 8
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold(client):
+            async with scheduler.slot(client):
+                await release.wait()
+
+        running = asyncio.create_task(hold("a"))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(hold("b"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.queued == 0
+        release.set()
+        await running
+
+    asyncio.run(run())
+
+    assert scheduler.stats()["running"] == 0
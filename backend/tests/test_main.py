@@ -17,6 +17,122 @@ def test_health_check():
     assert "status" in response.json()
     assert "model" in response.json()
 
+def test_chat_is_refused_while_the_generation_queue_is_full(monkeypatch):
+    import main
+    monkeypatch.setattr(main, "llm_scheduler", main.LLMScheduler(max_concurrency=0, max_queue=0))
+
+    response = client.post("/chat", json={"query": "test query", "library": True})
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+
+def test_generation_is_cancelled_when_the_client_disconnects():
+    import asyncio
+    import main
+    from fastapi import HTTPException
+
+    class _Disconnected:
+        async def is_disconnected(self):
+            return True
+
+    async def run():
+        generation = asyncio.create_task(asyncio.sleep(10))
+        with pytest.raises(HTTPException) as gone:
+            await main._cancel_on_disconnect(_Disconnected(), generation, poll_seconds=0.01)
+        await asyncio.sleep(0)
+        return gone.value.status_code, generation.cancelled()
+
+    assert asyncio.run(run()) == (499, True)
+
+def test_streamed_chat_ends_with_an_error_event_when_retrieval_fails(monkeypatch):
+    import main
+
+    async def failing_retrieval(request):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(main, "_retrieve_for_chat", failing_retrieval)
+
+    response = client.post("/chat/stream", json={"query": "test query", "library": True})
+
+    assert response.status_code == 200
+    assert response.text.endswith('event: error\ndata: {"detail": "index unavailable"}\n\n')
+
+def test_cached_embeddings_of_another_model_are_recomputed(monkeypatch):
+    import numpy as np
+    import main
+
+    pages = [{"page": 1, "text": "Hello world", "source": "native", "seconds": 0.0, "chunk_start": 0, "chunk_end": 1}]
+    cached = {
+        "pages": pages, "cleaned_text": "Hello world", "spans": np.array([[0, 11]]), "ocr_profile": None,
+        "chunking": main.chunking_settings(), "embeddings": np.ones((1, 4), dtype=np.float32),
+        "embedding": {"model": "old-model", "backend": "torch", "dimension": 4}
+    }
+    stored = {}
+    monkeypatch.setattr(main.ingest_cache, "get", lambda digest: cached)
+    monkeypatch.setattr(main, "embedding_settings", lambda: {"model": "new-model", "backend": "torch", "dimension": 8})
+    monkeypatch.setattr(main, "embed_chunks", lambda chunks: np.zeros((len(chunks), 8), dtype=np.float32))
+
+    def store(*args, **kwargs):
+        stored["embeddings"] = args[6]
+        return {"document_id": args[0]}
+
+    monkeypatch.setattr(main, "_store_document", store)
+
+    response = client.post("/extract-text", files={"file": ("a.pdf", b"%PDF-1.4", "application/pdf")})
+
+    assert response.status_code == 200
+    assert stored["embeddings"].shape == (1, 8)
+
+def test_chat_looks_up_jobs_only_for_documents_not_fully_indexed(monkeypatch):
+    import main
+
+    documents = {"done": {"page_count": 3, "pages_total": 3}, "partial": {"page_count": 1, "pages_total": 3}}
+    looked_up = []
+    monkeypatch.setattr(main.document_store, "get", documents.get)
+    monkeypatch.setattr(main.ingest_jobs, "find_by_document", lambda doc_id: looked_up.append(doc_id))
+
+    assert main._find_chat_document("done") == (documents["done"], None)
+    assert main._find_chat_document("partial") == (documents["partial"], None)
+    assert main._find_chat_document("missing")[0] is None
+    assert looked_up == ["partial", "missing"]
+
+def test_ingest_reports_indexing_errors_unchanged(monkeypatch, tmp_path):
+    import main
+
+    def pages(pdf_path, **options):
+        if "scanned" in pdf_path:
+            raise OSError("pdftoppm not found")
+        for number in range(1, 9):
+            yield {"page": number, "text": f"Page {number} text.", "source": "native", "seconds": 0.0,
+                   "hash": str(number)}
+
+    class _FailingEmbeddings:
+        def get(self):
+            return self
+
+        def encode_many(self, texts):
+            raise MemoryError("embedding model out of memory")
+
+    monkeypatch.setattr(main.ocr, "iter_pages", pages)
+    monkeypatch.setattr(main, "embedding_service", _FailingEmbeddings())
+    for name in ("text.pdf", "scanned.pdf"):
+        (tmp_path / name).write_bytes(b"%PDF-1.4")
+
+    with pytest.raises(MemoryError):
+        main._ingest_document(main.Job("indexing-doc", "text.pdf"), str(tmp_path / "text.pdf"), "hash", [])
+    with pytest.raises(RuntimeError, match="Poppler"):
+        main._ingest_document(main.Job("scanned-doc", "scanned.pdf"), str(tmp_path / "scanned.pdf"), "hash", [])
+
+def test_session_chunks_are_told_apart_by_their_text():
+    import main
+
+    old = {"text": "Notice period is 30 days.", "metadata": {"document_id": "doc", "chunk_index": 4}}
+    changed = {"text": "Notice period is 60 days.", "metadata": {"document_id": "doc", "chunk_index": 4}}
+    moved = {"text": "Notice period is 30 days.", "metadata": {"document_id": "doc", "chunk_index": 7}}
+
+    assert main._chunk_key(None, old) != main._chunk_key(None, changed)
+    assert main._chunk_key(None, old) == main._chunk_key(None, moved)
+
 def test_chat_without_document():
     response = client.post("/chat", json={"query": "test query"})
     assert response.status_code == 200
@@ -36,4 +152,91 @@ def test_upload_invalid_file():
     
     os.unlink(temp_file.name)
     assert response.status_code == 400
-    assert "Only PDF files are allowed" in response.json()["detail"] 
\ No newline at end of file
+    assert "Only PDF files are allowed" in response.json()["detail"] 
+
+
+def test_liveness_check():
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+def test_readiness_check_reports_components():
+    response = client.get("/health/ready")
+    assert response.status_code in (200, 503)
+    body = response.json()
+    assert set(body["components"]) == {"embedding_model", "embedding_service", "vector_index"}
+    assert body["startup"]["import_seconds"] > 0
+
+def test_metrics_endpoint_reports_requests():
+    client.get("/health/live")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'pdfchat_http_request_seconds_count{method="GET",route="/health/live",status="200"}' in response.text
+    assert "pdfchat_http_requests_in_flight" in response.text
+
+def test_second_version_upload_waits_for_the_first(monkeypatch):
+    import threading
+    import main
+    from modules.jobs import Job
+
+    release = threading.Event()
+
+    def slow_ingest(job, temp_path, *args, **kwargs):
+        os.remove(temp_path)
+        release.wait(5)
+        return {}
+
+    document_id = "versioned-doc"
+    monkeypatch.setattr(main.document_store, "get_metadata", lambda doc_id: {"version": 1, "tags": []})
+    monkeypatch.setattr(main, "_ingest_document", slow_ingest)
+    # The document's first upload, long finished
+    first = main.ingest_jobs.submit(Job(document_id, "a.pdf"), lambda job: {})
+    while not first.finished:
+        release.wait(0.01)
+
+    try:
+        upload = {"file": ("a.pdf", b"%PDF-1.4 new", "application/pdf")}
+        assert client.post(f"/documents/{document_id}/versions", files=upload).status_code == 202
+        response = client.post(f"/documents/{document_id}/versions", files=upload)
+    finally:
+        release.set()
+
+    assert response.status_code == 409
+
+def test_deleting_a_document_cancels_its_ingest(monkeypatch):
+    import threading
+    import main
+    from modules.jobs import Job
+
+    class _Index:
+        def delete_document(self, document_id):
+            self.deleted = document_id
+
+    index = _Index()
+    monkeypatch.setattr(main.vector_index, "get", lambda: index)
+    started = threading.Event()
+
+    def ingest(job):
+        started.set()
+        while True:
+            job.update(pages_done=job.pages_done + 1)
+            threading.Event().wait(0.01)
+
+    job = main.ingest_jobs.submit(Job("ingesting-doc", "a.pdf"), ingest)
+    started.wait(5)
+
+    response = client.delete("/documents/ingesting-doc")
+
+    assert response.status_code == 200
+    assert job.status == "cancelled"
+    assert index.deleted == "ingesting-doc"
+
+def test_upload_unknown_ocr_profile():
+    response = client.post(
+        "/extract-text",
+        files={"file": ("test.pdf", b"%PDF-1.4", "application/pdf")},
+        data={"ocr_profile": "sharpest"}
+    )
+    assert response.status_code == 400
+    assert "Unknown OCR profile" in response.json()["detail"]
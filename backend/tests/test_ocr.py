@@ -0,0 +1,180 @@
+import time
+
+import pytest
+
+from modules import ocr
+
+NATIVE_PAGE = "This page was typeset digitally and carries a complete embedded text layer."
+
+class _FakeImage(str):
+    def tobytes(self) -> bytes:
+        return self.encode()
+
+def _fake_pdf(monkeypatch, native_texts, total_pages, ocr_delay=0.0):
+    rendered = []
+
+    monkeypatch.setattr(ocr, "pdfinfo_from_path", lambda *args, **kwargs: {"Pages": total_pages})
+    monkeypatch.setattr(ocr, "extract_native_text", lambda *args, **kwargs: native_texts)
+
+    def fake_render(pdf_path, first_page, last_page, poppler_path=None, **kwargs):
+        pages = list(range(first_page, last_page + 1))
+        rendered.extend(pages)
+        return [_FakeImage(f"image-{page}") for page in pages]
+
+    def fake_ocr(image, config=""):
+        time.sleep(ocr_delay)
+        return f"ocr text of {image}"
+
+    monkeypatch.setattr(ocr, "_render_pages", fake_render)
+    monkeypatch.setattr(ocr, "_process_page", fake_ocr)
+    return rendered
+
+def test_born_digital_pages_skip_ocr(monkeypatch):
+    rendered = _fake_pdf(monkeypatch, [NATIVE_PAGE, NATIVE_PAGE, ""], total_pages=2)
+
+    pages = ocr.extract_pages("doc.pdf")
+
+    assert rendered == []
+    assert [page["source"] for page in pages] == ["native", "native"]
+    assert pages[0]["text"] == NATIVE_PAGE
+
+def test_sparse_pages_fall_back_to_ocr(monkeypatch):
+    rendered = _fake_pdf(monkeypatch, [NATIVE_PAGE, "  7 ", "", NATIVE_PAGE, ""], total_pages=4)
+
+    pages = ocr.extract_pages("doc.pdf")
+
+    assert rendered == [2, 3]
+    assert [page["source"] for page in pages] == ["native", "ocr", "ocr", "native"]
+    assert pages[1]["text"] == "ocr text of image-2"
+    summary = ocr.summarize_pages(pages)
+    assert summary["native_pages"] == 2
+    assert summary["ocr_pages"] == 2
+
+def test_missing_pdftotext_ocrs_every_page(monkeypatch):
+    rendered = _fake_pdf(monkeypatch, [], total_pages=3)
+
+    text = ocr.extract_text_from_pdf("doc.pdf")
+
+    assert rendered == [1, 2, 3]
+    assert "--- Page 3 ---\nocr text of image-3" in text
+
+def test_pipeline_yields_pages_in_order(monkeypatch):
+    _fake_pdf(monkeypatch, [], total_pages=30, ocr_delay=0.001)
+
+    pages = list(ocr.iter_pages("doc.pdf", queue_depth=2, max_workers=4))
+
+    assert [page["page"] for page in pages] == list(range(1, 31))
+    assert all(page["text"] == f"ocr text of image-{page['page']}" for page in pages)
+
+def test_pipeline_rendering_is_bounded_by_queue_depth(monkeypatch):
+    rendered = _fake_pdf(monkeypatch, [], total_pages=50, ocr_delay=0.01)
+
+    pages = ocr.iter_pages("doc.pdf", queue_depth=3, max_workers=2)
+    next(pages)
+    time.sleep(0.2)
+
+    # queued pages, plus the one held by the producer and the one being consumed
+    assert len(rendered) <= 3 + 2
+    pages.close()
+    rendered_at_close = len(rendered)
+    time.sleep(0.1)
+    assert len(rendered) == rendered_at_close
+
+def test_consecutive_scanned_pages_render_together(monkeypatch):
+    windows = []
+    _fake_pdf(monkeypatch, [""] * 5 + [NATIVE_PAGE] + [""] * 4, total_pages=10)
+    render = ocr._render_pages
+    monkeypatch.setattr(ocr, "_render_pages", lambda pdf_path, first_page, last_page, *args, **kwargs: (
+        windows.append((first_page, last_page)) or render(pdf_path, first_page, last_page, *args, **kwargs)
+    ))
+
+    pages = ocr.extract_pages("doc.pdf", queue_depth=8)
+
+    # Runs of up to half the queue depth, split at the native page
+    assert windows == [(1, 4), (5, 5), (7, 10)]
+    assert [page["text"] for page in pages if page["source"] == "ocr"] == [
+        f"ocr text of image-{number}" for number in (1, 2, 3, 4, 5, 7, 8, 9, 10)
+    ]
+
+def test_render_failure_fails_only_its_window(monkeypatch):
+    _fake_pdf(monkeypatch, [], total_pages=4)
+    render = ocr._render_pages
+
+    def failing_render(pdf_path, first_page, last_page, *args, **kwargs):
+        if first_page == 1:
+            raise OSError("pdftoppm crashed")
+        return render(pdf_path, first_page, last_page, *args, **kwargs)
+
+    monkeypatch.setattr(ocr, "_render_pages", failing_render)
+
+    pages = ocr.extract_pages("doc.pdf", queue_depth=4)
+
+    assert [page["text"] for page in pages] == ["", "", "ocr text of image-3", "ocr text of image-4"]
+
+def test_known_pages_skip_ocr(monkeypatch):
+    _fake_pdf(monkeypatch, [NATIVE_PAGE], total_pages=3)
+    first = ocr.extract_pages("doc.pdf")
+    assert first[0]["hash"] == ocr.page_hash("native", NATIVE_PAGE.encode())
+    assert [page["reused"] for page in first[1:]] == [False, False]
+
+    known = {first[2]["hash"]: "text kept from the previous version"}
+    pages = ocr.extract_pages("doc.pdf", known_pages=known)
+
+    assert [page["hash"] for page in pages] == [page["hash"] for page in first]
+    assert pages[1]["text"] == "ocr text of image-2" and not pages[1]["reused"]
+    assert pages[2]["text"] == "text kept from the previous version" and pages[2]["reused"]
+
+def test_profile_sets_rendering(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr, "pdfinfo_from_path", lambda *args, **kwargs: {"Pages": 1})
+    monkeypatch.setattr(ocr, "extract_native_text", lambda *args, **kwargs: [])
+    monkeypatch.setattr(ocr, "_render_pages", lambda *args, **kwargs: calls.append(kwargs) or [_FakeImage("image")])
+    monkeypatch.setattr(ocr, "_process_page", lambda image, config="": calls.append(config) or "text")
+
+    pages = ocr.extract_pages("doc.pdf", profile="accurate")
+
+    assert calls[0]["dpi"] == 300 and calls[0]["grayscale"]
+    assert calls[1] == "--psm 3"
+    assert pages[0]["dpi"] == 300
+    with pytest.raises(ValueError):
+        ocr.extract_pages("doc.pdf", profile="sharpest")
+
+def test_adaptive_profile_rerenders_low_confidence_pages(monkeypatch):
+    dpis = []
+    monkeypatch.setattr(ocr, "pdfinfo_from_path", lambda *args, **kwargs: {"Pages": 2})
+    monkeypatch.setattr(ocr, "extract_native_text", lambda *args, **kwargs: [])
+
+    def fake_render(pdf_path, first_page, last_page, poppler_path=None, dpi=200, **kwargs):
+        dpis.extend((page, dpi) for page in range(first_page, last_page + 1))
+        return [_FakeImage(f"image-{page}@{dpi}") for page in range(first_page, last_page + 1)]
+
+    def fake_scored(image, config=""):
+        # Page 2 only reads well at high resolution
+        confidence = 40.0 if image == "image-2@150" else 95.0
+        return f"text of {image}", confidence
+
+    monkeypatch.setattr(ocr, "_render_pages", fake_render)
+    monkeypatch.setattr(ocr, "_process_page_scored", fake_scored)
+
+    pages = ocr.extract_pages("doc.pdf", profile="adaptive")
+
+    assert sorted(dpis) == [(1, 150), (2, 150), (2, 300)]
+    assert pages[0]["text"] == "text of image-1@150" and not pages[0].get("rerendered")
+    assert pages[1]["text"] == "text of image-2@300" and pages[1]["rerendered"]
+    assert pages[1]["dpi"] == 300 and pages[1]["ocr_confidence"] == 95.0
+    assert ocr.summarize_pages(pages)["rerendered_pages"] == 1
+
+def test_scored_ocr_rebuilds_lines_and_averages_confidence(monkeypatch):
+    data = {
+        "text": ["", "Notice", "period", "", "thirty", "days"],
+        "conf": [-1, 90, 80, -1, 70, 60],
+        "block_num": [1, 1, 1, 1, 1, 1],
+        "par_num": [1, 1, 1, 1, 1, 1],
+        "line_num": [0, 1, 1, 2, 2, 2]
+    }
+    monkeypatch.setattr(ocr.pytesseract, "image_to_data", lambda image, config, output_type: data)
+
+    text, confidence = ocr._process_page_scored("image")
+
+    assert text == "Notice period\nthirty days"
+    assert confidence == 75.0
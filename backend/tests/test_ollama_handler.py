@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.ollama_handler import OllamaHandler
+
+TOKENS = ["The ", "notice ", "period ", "is ", "30 days."]
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Ollama HTTP API, with keep-alive connections."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload):
+        line = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        self.server.health_checks += 1
+        self._send_json({"models": [{"name": "phi3:latest"}]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(request)
+        if not request["stream"]:
+            # Ollama reports its own durations in nanoseconds
+            self._send_json({"response": "".join(TOKENS), "done": True, "load_duration": 1_000_000,
+                             "prompt_eval_duration": 2_000_000, "prompt_eval_count": 42,
+                             "context": [1, 2, 3] + request.get("context", [])})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in TOKENS:
+            self._send_chunk({"response": token, "done": False})
+        self._send_chunk({"response": "", "done": True, "prompt_eval_count": 42,
+                          "context": [1, 2, 3] + request.get("context", [])})
+        self.wfile.write(b"0\r\n\r\n")
+
+@pytest.fixture
+def fake_ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    server.requests = []
+    server.connections = 0
+    server.health_checks = 0
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+def test_generate_response(fake_ollama):
+    handler = OllamaHandler(model_name="phi3:latest", base_url=fake_ollama.url, keep_alive="30m")
+
+    answer = asyncio.run(handler.generate_response("What is the notice period?", "context"))
+
+    assert answer == "The notice period is 30 days."
+    assert "What is the notice period?" in fake_ollama.requests[0]["prompt"]
+    assert fake_ollama.requests[0]["keep_alive"] == "30m"
+
+def test_stream_response_yields_tokens(fake_ollama):
+    handler = OllamaHandler(model_name="phi3:latest", base_url=fake_ollama.url)
+
+    async def collect():
+        return [token async for token in handler.stream_response("What is the notice period?", "context")]
+
+    assert asyncio.run(collect()) == TOKENS
+    assert fake_ollama.requests[0]["stream"] is True
+
+def test_generation_timings_are_reported(fake_ollama):
+    handler = OllamaHandler(model_name="phi3:latest", base_url=fake_ollama.url)
+    complete, streamed = {}, {}
+
+    async def generate_both():
+        await handler.generate_response("question", "context", timings=complete)
+        return [token async for token in handler.stream_response("question", "context", timings=streamed)]
+
+    asyncio.run(generate_both())
+
+    assert complete["llm_time_to_first_token_seconds"] == pytest.approx(0.003)
+    assert complete["llm_seconds"] > 0
+    assert 0 < streamed["llm_time_to_first_token_seconds"] <= streamed["llm_seconds"]
+    assert complete["prompt_tokens"] == streamed["prompt_tokens"] == 42
+
+def test_conversation_continues_from_ollamas_context(fake_ollama):
+    handler = OllamaHandler(model_name="phi3:latest", base_url=fake_ollama.url)
+    conversation = {"context": None}
+
+    async def two_turns():
+        await handler.generate_response("What is the notice period?", "The notice period is 30 days.",
+                                        conversation=conversation)
+        return [token async for token in handler.stream_response("And for managers?", "", conversation=conversation)]
+
+    asyncio.run(two_turns())
+
+    first, follow_up = fake_ollama.requests
+    assert "context" not in first and "The notice period is 30 days." in first["prompt"]
+    assert follow_up["context"] == [1, 2, 3]
+    assert "Context:" not in follow_up["prompt"] and "And for managers?" in follow_up["prompt"]
+    assert conversation["context"] == [1, 2, 3, 1, 2, 3]
+
+def test_stream_response_reports_missing_model(fake_ollama):
+    handler = OllamaHandler(model_name="llama2", base_url=fake_ollama.url)
+
+    async def collect():
+        return [token async for token in handler.stream_response("question", "context")]
+
+    with pytest.raises(RuntimeError, match="not found"):
+        asyncio.run(collect())
+
+def test_health_is_cached_and_connections_are_reused(fake_ollama):
+    handler = OllamaHandler(model_name="phi3:latest", base_url=fake_ollama.url, health_ttl=60)
+
+    async def ask_three_times():
+        for _ in range(3):
+            await handler.generate_response("question", "context")
+        await handler.aclose()
+
+    asyncio.run(ask_three_times())
+
+    assert fake_ollama.health_checks == 1
+    assert len(fake_ollama.requests) == 3
+    assert fake_ollama.connections == 1
@@ -0,0 +1,48 @@
+import numpy as np
+
+from modules import pages as page_layout
+from modules import processor_interface
+from modules.ocr import format_pages
+
+def _pages():
+    return [
+        {"page": 1, "text": "First  page. It has two sentences.", "source": "native", "hash": "h1"},
+        {"page": 2, "text": "", "source": "ocr"},
+        {"page": 3, "text": "Third page\nwith a line break.", "source": "ocr", "hash": "h3"}
+    ]
+
+def test_assemble_matches_cleaning_the_whole_text():
+    pages = _pages()
+
+    text = page_layout.assemble(pages)
+
+    assert text == processor_interface.clean_text(format_pages(_pages()))
+    assert [text[page["char_start"]:page["char_end"]] for page in pages] == [
+        "First page. It has two sentences.", "", "Third page with a line break."
+    ]
+    assert pages[0]["hash"] == "h1"
+    assert pages[1]["hash"] is not None
+
+def test_chunks_stay_within_their_page():
+    pages = _pages()
+    text = page_layout.assemble(pages)
+
+    chunks = page_layout.split(text, pages, chunk_size=4, overlap=1)
+
+    assert [(page["chunk_start"], page["chunk_end"]) for page in pages] == [(0, 2), (2, 2), (2, 4)]
+    for page in pages:
+        for start, end in chunks.spans[page["chunk_start"]:page["chunk_end"]].tolist():
+            assert page["char_start"] <= start < end <= page["char_end"]
+    assert "Page" not in "".join(chunks)
+    assert page_layout.chunk_pages(chunks.spans, pages).tolist() == [1, 1, 3, 3]
+
+def test_layout_is_recovered_from_page_markers():
+    pages = _pages()
+    text = page_layout.assemble(pages)
+
+    layout = page_layout.layout_from_text(text)
+
+    assert [page["page"] for page in layout] == [1, 2, 3]
+    assert layout[0]["char_end"] < layout[2]["char_start"]
+    assert page_layout.chunk_pages(np.array([[pages[2]["char_start"], len(text)]]), layout).tolist() == [3]
+    assert page_layout.chunk_pages(np.zeros((0, 2)), []) is None
@@ -0,0 +1,53 @@
+import random
+import re
+
+import numpy as np
+import processor_bindings
+import pytest
+
+from modules import processor_interface
+from modules.chunks import Chunks
+
+def _legacy_clean_text(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,!?-]', '', text)
+    return processor_bindings.clean_text(text)
+
+def test_clean_text_collapses_whitespace_and_drops_symbols():
+    text = "  Notice:\tthirty (30) days,\r\n\n effective *now*!   "
+    assert processor_interface.clean_text(text) == "Notice thirty 30 days, effective now!"
+    assert processor_interface.clean_text(" \n * \t ") == ""
+
+def test_clean_text_matches_regex_pipeline():
+    alphabet = list(" \t\n\r\x0b\x0c\x1c\x85\xa0　abcXYZ019_.,!?-*#@()[]é中٣ⅫЖ😀​²́")
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert processor_interface.clean_text(text) == _legacy_clean_text(text)
+
+def test_clean_text_matches_regex_pipeline_for_every_code_point():
+    text = "".join("a" + chr(c) for c in range(0x110000) if not 0xD800 <= c < 0xE000)
+    assert processor_interface.clean_text(text) == _legacy_clean_text(text)
+
+def test_chunk_spans_overlap_and_cover_the_text():
+    text = " ".join(f"w{i}" for i in range(25))
+    chunks = Chunks.split(text, chunk_size=10, overlap=3, snap_to_sentence=False)
+
+    assert chunks.spans.dtype == np.int64
+    assert [len(chunk.split()) for chunk in chunks] == [10, 10, 10, 4]
+    assert chunks[0].split()[-3:] == chunks[1].split()[:3]
+    assert chunks[0].startswith("w0") and chunks[-1].endswith("w24")
+    assert chunks[1:3] == [chunks[1], chunks[2]]
+
+def test_chunk_spans_snap_to_sentence_and_use_character_offsets():
+    text = "Über die Brücke. Zwei drei vier fünf! Sechs sieben acht"
+    chunks = Chunks.split(text, chunk_size=8, overlap=1)
+
+    assert list(chunks) == ["Über die Brücke. Zwei drei vier fünf!", "fünf! Sechs sieben acht"]
+    start, end = chunks.span(1)
+    assert text[start:end] == chunks[1]
+    assert Chunks.split("", chunk_size=6, overlap=1).spans.shape == (0, 2)
+
+def test_chunk_spans_rejects_overlap_not_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        processor_interface.chunk_spans("a b c", chunk_size=2, overlap=2)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from modules import pages as page_layout
+from modules.progressive_index import ProgressiveIndexer
+
+CHUNKING = {"chunk_size": 5, "overlap": 1, "snap_to_sentence": True}
+
+def _page(number):
+    return {"page": number, "text": f"Page {number} says the notice period is {number} days. It is binding.",
+            "source": "native", "hash": f"h{number}"}
+
+def _embed(texts):
+    return np.array([[len(text), text.count(" ")] for text in texts], dtype=np.float32).reshape(-1, 2)
+
+def test_publishes_growing_prefixes_in_doubling_batches():
+    published = []
+    indexer = ProgressiveIndexer(
+        CHUNKING, _embed, lambda indexer: published.append((len(indexer.pages), len(indexer.chunks))),
+        first_batch=2
+    )
+    indexer.pages_total = 40
+    for number in range(1, 41):
+        indexer.add(_page(number))
+    indexer.finish()
+
+    # Batches of 2, 2, 4, 8, 16 and 8 pages; the complete document is left to the caller
+    assert [pages for pages, _ in published] == [2, 4, 8, 16, 32]
+    # Republishing costs less than indexing the document twice over
+    assert sum(pages for pages, _ in published) < 2 * 40
+    assert len(indexer.pages) == 40
+    assert indexer.published_chunks == published[-1][1]
+    assert indexer.published_at is not None
+
+def test_matches_indexing_in_one_pass():
+    indexer = ProgressiveIndexer(CHUNKING, _embed, first_batch=1)
+    for number in range(1, 6):
+        indexer.add(_page(number))
+    indexer.finish()
+
+    pages = [_page(number) for number in range(1, 6)]
+    text = page_layout.assemble(pages)
+    chunks = page_layout.split(text, pages, **CHUNKING)
+
+    assert indexer.text == text
+    assert np.array_equal(indexer.chunks.spans, chunks.spans)
+    assert np.array_equal(indexer.embeddings, _embed(list(chunks)))
+    assert [(page["chunk_start"], page["chunk_end"]) for page in indexer.pages] == \
+        [(page["chunk_start"], page["chunk_end"]) for page in pages]
+
+def test_empty_document():
+    indexer = ProgressiveIndexer(CHUNKING, _embed)
+    indexer.finish()
+    assert len(indexer.chunks) == 0
+    assert indexer.embeddings.shape == (0, 2)
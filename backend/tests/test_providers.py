@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules.providers import Provider
+
+def test_builds_once_under_concurrent_first_use():
+    builds = []
+
+    def factory():
+        builds.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return object()
+
+    provider = Provider("slow", factory)
+    assert not provider.ready
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(result) for result in results}) == 1
+    assert provider.status()["ready"] and provider.status()["seconds"] >= 0.05
+
+def test_failed_build_is_reported_and_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("model missing")
+        return "model"
+
+    provider = Provider("flaky", factory)
+    with pytest.raises(RuntimeError):
+        provider.get()
+    assert provider.status() == {"ready": False, "seconds": None, "error": "model missing"}
+    assert provider.get() == "model"
+    assert provider.error is None
+
+def test_async_get_builds_off_the_event_loop():
+    provider = Provider("slow", lambda: time.sleep(0.2) or "model")
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while not provider.ready:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        value = await provider.aget()
+        await ticker
+        return value, ticks
+
+    value, ticks = asyncio.run(main())
+    assert value == "model"
+    assert ticks > 5
@@ -0,0 +1,60 @@
+import numpy as np
+
+from modules import retrieval
+from modules.bm25 import BM25Index
+
+def _normalized(rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+def test_top_k_returns_best_chunks_first():
+    embeddings = _normalized([[1, 0], [0, 1], [1, 1], [-1, 0]])
+    query = _normalized([[1, 0.2]])[0]
+
+    hits = retrieval.top_k(query, embeddings, k=2)
+
+    assert [index for index, _ in hits] == [0, 2]
+    assert hits[0][1] > hits[1][1]
+
+def test_top_k_handles_small_and_empty_documents():
+    assert retrieval.top_k(np.ones(2, dtype=np.float32), np.zeros((0, 2), dtype=np.float32)) == []
+    assert len(retrieval.top_k(_normalized([[1, 0]])[0], _normalized([[1, 0]]), k=3)) == 1
+
+def test_most_representative_is_closest_to_mean():
+    embeddings = _normalized([[1, 0], [0.8, 0.6], [0.6, 0.8]])
+
+    assert retrieval.most_representative(embeddings) == 1
+
+CHUNKS = [
+    "The warranty covers part XJ-900 for two years.",
+    "Overtime is paid at time and a half.",
+    "Notice period is thirty days under clause 4.2.1.",
+    "Employees accrue vacation monthly.",
+]
+
+def test_hybrid_prunes_with_bm25_and_fuses_rankings():
+    bm25 = BM25Index.build(CHUNKS)
+    embeddings = _normalized([[1, 0, 0], [0, 1, 0], [0, 0, 1], [0.1, 0.9, 0]])
+    # The dense side prefers chunks 3 and 1, but only chunk 0 mentions the part number
+    query_embedding = _normalized([[0.2, 1, 0]])[0]
+
+    hits, timings = retrieval.hybrid_top_k("XJ-900 warranty", query_embedding, embeddings, bm25, k=1)
+    assert hits[0]["index"] == 0
+    assert timings["candidates"] == 1
+    assert {"bm25_seconds", "dense_seconds", "fusion_seconds"} <= set(timings)
+
+    hits, _ = retrieval.hybrid_top_k("XJ-900 warranty", query_embedding, embeddings, bm25, k=1, mode="dense")
+    assert hits[0]["index"] == 3
+
+    hits, _ = retrieval.hybrid_top_k("xj-900", query_embedding, embeddings, bm25, k=2, mode="bm25")
+    assert [hit["index"] for hit in hits] == [0]
+
+def test_hybrid_falls_back_to_dense_without_lexical_matches():
+    bm25 = BM25Index.build(CHUNKS)
+    embeddings = _normalized([[1, 0, 0], [0, 1, 0], [0, 0, 1], [0.1, 0.9, 0]])
+    query_embedding = _normalized([[0, 0, 1]])[0]
+
+    for fusion in ("rrf", "weighted"):
+        hits, _ = retrieval.hybrid_top_k("resignation", query_embedding, embeddings, bm25, k=2, fusion=fusion)
+        assert hits[0]["index"] == 2
+        assert len(hits) == 2
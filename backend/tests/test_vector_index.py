@@ -0,0 +1,57 @@
+import uuid
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from modules.vector_index import VectorIndex, build_where
+
+def _client():
+    return chromadb.EphemeralClient(Settings(anonymized_telemetry=False))
+
+def _index():
+    return VectorIndex(_client(), name=f"test-{uuid.uuid4().hex}")
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def test_build_where():
+    assert build_where() is None
+    assert build_where(filename="a.pdf") == {"filename": {"$eq": "a.pdf"}}
+    assert build_where(document_ids=["d1"], tags=["hr"]) == {
+        "$and": [{"document_id": {"$in": ["d1"]}}, {"tag:hr": {"$eq": True}}]
+    }
+
+def test_search_across_documents_with_filters():
+    index = _index()
+    index.add_document("d1", "handbook.pdf", ["vacation policy", "notice period"],
+                       np.stack([_unit([1, 0, 0]), _unit([0, 1, 0])]), uploaded_at=100.0, tags=["hr"])
+    index.add_document("d2", "manual.pdf", ["part numbers"],
+                       np.stack([_unit([0.9, 0.1, 0])]), uploaded_at=200.0)
+
+    hits = index.query(_unit([1, 0, 0]), top_k=2)
+    assert [hit["metadata"]["document_id"] for hit in hits] == ["d1", "d2"]
+    assert hits[0]["text"] == "vacation policy"
+    assert abs(hits[0]["similarity"] - 1.0) < 1e-4
+
+    assert [hit["text"] for hit in index.query(_unit([1, 0, 0]), top_k=2, uploaded_after=150.0)] == ["part numbers"]
+    assert {hit["metadata"]["filename"] for hit in index.query(_unit([1, 0, 0]), top_k=5, tags=["hr"])} == {"handbook.pdf"}
+
+    index.delete_document("d1")
+    assert [hit["metadata"]["document_id"] for hit in index.query(_unit([1, 0, 0]), top_k=5)] == ["d2"]
+
+def test_clear_keeps_other_workers_index_usable(monkeypatch):
+    monkeypatch.setattr("modules.vector_index.ADD_BATCH_SIZE", 2)
+    # Two indexes on one client stand in for two server workers
+    name = f"test-{uuid.uuid4().hex}"
+    client = _client()
+    worker, other = VectorIndex(client, name=name), VectorIndex(client, name=name)
+    worker.add_document("d1", "a.pdf", ["one", "two", "three"], np.stack([_unit([1, 0, i + 1]) for i in range(3)]),
+                        uploaded_at=1.0)
+
+    worker.clear()
+
+    assert other.query(_unit([1, 0, 0]), top_k=5) == []
+    other.add_document("d2", "b.pdf", ["four"], np.stack([_unit([0, 1, 0])]), uploaded_at=2.0)
+    assert [hit["text"] for hit in worker.query(_unit([0, 1, 0]), top_k=5)] == ["four"]
@@ -8,6 +8,28 @@ interface Message {
   content: string;
 }
 
+// Uploads are processed in the background: poll the ingestion job until it finishes
+const waitForJob = async (jobId: string, onProgress: (job: any) => void) => {
+  while (true) {
+    const response = await fetch(`http://localhost:8000/jobs/${jobId}`, { method: 'GET' });
+    const job = response.data as any;
+    if (!response.ok || !job) {
+      throw new Error(job?.detail || 'Could not check processing status.');
+    }
+    if (job.status === 'completed') return job;
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      throw new Error(job.error || `Processing ${job.status}.`);
+    }
+    onProgress(job);
+    await new Promise(resolve => setTimeout(resolve, 1000));
+  }
+};
+
+const progressMessage = (job: any) =>
+  job.pages_total
+    ? `Processing PDF: ${job.pages_done} of ${job.pages_total} pages (${job.stage})...`
+    : 'Processing PDF...';
+
 export function ChatInterface() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState('');
@@ -51,6 +73,13 @@ export function ChatInterface() {
         const responseData = response.data as any;
 
         if (response.ok && responseData && responseData.document_id) {
+          if (responseData.job_id) {
+            // 202 Accepted: the document is queued, not processed yet
+            setMessages([{ role: 'assistant', content: 'PDF uploaded. Processing...' }]);
+            await waitForJob(responseData.job_id, job => {
+              setMessages([{ role: 'assistant', content: progressMessage(job) }]);
+            });
+          }
           setDocumentId(responseData.document_id);
           setCurrentPdf(fileName);
           setMessages([{
@@ -68,7 +97,9 @@ export function ChatInterface() {
       console.error('Error uploading PDF:', error);
       setMessages([{
         role: 'assistant',
-        content: 'Error uploading PDF. Please try again.'
+        content: error instanceof Error
+          ? `Error: ${error.message} Please try again.`
+          : 'Error uploading PDF. Please try again.'
       }]);
     } finally {
       setIsLoading(false);